@@ -1,12 +1,28 @@
 """Main Flask application for AI Learning Platform"""
 
 import os
+import json
+import base64
+import hashlib
 import logging
-from datetime import datetime
-from flask import Flask, render_template, request, jsonify
+import mimetypes
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from flask import Flask, Response, g, render_template, request, jsonify, send_file, stream_with_context
 from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
+from urllib.parse import quote
+from werkzeug.exceptions import HTTPException
+from werkzeug.utils import safe_join
 from dotenv import load_dotenv
+from src.database import build_engine_options
+from src.search import ContentSearchIndex
+from src.metrics import registry as metrics_registry, HTTP_REQUEST_SECONDS
+from src.jobs import (JobQueue, create_job_backend, JOB_PRIORITIES, JOB_QUEUED, JOB_PROCESSING, JOB_COMPLETED,
+                      JOB_FAILED)
 
 # Load environment variables
 load_dotenv()
@@ -16,6 +32,43 @@ app = Flask(__name__)
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-key-change-in-production')
 app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///ai_learning.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['DB_POOL_SIZE'] = int(os.getenv('DB_POOL_SIZE', '5'))
+app.config['DB_MAX_OVERFLOW'] = int(os.getenv('DB_MAX_OVERFLOW', '10'))
+app.config['DB_POOL_TIMEOUT'] = int(os.getenv('DB_POOL_TIMEOUT', '30'))
+app.config['DB_POOL_RECYCLE'] = int(os.getenv('DB_POOL_RECYCLE', '1800'))
+app.config['DB_POOL_PRE_PING'] = os.getenv('DB_POOL_PRE_PING', 'True').lower() == 'true'
+app.config['SQLITE_BUSY_TIMEOUT_MS'] = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000'))
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = build_engine_options(app.config['SQLALCHEMY_DATABASE_URI'], app.config)
+if os.getenv('DATABASE_READ_URL'):
+    # Read-only endpoints query this replica; writes always go to DATABASE_URL
+    app.config['SQLALCHEMY_BINDS'] = {
+        'replica': {
+            'url': os.getenv('DATABASE_READ_URL'),
+            **build_engine_options(os.getenv('DATABASE_READ_URL'), app.config)
+        }
+    }
+app.config['TOPIC_MATCH_THRESHOLD'] = float(os.getenv('TOPIC_MATCH_THRESHOLD', '0.85'))
+app.config['BATCH_MAX_ITEMS'] = int(os.getenv('BATCH_MAX_ITEMS', '200'))
+app.config['VIDEO_OUTPUT_DIR'] = os.getenv('VIDEO_OUTPUT_DIR', './outputs/videos')
+# app: Flask streams the file itself; x-sendfile (Apache/lighttpd) or x-accel (nginx) offload it
+app.config['VIDEO_DELIVERY'] = os.getenv('VIDEO_DELIVERY', 'app')
+app.config['VIDEO_ACCEL_PREFIX'] = os.getenv('VIDEO_ACCEL_PREFIX', '/protected/videos/')
+app.config['VIDEO_CACHE_MAX_AGE'] = int(os.getenv('VIDEO_CACHE_MAX_AGE', '86400'))
+app.config['USE_X_SENDFILE'] = app.config['VIDEO_DELIVERY'] == 'x-sendfile'
+# HLS media segments are fragmented MP4; mimetypes has no entry for them
+mimetypes.add_type('video/iso.segment', '.m4s')
+app.config['JOB_BACKEND'] = os.getenv('JOB_BACKEND', 'local')
+# 0 sizes concurrent renders to the available CPUs divided by RENDER_THREADS_PER_JOB
+app.config['JOB_WORKERS'] = int(os.getenv('JOB_WORKERS', '0'))
+app.config['RENDER_THREADS_PER_JOB'] = int(os.getenv('RENDER_THREADS_PER_JOB', '2'))
+app.config['RENDER_TIMEOUT_SECONDS'] = float(os.getenv('RENDER_TIMEOUT_SECONDS', '1800'))
+app.config['RENDER_MEMORY_LIMIT_MB'] = int(os.getenv('RENDER_MEMORY_LIMIT_MB', '0'))
+# Lock files sharing the render slots between server processes; empty keeps them per process
+app.config['RENDER_SLOTS_DIR'] = os.getenv('RENDER_SLOTS_DIR', './outputs/render_slots')
+app.config['CELERY_BROKER'] = os.getenv('CELERY_BROKER', 'redis://localhost:6379/0')
+app.config['CELERY_BACKEND'] = os.getenv('CELERY_BACKEND', 'redis://localhost:6379/0')
+
+VIDEO_STYLES = ('experimental', 'professional', 'casual')
 
 # Initialize extensions
 db = SQLAlchemy(app)
@@ -31,11 +84,20 @@ logger = logging.getLogger(__name__)
 # Database Models
 class Content(db.Model):
     """Model for storing generated content"""
+    __table_args__ = (
+        db.Index('ix_content_topic_created_at', 'topic', 'created_at'),
+        db.Index('ix_content_created_at_id', 'created_at', 'id'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     topic = db.Column(db.String(255), nullable=False)
     title = db.Column(db.String(255), nullable=False)
     description = db.Column(db.Text)
-    content = db.Column(db.Text)
+    content = db.Column(db.Text)  # JSON: sections, key_points, learning_objectives, fun_facts
+    language = db.Column(db.String(20), default='en')
+    depth = db.Column(db.String(20), default='intermediate')
+    payload = db.Column(db.Text)  # Pre-serialized GET /api/content/<id> response
+    etag = db.Column(db.String(64))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -45,11 +107,407 @@ class Video(db.Model):
     content_id = db.Column(db.Integer, db.ForeignKey('content.id'), nullable=False)
     video_path = db.Column(db.String(255), nullable=False)
     video_url = db.Column(db.String(255))
+    hls_url = db.Column(db.String(255))
     duration = db.Column(db.Float)
     file_size = db.Column(db.String(50))
     style = db.Column(db.String(50), default='experimental')
+    preview = db.Column(db.Boolean, default=False)
+    preview_sections = db.Column(db.Integer)
     status = db.Column(db.String(50), default='processing')
+    error = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+# Content Generation
+_content_generator = None
+
+def get_content_generator():
+    """Return the shared ContentGenerator, creating it on first use"""
+    global _content_generator
+    if _content_generator is None:
+        from src import ContentGenerator
+        _content_generator = ContentGenerator()
+    return _content_generator
+
+def _serialize_content(content):
+    """Build the public JSON representation of a stored Content row"""
+    body = json.loads(content.content) if content.content else {}
+    return {
+        'id': content.id,
+        'topic': content.topic,
+        'title': content.title,
+        'description': content.description,
+        'sections': body.get('sections', []),
+        'key_points': body.get('key_points', []),
+        'learning_objectives': body.get('learning_objectives', []),
+        'fun_facts': body.get('fun_facts', []),
+        'language': content.language,
+        'depth': content.depth,
+        'created_at': content.created_at.isoformat(),
+        'status': 'completed'
+    }
+
+def _freeze_payload(content):
+    """Store the serialized response and its ETag on the row"""
+    content.payload = json.dumps(_serialize_content(content))
+    content.etag = hashlib.sha256(content.payload.encode('utf-8')).hexdigest()[:32]
+
+def save_content(lesson):
+    """Persist a generated lesson and return its public representation"""
+    content = Content(
+        topic=lesson['topic'],
+        title=lesson['title'][:255],
+        description=lesson['description'],
+        content=json.dumps({
+            'sections': lesson.get('sections', []),
+            'key_points': lesson.get('key_points', []),
+            'learning_objectives': lesson.get('learning_objectives', []),
+            'fun_facts': lesson.get('fun_facts', [])
+        }),
+        language=lesson.get('language', 'en'),
+        depth=lesson.get('depth', 'intermediate'),
+        created_at=datetime.utcnow()
+    )
+    if not search_index.is_ready(db.engine):
+        # Processes started without init_database() create the index on their first write,
+        # in its own transaction, so end the session's read transaction first
+        db.session.commit()
+        search_index.ensure(db.engine)
+    db.session.add(content)
+    db.session.flush()
+    _freeze_payload(content)
+    search_index.index(db.session.connection(), content.id, content.title,
+                       content.description, content.content)
+    db.session.commit()
+    
+    response = json.loads(content.payload)
+    response['tokens_used'] = lesson.get('tokens_used', 0)
+    response['cached'] = bool(lesson.get('cached'))
+    return response
+
+search_index = ContentSearchIndex()
+
+def init_database():
+    """Create tables and the full-text index, indexing lessons stored before it existed"""
+    with app.app_context():
+        db.create_all()
+        search_index.ensure(db.engine)
+
+def _has_replica():
+    """Return whether a read replica is configured"""
+    return 'replica' in app.config.get('SQLALCHEMY_BINDS', {})
+
+@contextmanager
+def read_connection():
+    """Yield a connection for read-only queries, from the replica when one is configured"""
+    if _has_replica():
+        with db.engines['replica'].connect() as conn:
+            yield conn
+    else:
+        yield db.session.connection()
+
+def _encode_cursor(created_at, content_id):
+    """Encode a keyset pagination cursor"""
+    raw = json.dumps([created_at.isoformat(), content_id]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+def _decode_cursor(cursor):
+    """Decode a keyset pagination cursor, raising ValueError if malformed"""
+    try:
+        created_at, content_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return datetime.fromisoformat(created_at), int(content_id)
+    except (TypeError, ValueError, UnicodeError) as e:
+        raise ValueError('Invalid cursor') from e
+
+def _page_limit():
+    """Read the page size from the query string, clamped to 1..100"""
+    return max(1, min(request.args.get('limit', 20, type=int), 100))
+
+_SUMMARY_COLUMNS = (Content.id, Content.topic, Content.title, Content.description,
+                    Content.language, Content.depth, Content.created_at)
+
+def _summary(row):
+    """Serialize a content summary row for listings and search results"""
+    return {
+        'id': row.id,
+        'topic': row.topic,
+        'title': row.title,
+        'description': row.description,
+        'language': row.language,
+        'depth': row.depth,
+        'created_at': row.created_at.isoformat()
+    }
+
+# Serialized responses are immutable once written, so workers may keep them indefinitely
+_payload_cache = OrderedDict()
+_payload_cache_lock = threading.Lock()
+_PAYLOAD_CACHE_SIZE = int(os.getenv('CONTENT_PAYLOAD_CACHE_SIZE', '1024'))
+
+def get_content_payload(content_id):
+    """Return (payload, etag) for a Content row without hydrating ORM objects"""
+    with _payload_cache_lock:
+        cached = _payload_cache.get(content_id)
+        if cached is not None:
+            _payload_cache.move_to_end(content_id)
+            return cached
+    
+    with read_connection() as conn:
+        row = conn.execute(
+            db.select(Content.payload, Content.etag).where(Content.id == content_id)
+        ).first()
+    if row is None:
+        return None
+    
+    if row.payload is None:
+        # Rows written before payloads were stored are serialized once, on first read
+        content = db.session.get(Content, content_id)
+        _freeze_payload(content)
+        db.session.commit()
+        row = (content.payload, content.etag)
+    
+    entry = (row[0], row[1])
+    with _payload_cache_lock:
+        _payload_cache[content_id] = entry
+        while len(_payload_cache) > _PAYLOAD_CACHE_SIZE:
+            _payload_cache.popitem(last=False)
+    return entry
+
+# Near-duplicate topics ("Intro to ML" vs "Machine Learning") reuse the stored lesson
+_topic_index = None
+_topic_index_lock = threading.Lock()
+# Ids below the highest indexed one that are scanned again: concurrent writers (Postgres)
+# can commit a lower id after a higher one has already been indexed
+TOPIC_INDEX_RESCAN_IDS = 500
+
+def get_topic_index():
+    """Return the topic index after adding lessons stored since the last call, by any worker"""
+    global _topic_index
+    with _topic_index_lock:
+        if _topic_index is None:
+            from src.topics import TopicIndex
+            _topic_index = TopicIndex()
+        topic_index = _topic_index
+        
+        with read_connection() as conn:
+            rows = conn.execute(
+                db.select(Content.id, Content.topic, Content.language, Content.depth)
+                .where(Content.id > topic_index.max_id - TOPIC_INDEX_RESCAN_IDS)
+                .order_by(Content.id)
+            ).all()
+        for row in rows:
+            if row.id not in topic_index:
+                topic_index.add(row.id, row.topic, row.language or 'en', row.depth or 'intermediate')
+    return topic_index
+
+def find_existing_lesson(topic, language, depth):
+    """Return the stored lesson for a near-duplicate topic, or None"""
+    threshold = app.config['TOPIC_MATCH_THRESHOLD']
+    if threshold <= 0:
+        return None
+    
+    match = get_topic_index().match(topic, language, depth, threshold=threshold)
+    if match is None:
+        return None
+    
+    entry = get_content_payload(match['id'])
+    if entry is None:
+        return None
+    
+    logger.info(f"Reusing lesson {match['id']} ({match['topic']!r}) for topic {topic!r}")
+    response = json.loads(entry[0])
+    response.update({
+        'tokens_used': 0,
+        'cached': True,
+        'reused': True,
+        'matched_topic': match['topic'],
+        'match_score': round(match['score'], 4)
+    })
+    return response
+
+def _sse(event, data):
+    """Format a server-sent event"""
+    return f'event: {event}\ndata: {json.dumps(data)}\n\n'
+
+# Background Jobs
+def _init_job_worker():
+    """Drop database connections inherited from the parent process"""
+    with app.app_context():
+        db.engine.dispose(close=False)
+
+def _on_job_failure(func, args, reason):
+    """Mark the video of a job that was killed or crashed before it could record the failure"""
+    if func.__name__ != 'process_video_job':
+        return
+    with app.app_context():
+        video = db.session.get(Video, args[0])
+        if video and video.status not in (JOB_COMPLETED, JOB_FAILED):
+            video.status = JOB_FAILED
+            video.error = reason
+            db.session.commit()
+
+# A render still processing this long after its timeout lost the worker supervising it
+JOB_STALE_GRACE_SECONDS = 60
+
+def _stale_jobs_cutoff():
+    """Return the updated_at before which a processing render is orphaned, or None without a timeout"""
+    timeout = app.config['RENDER_TIMEOUT_SECONDS']
+    if not timeout:
+        return None
+    return datetime.utcnow() - timedelta(seconds=timeout + JOB_STALE_GRACE_SECONDS)
+
+def _fail_if_stale(video, cutoff):
+    """Mark a processing video failed if its render was orphaned; return whether it was"""
+    if video.status != JOB_PROCESSING or cutoff is None or video.updated_at is None or video.updated_at >= cutoff:
+        return False
+    video.status = JOB_FAILED
+    video.error = 'Render was interrupted: its worker stopped before it finished'
+    return True
+
+def recover_jobs():
+    """Re-enqueue renders still queued in the database and fail those left processing
+    
+    The local scheduler keeps its queue in memory, so a restarted, recycled or
+    killed worker loses its jobs. Renders claim their row before running, so a
+    job another live worker still holds is never rendered twice.
+    """
+    with app.app_context():
+        cutoff = _stale_jobs_cutoff()
+        failed = 0
+        if cutoff is not None:
+            for video in Video.query.filter(Video.status == JOB_PROCESSING, Video.updated_at < cutoff):
+                failed += _fail_if_stale(video, cutoff)
+            db.session.commit()
+        queued = [video_id for (video_id,) in
+                  db.session.query(Video.id).filter_by(status=JOB_QUEUED).order_by(Video.id)]
+    
+    for video_id in queued:
+        job_queue.enqueue(process_video_job, video_id)
+    if failed or queued:
+        logger.info(f'Recovered jobs: {len(queued)} re-enqueued, {failed} interrupted renders failed')
+    return {'requeued': len(queued), 'failed': failed}
+
+job_queue = JobQueue(create_job_backend(
+    app.config['JOB_BACKEND'],
+    max_workers=app.config['JOB_WORKERS'] or None,
+    initializer=_init_job_worker,
+    broker_url=app.config['CELERY_BROKER'],
+    result_backend=app.config['CELERY_BACKEND'],
+    threads_per_job=app.config['RENDER_THREADS_PER_JOB'],
+    timeout=app.config['RENDER_TIMEOUT_SECONDS'],
+    memory_limit_mb=app.config['RENDER_MEMORY_LIMIT_MB'],
+    slots_dir=app.config['RENDER_SLOTS_DIR']
+), on_failure=_on_job_failure)
+celery = getattr(job_queue.backend, 'celery', None)
+
+def _content_to_dict(content):
+    """Build the generator payload for a stored Content row"""
+    data = {}
+    if content.content:
+        try:
+            data = json.loads(content.content)
+        except ValueError:
+            data = {'sections': [{'title': content.title, 'content': content.content, 'key_points': []}]}
+    data.update({
+        'id': content.id,
+        'topic': content.topic,
+        'title': content.title,
+        'description': content.description or ''
+    })
+    data.setdefault('sections', [])
+    data.setdefault('key_points', [])
+    return data
+
+def _serialize_job(video):
+    """Serialize a Video row as a job status payload"""
+    return {
+        'job_id': video.id,
+        'video_id': video.id,
+        'content_id': video.content_id,
+        'style': video.style,
+        'preview': bool(video.preview),
+        'status': video.status,
+        'video_url': video.video_url,
+        'hls_url': video.hls_url,
+        'duration': video.duration,
+        'file_size': video.file_size,
+        'error': video.error,
+        'created_at': video.created_at.isoformat() if video.created_at else None,
+        'updated_at': video.updated_at.isoformat() if video.updated_at else None
+    }
+
+@job_queue.task
+def process_video_job(video_id):
+    """Render a queued video and record its progress on the Video row"""
+    with app.app_context():
+        # Claim the job atomically: a recovered job may be queued in more than one worker
+        claimed = db.session.execute(
+            db.update(Video)
+            .where(Video.id == video_id, Video.status == JOB_QUEUED)
+            .values(status=JOB_PROCESSING, updated_at=datetime.utcnow())
+        ).rowcount
+        db.session.commit()
+        video = Video.query.get(video_id)
+        if not video:
+            logger.error(f'Video job {video_id} not found')
+            return
+        if not claimed:
+            logger.info(f'Video job {video_id} is already {video.status}')
+            return
+        
+        try:
+            from src import VideoGenerator
+            content = Content.query.get(video.content_id)
+            generator = VideoGenerator(output_dir=app.config['VIDEO_OUTPUT_DIR'])
+            options = {'preview': True, 'preview_sections': video.preview_sections} if video.preview else {}
+            result = generator.create_video(_content_to_dict(content), style=video.style, **options)
+            
+            video.video_path = result['video_path']
+            video.video_url = result['video_url']
+            video.hls_url = result.get('hls_url')
+            video.duration = result['duration']
+            video.file_size = result['file_size']
+            video.status = JOB_COMPLETED
+        except Exception as e:
+            logger.error(f'Error rendering video {video_id}: {str(e)}')
+            db.session.rollback()
+            video.status = JOB_FAILED
+            video.error = str(e)
+        
+        db.session.commit()
+
+_jobs_recovered_pid = None
+_jobs_recovered_lock = threading.Lock()
+
+@app.before_request
+def _recover_jobs_once():
+    """Recover jobs lost by a previous worker, once per server process running the local scheduler"""
+    global _jobs_recovered_pid
+    if _jobs_recovered_pid == os.getpid() or job_queue.backend.name != 'local':
+        return
+    with _jobs_recovered_lock:
+        if _jobs_recovered_pid == os.getpid():
+            return
+        _jobs_recovered_pid = os.getpid()
+    try:
+        recover_jobs()
+    except Exception as e:
+        logger.error(f'Error recovering jobs: {str(e)}')
+
+# Metrics
+@app.before_request
+def _start_request_timer():
+    """Note when request handling started"""
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def _record_request_latency(response):
+    """Observe request latency by route template, so /api/content/1 and /2 share a series"""
+    started = g.pop('request_started', None)
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, method=request.method,
+                                     route=route, status=response.status_code)
+    return response
 
 # Routes
 @app.route('/', methods=['GET'])
@@ -62,6 +520,11 @@ def health():
     """Health check endpoint"""
     return jsonify({'status': 'healthy', 'timestamp': datetime.utcnow().isoformat()})
 
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus scrape endpoint, aggregated across all worker processes"""
+    return Response(metrics_registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 @app.route('/api/generate-content', methods=['POST'])
 def generate_content():
     """API endpoint to generate educational content"""
@@ -74,24 +537,15 @@ def generate_content():
         if not topic:
             return jsonify({'error': 'Topic is required'}), 400
         
-        # TODO: Implement content generation logic
-        # This will integrate with OpenAI GPT for content synthesis
-        
-        # Mock response for now
-        response = {
-            'id': 1,
-            'topic': topic,
-            'title': f'Introduction to {topic}',
-            'description': f'Learn about {topic} with our AI-powered platform',
-            'sections': [
-                {
-                    'title': 'Overview',
-                    'content': f'This section provides an overview of {topic}...'
-                }
-            ],
-            'created_at': datetime.utcnow().isoformat(),
-            'status': 'completed'
-        }
+        if not isinstance(topic, str):
+            return jsonify({'error': 'Topic must be a string'}), 400
+        
+        existing = find_existing_lesson(topic, language, depth)
+        if existing is not None:
+            return jsonify(existing), 200
+        
+        lesson = get_content_generator().generate(topic, language, depth)
+        response = save_content(lesson)
         
         return jsonify(response), 201
         
@@ -99,51 +553,302 @@ def generate_content():
         logger.error(f'Error generating content: {str(e)}')
         return jsonify({'error': 'Internal server error'}), 500
 
+@app.route('/api/generate-content/stream', methods=['POST'])
+def generate_content_stream():
+    """Stream generated content as server-sent events, one event per completed section"""
+    try:
+        data = request.get_json()
+        topic = data.get('topic')
+        language = data.get('language', 'en')
+        depth = data.get('depth', 'intermediate')
+        
+        if not topic:
+            return jsonify({'error': 'Topic is required'}), 400
+        
+        if not isinstance(topic, str):
+            return jsonify({'error': 'Topic must be a string'}), 400
+        
+        generator = get_content_generator()
+        
+    except Exception as e:
+        logger.error(f'Error generating content: {str(e)}')
+        return jsonify({'error': 'Internal server error'}), 500
+    
+    def events():
+        try:
+            existing = find_existing_lesson(topic, language, depth)
+            if existing is not None:
+                yield _sse('done', existing)
+                return
+            
+            for event, payload in generator.generate_stream(topic, language, depth):
+                if event == 'done':
+                    payload = save_content(payload)
+                yield _sse(event, payload)
+        except Exception as e:
+            logger.error(f'Error streaming content: {str(e)}')
+            yield _sse('error', {'error': 'Content generation failed'})
+    
+    return Response(
+        stream_with_context(events()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/api/generate-content/batch', methods=['POST'])
+def generate_content_batch():
+    """API endpoint to generate many lessons concurrently"""
+    try:
+        data = request.get_json()
+        items = data.get('items')
+        language = data.get('language', 'en')
+        depth = data.get('depth', 'intermediate')
+        
+        if not isinstance(items, list) or not items:
+            return jsonify({'error': 'Items must be a non-empty list'}), 400
+        
+        if len(items) > app.config['BATCH_MAX_ITEMS']:
+            return jsonify({'error': f"At most {app.config['BATCH_MAX_ITEMS']} items per batch"}), 400
+        
+        # Items may be bare topic strings or dicts overriding the batch defaults
+        batch_items = []
+        for item in items:
+            if isinstance(item, str):
+                item = {'topic': item}
+            elif not isinstance(item, dict):
+                item = {}
+            batch_items.append({
+                'topic': item.get('topic'),
+                'language': item.get('language', language),
+                'depth': item.get('depth', depth)
+            })
+        
+        # Topics already covered by a stored lesson never reach the generator
+        results = [None] * len(batch_items)
+        pending = []
+        for index, item in enumerate(batch_items):
+            # Invalid topics are left to generate_many, which fails just that item
+            existing = find_existing_lesson(**item) if isinstance(item['topic'], str) and item['topic'] else None
+            if existing is not None:
+                results[index] = {'index': index, 'status': 'completed', 'content': existing}
+            else:
+                pending.append(index)
+        
+        batch = get_content_generator().generate_many([batch_items[i] for i in pending])
+        for index, result in zip(pending, batch['results']):
+            if result['status'] == 'completed':
+                result['content'] = save_content(result['content'])
+            result['index'] = index
+            results[index] = result
+        
+        reused = len(batch_items) - len(pending)
+        summary = batch['summary']
+        summary.update({
+            'total': len(batch_items),
+            'succeeded': summary['succeeded'] + reused,
+            'cached': summary['cached'] + reused,
+            'reused': reused
+        })
+        
+        return jsonify({'results': results, 'summary': summary}), 200
+        
+    except Exception as e:
+        logger.error(f'Error generating content batch: {str(e)}')
+        return jsonify({'error': 'Internal server error'}), 500
+
 @app.route('/api/generate-video', methods=['POST'])
 def generate_video():
-    """API endpoint to generate video from content"""
+    """API endpoint to queue video generation for stored content"""
     try:
         data = request.get_json()
         content_id = data.get('content_id')
         style = data.get('style', 'experimental')
+        priority = data.get('priority', 'interactive')
+        preview = bool(data.get('preview', False))
+        preview_sections = data.get('preview_sections')
         
         if not content_id:
             return jsonify({'error': 'Content ID is required'}), 400
         
-        # TODO: Implement video generation logic
-        # This will use MoviePy and FFmpeg for video creation
-        
-        response = {
-            'video_id': 1,
-            'content_id': content_id,
-            'video_url': '/outputs/videos/video_1.mp4',
-            'duration': 120,
-            'file_size': '45.2 MB',
-            'style': style,
-            'status': 'completed'
-        }
+        if style not in VIDEO_STYLES:
+            return jsonify({'error': f'Style must be one of: {", ".join(VIDEO_STYLES)}'}), 400
         
-        return jsonify(response), 201
+        if priority not in JOB_PRIORITIES:
+            return jsonify({'error': f'Priority must be one of: {", ".join(JOB_PRIORITIES)}'}), 400
+        
+        if preview_sections is not None and (
+                not isinstance(preview_sections, int) or isinstance(preview_sections, bool) or preview_sections < 1):
+            return jsonify({'error': 'preview_sections must be a positive integer'}), 400
+        
+        content = Content.query.get(content_id)
+        if not content:
+            return jsonify({'error': 'Content not found'}), 404
+        
+        video = Video(content_id=content.id, video_path='', style=style, status=JOB_QUEUED,
+                      preview=preview, preview_sections=preview_sections if preview else None)
+        db.session.add(video)
+        db.session.commit()
+        response = _serialize_job(video)
+        
+        try:
+            job_queue.enqueue(process_video_job, video.id, priority=JOB_PRIORITIES[priority])
+        except Exception:
+            video.status = JOB_FAILED
+            video.error = 'Failed to enqueue job'
+            db.session.commit()
+            raise
+        
+        response['status_url'] = f'/api/jobs/{video.id}'
+        return jsonify(response), 202
         
     except Exception as e:
         logger.error(f'Error generating video: {str(e)}')
         return jsonify({'error': 'Internal server error'}), 500
 
+@app.route('/api/jobs/stats', methods=['GET'])
+def job_stats():
+    """Report render queue depth, slot usage, wait times and outcomes for this server process"""
+    try:
+        return jsonify(job_queue.stats()), 200
+        
+    except Exception as e:
+        logger.error(f'Error retrieving job stats: {str(e)}')
+        return jsonify({'error': 'Internal server error'}), 500
+
+@app.route('/api/jobs/<int:job_id>', methods=['GET'])
+def get_job(job_id):
+    """Retrieve the status of a video generation job"""
+    try:
+        video = Video.query.get(job_id)
+        if not video:
+            return jsonify({'error': 'Job not found'}), 404
+        
+        # Pollers of a render whose worker died get an answer instead of waiting forever
+        if _fail_if_stale(video, _stale_jobs_cutoff()):
+            db.session.commit()
+        
+        return jsonify(_serialize_job(video)), 200
+        
+    except Exception as e:
+        logger.error(f'Error retrieving job: {str(e)}')
+        return jsonify({'error': 'Internal server error'}), 500
+
+# Finished videos and their HLS playlists, media segments and init segments (init_N.mp4)
+VIDEO_EXTENSIONS = ('.mp4', '.m3u8', '.m4s')
+
+def _published_video(video_dir, filename):
+    """Return the path of a finished video file under video_dir, or None
+    
+    Renders keep work files (temporary directories, audio_*.wav, .tmp_* files)
+    beside their output, so only the known video extensions are served and an
+    HLS file only from the directory of a finished <name>.mp4.
+    """
+    parts = filename.split('/')
+    if not filename.endswith(VIDEO_EXTENSIONS) or any(part.startswith('.') for part in parts):
+        return None
+    path = safe_join(video_dir, filename)
+    if path is None or not os.path.isfile(path):
+        return None
+    if len(parts) > 1 and not os.path.isfile(os.path.join(video_dir, parts[0] + '.mp4')):
+        return None
+    return path
+
+@app.route('/outputs/videos/<path:filename>', methods=['GET'])
+def serve_video(filename):
+    """Serve a rendered video with Range (206) and conditional request support"""
+    try:
+        path = _published_video(os.path.abspath(app.config['VIDEO_OUTPUT_DIR']), filename)
+        if path is None:
+            return jsonify({'error': 'Video not found'}), 404
+        
+        max_age = app.config['VIDEO_CACHE_MAX_AGE']
+        if app.config['VIDEO_DELIVERY'] == 'x-accel':
+            # nginx serves the bytes from an internal location, handling ranges itself
+            response = Response(mimetype=mimetypes.guess_type(path)[0] or 'application/octet-stream')
+            response.headers['X-Accel-Redirect'] = (
+                app.config['VIDEO_ACCEL_PREFIX'].rstrip('/') + '/' + quote(filename)
+            )
+        else:
+            # Werkzeug answers Range with 206 and validators with 304, reading the file in
+            # blocks; full responses go through wsgi.file_wrapper, i.e. sendfile under gunicorn.
+            # With USE_X_SENDFILE only the X-Sendfile header is sent.
+            response = send_file(path, conditional=True, etag=True, max_age=max_age)
+            # Advertise seeking on full responses too, so players issue Range requests
+            response.accept_ranges = 'bytes'
+        
+        # File names are unique per render, so a cached copy never goes stale
+        response.cache_control.public = True
+        response.cache_control.max_age = max_age
+        response.cache_control.immutable = True
+        return response
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f'Error serving video {filename}: {str(e)}')
+        return jsonify({'error': 'Internal server error'}), 500
+
+@app.route('/api/content', methods=['GET'])
+def list_content():
+    """List stored content, newest first, with cursor pagination"""
+    try:
+        limit = _page_limit()
+        query = db.select(*_SUMMARY_COLUMNS).order_by(Content.created_at.desc(), Content.id.desc())
+        
+        cursor = request.args.get('cursor')
+        if cursor:
+            try:
+                created_at, content_id = _decode_cursor(cursor)
+            except ValueError:
+                return jsonify({'error': 'Invalid cursor'}), 400
+            query = query.where(db.tuple_(Content.created_at, Content.id) < (created_at, content_id))
+        
+        # Fetch one extra row to know whether another page exists
+        with read_connection() as conn:
+            rows = conn.execute(query.limit(limit + 1)).all()
+        items = [_summary(row) for row in rows[:limit]]
+        next_cursor = _encode_cursor(rows[limit - 1].created_at, rows[limit - 1].id) if len(rows) > limit else None
+        
+        return jsonify({'items': items, 'next_cursor': next_cursor}), 200
+        
+    except Exception as e:
+        logger.error(f'Error listing content: {str(e)}')
+        return jsonify({'error': 'Internal server error'}), 500
+
+@app.route('/api/content/search', methods=['GET'])
+def search_content():
+    """Full-text search over content titles, descriptions and sections"""
+    try:
+        query = request.args.get('q', '').strip()
+        if not query:
+            return jsonify({'error': 'Query parameter q is required'}), 400
+        
+        with read_connection() as conn:
+            ids = search_index.search(conn, query, _page_limit())
+            rows = conn.execute(db.select(*_SUMMARY_COLUMNS).where(Content.id.in_(ids))).all() if ids else []
+        by_id = {row.id: row for row in rows}
+        items = [_summary(by_id[content_id]) for content_id in ids if content_id in by_id]
+        
+        return jsonify({'query': query, 'items': items}), 200
+        
+    except Exception as e:
+        logger.error(f'Error searching content: {str(e)}')
+        return jsonify({'error': 'Internal server error'}), 500
+
 @app.route('/api/content/<int:content_id>', methods=['GET'])
 def get_content(content_id):
     """Retrieve generated content by ID"""
     try:
-        content = Content.query.get(content_id)
-        if not content:
+        entry = get_content_payload(content_id)
+        if not entry:
             return jsonify({'error': 'Content not found'}), 404
         
-        return jsonify({
-            'id': content.id,
-            'topic': content.topic,
-            'title': content.title,
-            'description': content.description,
-            'created_at': content.created_at.isoformat()
-        }), 200
+        payload, etag = entry
+        response = Response(payload, status=200, mimetype='application/json')
+        response.set_etag(etag)
+        response.cache_control.public = True
+        response.cache_control.no_cache = True
+        return response.make_conditional(request)
         
     except Exception as e:
         logger.error(f'Error retrieving content: {str(e)}')
@@ -161,8 +866,7 @@ def internal_error(error):
     return jsonify({'error': 'Internal server error'}), 500
 
 if __name__ == '__main__':
-    with app.app_context():
-        db.create_all()
+    init_database()
     
     host = os.getenv('APP_HOST', '0.0.0.0')
     port = int(os.getenv('APP_PORT', 5000))
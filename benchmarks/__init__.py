@@ -0,0 +1 @@
+"""Reproducible benchmarks for the content and video pipelines"""
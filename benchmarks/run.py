@@ -0,0 +1,388 @@
+"""Benchmark the content and video pipelines against a stub LLM and silent TTS
+
+Usage (from the project root):
+
+    python -m benchmarks.run                       # run everything, save results
+    python -m benchmarks.run parse_content -n 200  # run selected benchmarks
+    python -m benchmarks.run --compare benchmarks/results/abc1234.json
+
+Results are written to benchmarks/results/<commit>.json so two commits can be
+compared; --compare exits non-zero when a p50 regresses past --max-regression.
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import re
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import wave
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+
+
+def stub_lesson(topic: str, sections: int = 5) -> Dict:
+    """Build the lesson the stub LLM returns for a topic"""
+    return {
+        'title': f'Introduction to {topic}',
+        'description': f'A short lesson about {topic}.',
+        'sections': [
+            {'title': f'{topic} part {i + 1}',
+             'content': f'Part {i + 1} explains one idea about {topic} in a few sentences.',
+             'key_points': [f'{topic} point {i + 1}']}
+            for i in range(sections)
+        ],
+        'key_points': [f'{topic} summary'],
+        'learning_objectives': [f'Understand {topic}']
+    }
+
+
+class SilentTTSEngine:
+    """pyttsx3 stand-in that writes silence for each queued utterance (ten characters per second)"""
+
+    def __init__(self):
+        self.queue = []
+
+    def setProperty(self, name, value):
+        pass
+
+    def save_to_file(self, text, path):
+        self.queue.append((text, path))
+
+    def runAndWait(self):
+        for text, path in self.queue:
+            with wave.open(path, 'wb') as f:
+                f.setnchannels(1)
+                f.setsampwidth(2)
+                f.setframerate(22050)
+                f.writeframes(b'\x00\x00' * int(len(text) / 10.0 * 22050))
+        self.queue = []
+
+
+@contextmanager
+def stubbed_backends(llm_latency: float = 0.0) -> Iterator[None]:
+    """Replace the OpenAI API and the TTS driver for the duration of the block"""
+    import openai
+    from src import video_generator
+
+    def create(**kwargs):
+        prompt = kwargs['messages'][-1]['content']
+        match = re.search(r'for the topic: "(.*)"', prompt)
+        if llm_latency:
+            time.sleep(llm_latency)
+        lesson = json.dumps(stub_lesson(match.group(1) if match else 'Benchmarks'))
+        return {'choices': [{'message': {'content': lesson}}], 'usage': {'total_tokens': len(lesson) // 4}}
+
+    original_create = openai.ChatCompletion.create
+    original_init = video_generator.pyttsx3.init
+    openai.ChatCompletion.create = create
+    video_generator.pyttsx3.init = SilentTTSEngine
+    try:
+        yield
+    finally:
+        openai.ChatCompletion.create = original_create
+        video_generator.pyttsx3.init = original_init
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Return the nearest-rank percentile of samples"""
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(pct / 100.0 * len(ordered)) - 1)]
+
+
+def peak_rss_mb() -> Dict[str, float]:
+    """Return peak resident memory of this process and of its reaped children (ffmpeg), in MB"""
+    scale = 1024.0 * 1024.0 if sys.platform == 'darwin' else 1024.0
+    return {
+        'self': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale, 1),
+        'children': round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale, 1)
+    }
+
+
+def measure(func: Callable[[int], None], iterations: int, warmup: int = 1) -> Dict:
+    """Time iterations calls of func(i) and summarize throughput and latency"""
+    for i in range(warmup):
+        func(-1 - i)
+
+    samples = []
+    started = time.perf_counter()
+    for i in range(iterations):
+        start = time.perf_counter()
+        func(i)
+        samples.append(time.perf_counter() - start)
+    elapsed = time.perf_counter() - started
+
+    return {
+        'iterations': iterations,
+        'ops_per_second': round(iterations / elapsed, 3) if elapsed else None,
+        'mean_ms': round(1000 * sum(samples) / len(samples), 3),
+        'p50_ms': round(1000 * percentile(samples, 50), 3),
+        'p99_ms': round(1000 * percentile(samples, 99), 3),
+        'peak_rss_mb': peak_rss_mb()
+    }
+
+
+class Workspace:
+    """Temporary directories and a stubbed app shared by the benchmarks of one run"""
+
+    def __init__(self):
+        self.tmp = tempfile.TemporaryDirectory(prefix='bench_')
+        self.path = self.tmp.name
+        self._app = None
+        self._saved = {}
+        self._run_id = f"{os.getpid()}-{int(time.time())}"
+
+        # Exported settings must not point a benchmark at a real database, metrics file or cache,
+        # whose warm entries and lock files would also skew the numbers
+        environ = {
+            'DATABASE_URL': 'sqlite:///:memory:',
+            'JOB_BACKEND': 'inline',
+            'METRICS_DB': '',
+            'CACHE_DIR': os.path.join(self.path, 'cache'),
+            'AUDIO_CACHE_DIR': os.path.join(self.path, 'audio_cache'),
+            'SEGMENT_CACHE_DIR': os.path.join(self.path, 'segment_cache'),
+            'LLM_REQUESTS_PER_MINUTE': '0'
+        }
+        self._environ = {name: os.environ.get(name) for name in environ}
+        os.environ.update(environ)
+
+    def app(self):
+        """Import the Flask app against a scratch database and a stub content generator"""
+        if self._app is not None:
+            return self._app
+
+        import app as app_module
+        from src import ContentCache, ContentGenerator
+
+        self._saved = {
+            'VIDEO_OUTPUT_DIR': app_module.app.config['VIDEO_OUTPUT_DIR'],
+            'TOPIC_MATCH_THRESHOLD': app_module.app.config['TOPIC_MATCH_THRESHOLD'],
+            '_content_generator': app_module._content_generator
+        }
+        app_module.app.config['VIDEO_OUTPUT_DIR'] = os.path.join(self.path, 'videos')
+        # Every benchmark topic must reach the generator, not a stored near-duplicate
+        app_module.app.config['TOPIC_MATCH_THRESHOLD'] = 0
+        app_module._content_generator = ContentGenerator(api_key='benchmark', cache=ContentCache(db_path=''))
+        app_module.init_database()
+
+        self._app = app_module
+        return app_module
+
+    def topic(self, i: object) -> str:
+        """Return a topic unique to this run and iteration"""
+        return f"Benchmark {self._run_id} lesson {i}"
+
+    def video_generator(self):
+        """Create a VideoGenerator writing into the workspace"""
+        from src.cache import AudioCache
+        from src.video_generator import VideoGenerator
+        return VideoGenerator(output_dir=os.path.join(self.path, 'videos'),
+                              audio_cache=AudioCache(os.path.join(self.path, 'audio_cache')))
+
+    def cleanup(self) -> None:
+        """Undo the app patches and remove every file the run created"""
+        if self._app is not None:
+            self._app._content_generator = self._saved.pop('_content_generator')
+            self._app.app.config.update(self._saved)
+        for name, value in self._environ.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+        self.tmp.cleanup()
+
+
+def bench_api_generate_content(ws: Workspace, iterations: int) -> Dict:
+    """POST /api/generate-content with a fresh topic each time"""
+    client = ws.app().app.test_client()
+
+    def run(i):
+        response = client.post('/api/generate-content', json={'topic': ws.topic(i)})
+        assert response.status_code == 201, response.data
+
+    return measure(run, iterations)
+
+
+def bench_api_generate_video(ws: Workspace, iterations: int) -> Dict:
+    """POST /api/generate-video for new lessons, rendering inline (cold audio cache)"""
+    client = ws.app().app.test_client()
+
+    def run(i):
+        response = client.post('/api/generate-content', json={'topic': ws.topic(f'video {i}')})
+        content_id = response.get_json()['id']
+        response = client.post('/api/generate-video', json={'content_id': content_id})
+        assert response.status_code == 202, response.data
+        job = client.get(response.get_json()['status_url']).get_json()
+        assert job['status'] == 'completed', job
+
+    return measure(run, iterations)
+
+
+def bench_parse_content(ws: Workspace, iterations: int) -> Dict:
+    """ContentGenerator._parse_content on a typical response with surrounding prose"""
+    from src import ContentCache, ContentGenerator
+    generator = ContentGenerator(api_key='benchmark', cache=ContentCache(db_path=''))
+    text = "Here is your lesson:\n" + json.dumps(stub_lesson('Parsing', sections=8), indent=2)
+
+    return measure(lambda i: generator._parse_content(text, 'Parsing'), iterations, warmup=5)
+
+
+def bench_parse_truncated(ws: Workspace, iterations: int) -> Dict:
+    """ContentGenerator._parse_content on a fenced response cut off mid-section"""
+    from src import ContentCache, ContentGenerator
+    generator = ContentGenerator(api_key='benchmark', cache=ContentCache(db_path=''))
+    text = "```json\n" + json.dumps(stub_lesson('Parsing', sections=8), indent=2)
+    text = text[:text.index('Parsing part 7')]
+
+    return measure(lambda i: generator._parse_content(text, 'Parsing'), iterations, warmup=5)
+
+
+def bench_text_frame(ws: Workspace, iterations: int) -> Dict:
+    """VideoGenerator._create_text_frame for a 1080p title slide"""
+    generator = ws.video_generator()
+    return measure(lambda i: generator._create_text_frame(f"Slide {i}"), iterations, warmup=2)
+
+
+def bench_combine_audio_video(ws: Workspace, iterations: int) -> Dict:
+    """VideoGenerator._combine_audio_video for 6 slides over 30 seconds of narration"""
+    generator = ws.video_generator()
+    frames = [generator._create_text_frame(f"Slide {i}") for i in range(6)]
+    audio_path = os.path.join(ws.path, 'narration.wav')
+    engine = SilentTTSEngine()
+    engine.save_to_file('x' * 300, audio_path)
+    engine.runAndWait()
+
+    def run(i):
+        os.remove(generator._combine_audio_video(frames, audio_path, 'Benchmark', [5.0] * 6))
+
+    return measure(run, iterations)
+
+
+BENCHMARKS = {
+    'api_generate_content': (bench_api_generate_content, 50),
+    'api_generate_video': (bench_api_generate_video, 3),
+    'parse_content': (bench_parse_content, 1000),
+    'parse_truncated': (bench_parse_truncated, 1000),
+    'text_frame': (bench_text_frame, 50),
+    'combine_audio_video': (bench_combine_audio_video, 5),
+}
+
+
+def git_revision() -> str:
+    """Return the short commit hash, marked -dirty when the tree has local changes"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=ROOT,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+    return f"{commit}-dirty" if dirty else commit
+
+
+def run_benchmarks(names: Optional[List[str]] = None, iterations: Optional[int] = None,
+                   llm_latency: float = 0.0) -> Dict:
+    """Run the named benchmarks (all by default) and return a results document"""
+    names = names or list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        raise ValueError(f"Unknown benchmarks: {', '.join(unknown)}")
+
+    ws = Workspace()
+    results = {}
+    try:
+        with stubbed_backends(llm_latency):
+            for name in names:
+                func, default_iterations = BENCHMARKS[name]
+                results[name] = func(ws, iterations or default_iterations)
+    finally:
+        ws.cleanup()
+
+    return {
+        'revision': git_revision(),
+        'created_at': datetime.utcnow().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'llm_latency_ms': llm_latency * 1000,
+        'results': results
+    }
+
+
+def compare(current: Dict, baseline: Dict, max_regression: float) -> Tuple[List[str], List[str]]:
+    """Return a report line per benchmark and the names whose p50 regressed too far"""
+    lines, regressions = [], []
+    for name, result in current['results'].items():
+        base = baseline['results'].get(name)
+        if base is None:
+            lines.append(f"{name:24} {result['p50_ms']:>10.3f} ms   (no baseline)")
+            continue
+        change = (result['p50_ms'] - base['p50_ms']) / base['p50_ms'] if base['p50_ms'] else 0.0
+        flag = ''
+        if change > max_regression:
+            flag = '  REGRESSION'
+            regressions.append(name)
+        lines.append(f"{name:24} {base['p50_ms']:>10.3f} -> {result['p50_ms']:>10.3f} ms  "
+                     f"({change:+.1%}){flag}")
+    return lines, regressions
+
+
+def format_results(document: Dict) -> List[str]:
+    """Render a results document as a table"""
+    lines = [f"revision {document['revision']}  python {document['python']}  cpus {document['cpu_count']}",
+             f"{'benchmark':24} {'ops/s':>10} {'p50 ms':>10} {'p99 ms':>10} {'rss MB':>8} {'ffmpeg MB':>10}"]
+    for name, result in document['results'].items():
+        lines.append(
+            f"{name:24} {result['ops_per_second']:>10} {result['p50_ms']:>10.3f} {result['p99_ms']:>10.3f} "
+            f"{result['peak_rss_mb']['self']:>8} {result['peak_rss_mb']['children']:>10}"
+        )
+    return lines
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('benchmarks', nargs='*', help=f"subset to run: {', '.join(BENCHMARKS)}")
+    parser.add_argument('-n', '--iterations', type=int, help='iterations per benchmark')
+    parser.add_argument('--llm-latency-ms', type=float, default=0.0, help='simulated LLM latency')
+    parser.add_argument('-o', '--output', help='results file (default: benchmarks/results/<revision>.json)')
+    parser.add_argument('--no-save', action='store_true', help='do not write a results file')
+    parser.add_argument('--compare', help='baseline results file to compare against')
+    parser.add_argument('--max-regression', type=float, default=0.2,
+                        help='fail when a p50 is this fraction slower than the baseline')
+    args = parser.parse_args(argv)
+
+    sys.path.insert(0, ROOT)
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    document = run_benchmarks(args.benchmarks, args.iterations, args.llm_latency_ms / 1000.0)
+    print("\n".join(format_results(document)))
+
+    if not args.no_save:
+        output = args.output or os.path.join(RESULTS_DIR, f"{document['revision']}.json")
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        with open(output, 'w') as f:
+            json.dump(document, f, indent=2)
+        print(f"\nSaved {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        lines, regressions = compare(document, baseline, args.max_regression)
+        print(f"\nCompared with {baseline['revision']}:")
+        print("\n".join(lines))
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
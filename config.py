@@ -11,33 +11,104 @@ class Config:
     
     # Database
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL', 'sqlite:///ai_learning.db')
+    DATABASE_READ_URL = os.getenv('DATABASE_READ_URL')  # optional read replica
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '5'))
+    DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '10'))
+    DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', '30'))
+    DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '1800'))
+    DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'True').lower() == 'true'
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000'))
     
     # API Keys
     OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
     OPENAI_MODEL = os.getenv('OPENAI_MODEL', 'gpt-3.5-turbo')
+    LLM_MAX_RETRIES = int(os.getenv('LLM_MAX_RETRIES', '4'))
+    LLM_REQUESTS_PER_MINUTE = int(os.getenv('LLM_REQUESTS_PER_MINUTE', '3000'))  # 0 disables
+    LLM_BREAKER_THRESHOLD = int(os.getenv('LLM_BREAKER_THRESHOLD', '5'))
+    LLM_BREAKER_RESET_SECONDS = int(os.getenv('LLM_BREAKER_RESET_SECONDS', '30'))
+    OPENAI_CONTEXT_TOKENS = int(os.getenv('OPENAI_CONTEXT_TOKENS', '0'))  # 0: known window of OPENAI_MODEL
+    
+    # Lesson Generation (single call, outline then parallel sections, or auto)
+    CONTENT_GENERATION_MODE = os.getenv('CONTENT_GENERATION_MODE', 'auto')
+    CONTENT_MAX_TOKENS = int(os.getenv('CONTENT_MAX_TOKENS', '2000'))
+    OUTLINE_MAX_TOKENS = int(os.getenv('OUTLINE_MAX_TOKENS', '600'))
+    SECTION_MAX_TOKENS = int(os.getenv('SECTION_MAX_TOKENS', '800'))
+    SECTION_MAX_CONCURRENCY = int(os.getenv('SECTION_MAX_CONCURRENCY', '4'))
+    CONTENT_REPAIR_ATTEMPTS = int(os.getenv('CONTENT_REPAIR_ATTEMPTS', '1'))  # 0 disables
     GOOGLE_API_KEY = os.getenv('GOOGLE_API_KEY')
     GOOGLE_SEARCH_ENGINE_ID = os.getenv('GOOGLE_SEARCH_ENGINE_ID')
     
     # Video Configuration
     VIDEO_FORMAT = os.getenv('VIDEO_FORMAT', 'mp4')
-    VIDEO_QUALITY = os.getenv('VIDEO_QUALITY', '1080p')
+    VIDEO_QUALITY = os.getenv('VIDEO_QUALITY', '1080p')  # rendition of the downloadable MP4
+    VIDEO_RENDITIONS = os.getenv('VIDEO_RENDITIONS', '360p,720p,1080p')  # HLS ladder; empty for MP4 only
+    HLS_SEGMENT_SECONDS = int(os.getenv('HLS_SEGMENT_SECONDS', '6'))
+    VIDEO_PRESET = os.getenv('VIDEO_PRESET', 'veryfast')
+    # Preview renders: one low-resolution MP4 with a faster preset, no HLS ladder
+    PREVIEW_QUALITY = os.getenv('PREVIEW_QUALITY', '480p')
+    PREVIEW_FPS = int(os.getenv('PREVIEW_FPS', '5'))  # caps VIDEO_STILL_FPS and VIDEO_FPS
+    PREVIEW_PRESET = os.getenv('PREVIEW_PRESET', 'ultrafast')
+    PREVIEW_SECTIONS = int(os.getenv('PREVIEW_SECTIONS', '0'))  # 0 renders every section
     VIDEO_FPS = int(os.getenv('VIDEO_FPS', '30'))
+    VIDEO_ENCODE_MODE = os.getenv('VIDEO_ENCODE_MODE', 'still')  # still, segments or stream
+    VIDEO_STILL_FPS = int(os.getenv('VIDEO_STILL_FPS', '1'))
+    VIDEO_SILENT_SLIDE_SECONDS = float(os.getenv('VIDEO_SILENT_SLIDE_SECONDS', '3'))
     VIDEO_DURATION_MIN = int(os.getenv('VIDEO_DURATION_MIN', '5'))
     VIDEO_DURATION_MAX = int(os.getenv('VIDEO_DURATION_MAX', '30'))
+    FRAME_RENDER_WORKERS = int(os.getenv('FRAME_RENDER_WORKERS', str(os.cpu_count() or 1)))
+    FRAME_RENDER_POOL_THRESHOLD = int(os.getenv('FRAME_RENDER_POOL_THRESHOLD', '8'))
     
     # Output Directories
     OUTPUT_DIR = os.getenv('OUTPUT_DIR', './outputs')
     VIDEO_OUTPUT_DIR = os.getenv('VIDEO_OUTPUT_DIR', './outputs/videos')
     CONTENT_OUTPUT_DIR = os.getenv('CONTENT_OUTPUT_DIR', './outputs/content')
     
+    # Video Delivery (app, x-sendfile or x-accel)
+    VIDEO_DELIVERY = os.getenv('VIDEO_DELIVERY', 'app')
+    VIDEO_ACCEL_PREFIX = os.getenv('VIDEO_ACCEL_PREFIX', '/protected/videos/')
+    VIDEO_CACHE_MAX_AGE = int(os.getenv('VIDEO_CACHE_MAX_AGE', '86400'))
+    USE_X_SENDFILE = VIDEO_DELIVERY == 'x-sendfile'
+    
     # Text-to-Speech
     TTS_ENGINE = os.getenv('TTS_ENGINE', 'pyttsx3')
     TTS_VOICE_RATE = int(os.getenv('TTS_VOICE_RATE', '150'))
     TTS_VOICE_VOLUME = float(os.getenv('TTS_VOICE_VOLUME', '0.9'))
+    TTS_VOICE = os.getenv('TTS_VOICE')
+    AUDIO_CACHE_DIR = os.getenv('AUDIO_CACHE_DIR', './outputs/audio_cache')
+    AUDIO_CACHE_MAX_MB = int(os.getenv('AUDIO_CACHE_MAX_MB', '1024'))
+    SEGMENT_CACHE_DIR = os.getenv('SEGMENT_CACHE_DIR', './outputs/segment_cache')
+    SEGMENT_CACHE_MAX_MB = int(os.getenv('SEGMENT_CACHE_MAX_MB', '4096'))
+    
+    # Near-duplicate topics reuse stored lessons above this cosine similarity (0 disables)
+    TOPIC_MATCH_THRESHOLD = float(os.getenv('TOPIC_MATCH_THRESHOLD', '0.85'))
+    
+    # Batch Generation
+    BATCH_MAX_ITEMS = int(os.getenv('BATCH_MAX_ITEMS', '200'))
+    BATCH_MAX_CONCURRENCY = int(os.getenv('BATCH_MAX_CONCURRENCY', '8'))
+    BATCH_TOKENS_PER_MINUTE = int(os.getenv('BATCH_TOKENS_PER_MINUTE', '90000'))
+    
+    # Background Jobs
+    JOB_BACKEND = os.getenv('JOB_BACKEND', 'local')  # inline, local or celery
+    JOB_WORKERS = int(os.getenv('JOB_WORKERS', '0'))  # machine-wide; 0: available CPUs / RENDER_THREADS_PER_JOB
+    RENDER_THREADS_PER_JOB = int(os.getenv('RENDER_THREADS_PER_JOB', '2'))
+    RENDER_TIMEOUT_SECONDS = float(os.getenv('RENDER_TIMEOUT_SECONDS', '1800'))
+    RENDER_MEMORY_LIMIT_MB = int(os.getenv('RENDER_MEMORY_LIMIT_MB', '0'))  # 0 disables
+    RENDER_SLOTS_DIR = os.getenv('RENDER_SLOTS_DIR', './outputs/render_slots')  # empty: per process
+    CELERY_BROKER = os.getenv('CELERY_BROKER', 'redis://localhost:6379/0')
+    CELERY_BACKEND = os.getenv('CELERY_BACKEND', 'redis://localhost:6379/0')
     
     # Caching
     CACHE_TYPE = os.getenv('CACHE_TYPE', 'simple')
     CACHE_DEFAULT_TIMEOUT = int(os.getenv('CACHE_DEFAULT_TIMEOUT', '300'))
+    CACHE_MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', '256'))
+    CACHE_MAX_DISK_ENTRIES = int(os.getenv('CACHE_MAX_DISK_ENTRIES', '10000'))
+    CACHE_DIR = os.getenv('CACHE_DIR', './outputs/cache')
+    # Serialized lesson responses kept in memory by each worker
+    CONTENT_PAYLOAD_CACHE_SIZE = int(os.getenv('CONTENT_PAYLOAD_CACHE_SIZE', '1024'))
+    
+    # Metrics (shared by all workers through a SQLite file; empty keeps them per process)
+    METRICS_DB = os.getenv('METRICS_DB', './outputs/metrics/metrics.db')
+    METRICS_FLUSH_SECONDS = float(os.getenv('METRICS_FLUSH_SECONDS', '1'))
     
     # Session
     PERMANENT_SESSION_LIFETIME = timedelta(days=7)
@@ -58,6 +129,7 @@ class TestingConfig(Config):
     DEBUG = True
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    JOB_BACKEND = 'inline'
 
 config = {
     'development': DevelopmentConfig,
@@ -1,8 +1,35 @@
 """Source package for AI Learning Platform"""
 
+import importlib
+from typing import TYPE_CHECKING
+
 __version__ = '1.0.0'
 
-from .content_generator import ContentGenerator
-from .video_generator import VideoGenerator
+# Exports are imported on first access so that API workers importing a light
+# submodule (src.database, src.jobs) never load openai, MoviePy or pyttsx3
+_LAZY_EXPORTS = {
+    'ContentGenerator': '.content_generator',
+    'VideoGenerator': '.video_generator',
+    'ContentCache': '.cache',
+}
+
+if TYPE_CHECKING:
+    from .content_generator import ContentGenerator
+    from .video_generator import VideoGenerator
+    from .cache import ContentCache
+
+__all__ = ['ContentGenerator', 'VideoGenerator', 'ContentCache']
+
+
+def __getattr__(name):
+    """Import a public class from its submodule on first access"""
+    module = _LAZY_EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
 
-__all__ = ['ContentGenerator', 'VideoGenerator']
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_EXPORTS))
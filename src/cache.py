@@ -0,0 +1,284 @@
+"""Caches for generated content, synthesized narration and encoded video segments"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from .metrics import CACHE_LOOKUPS
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_topic(topic: str) -> str:
+    """Normalize a topic string for cache lookups"""
+    return " ".join(topic.lower().split())
+
+
+class ContentCache:
+    """Size-bounded LRU cache with TTL, backed by a SQLite file shared across workers"""
+
+    def __init__(self, max_entries: Optional[int] = None, ttl: Optional[int] = None,
+                 db_path: Optional[str] = None, max_disk_entries: Optional[int] = None):
+        """Initialize the cache; pass db_path=':memory:' or '' to disable the disk tier"""
+        self.max_entries = max_entries or int(os.getenv('CACHE_MAX_ENTRIES', 256))
+        self.ttl = ttl if ttl is not None else int(os.getenv('CACHE_DEFAULT_TIMEOUT', 300))
+        self.max_disk_entries = max_disk_entries or int(os.getenv('CACHE_MAX_DISK_ENTRIES', 10000))
+        if db_path is None:
+            db_path = os.path.join(os.getenv('CACHE_DIR', './outputs/cache'), 'content_cache.db')
+        self.db_path = db_path if db_path not in ('', ':memory:') else None
+
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._counters = {'hits': 0, 'misses': 0, 'memory_hits': 0, 'disk_hits': 0, 'evictions': 0}
+
+        if self.db_path:
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            self._db().execute(
+                "CREATE TABLE IF NOT EXISTS content_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._db().execute(
+                "CREATE INDEX IF NOT EXISTS ix_content_cache_accessed ON content_cache (accessed_at)"
+            )
+
+    @staticmethod
+    def make_key(topic: str, language: str, depth: str, model: str, prompt_version: str) -> str:
+        """Build a cache key from the normalized generation parameters"""
+        parts = [normalize_topic(topic), language.strip().lower(), depth.strip().lower(),
+                 model, str(prompt_version)]
+        return hashlib.sha256(json.dumps(parts).encode('utf-8')).hexdigest()
+
+    def _db(self) -> sqlite3.Connection:
+        """Return this thread's connection to the shared cache database"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Get cached content, or None on a miss or expired entry"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._memory.move_to_end(key)
+                    self._counters['hits'] += 1
+                    self._counters['memory_hits'] += 1
+                    CACHE_LOOKUPS.inc(cache='content', result='hit')
+                    return json.loads(entry[1])
+                del self._memory[key]
+
+        if self.db_path:
+            try:
+                row = self._db().execute(
+                    "SELECT value, expires_at FROM content_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and row[1] > now:
+                    self._db().execute(
+                        "UPDATE content_cache SET accessed_at = ? WHERE key = ?", (now, key)
+                    )
+                    with self._lock:
+                        self._store_memory(key, row[0], row[1])
+                        self._counters['hits'] += 1
+                        self._counters['disk_hits'] += 1
+                    CACHE_LOOKUPS.inc(cache='content', result='hit')
+                    return json.loads(row[0])
+            except sqlite3.Error as e:
+                logger.warning(f"Content cache read failed: {str(e)}")
+
+        with self._lock:
+            self._counters['misses'] += 1
+        CACHE_LOOKUPS.inc(cache='content', result='miss')
+        return None
+
+    def set(self, key: str, value: Dict, ttl: Optional[int] = None) -> None:
+        """Set cached content"""
+        now = time.time()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        payload = json.dumps(value)
+
+        with self._lock:
+            self._store_memory(key, payload, expires_at)
+
+        if self.db_path:
+            try:
+                db = self._db()
+                db.execute(
+                    "INSERT OR REPLACE INTO content_cache (key, value, expires_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?)", (key, payload, expires_at, now)
+                )
+                self._trim_disk(db, now)
+            except sqlite3.Error as e:
+                logger.warning(f"Content cache write failed: {str(e)}")
+
+    def _store_memory(self, key: str, payload: str, expires_at: float) -> None:
+        """Insert into the memory tier, evicting least recently used entries (lock held)"""
+        self._memory[key] = (expires_at, payload)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self._counters['evictions'] += 1
+
+    def _trim_disk(self, db: sqlite3.Connection, now: float) -> None:
+        """Drop expired rows and keep the disk tier within its size bound"""
+        db.execute("DELETE FROM content_cache WHERE expires_at <= ?", (now,))
+        cursor = db.execute(
+            "DELETE FROM content_cache WHERE key IN ("
+            "SELECT key FROM content_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_disk_entries,)
+        )
+        if cursor.rowcount > 0:
+            with self._lock:
+                self._counters['evictions'] += cursor.rowcount
+
+    def delete(self, key: str) -> None:
+        """Remove a single entry from both tiers"""
+        with self._lock:
+            self._memory.pop(key, None)
+        if self.db_path:
+            self._db().execute("DELETE FROM content_cache WHERE key = ?", (key,))
+
+    def clear(self) -> None:
+        """Clear all cache"""
+        with self._lock:
+            self._memory.clear()
+        if self.db_path:
+            self._db().execute("DELETE FROM content_cache")
+
+    def stats(self) -> Dict:
+        """Return hit/miss/eviction counters for this process"""
+        with self._lock:
+            stats = dict(self._counters)
+            stats['size'] = len(self._memory)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
+
+
+class AudioCache:
+    """Content-addressed, size-bounded directory of synthesized narration segments"""
+
+    # Subclasses cache other artifacts under their own directory, size limit and metric label
+    name = 'audio'
+    default_max_mb = 1024
+
+    def __init__(self, cache_dir: Optional[str] = None, max_bytes: Optional[int] = None):
+        """Initialize the cache directory"""
+        prefix = self.name.upper()
+        self.cache_dir = cache_dir or os.getenv(
+            f'{prefix}_CACHE_DIR', os.path.join(os.getenv('OUTPUT_DIR', './outputs'), f'{self.name}_cache')
+        )
+        self.max_bytes = max_bytes or int(os.getenv(f'{prefix}_CACHE_MAX_MB', self.default_max_mb)) * 1024 * 1024
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._size = sum(size for _, size, _ in self._entries())
+
+    @staticmethod
+    def make_key(text: str, voice: str, rate: int, volume: float, engine: str) -> str:
+        """Build a cache key from the narration text and every voice setting"""
+        parts = [text, voice, rate, volume, engine]
+        return hashlib.sha256(json.dumps(parts).encode('utf-8')).hexdigest()
+
+    def path_for(self, key: str, extension: str = 'wav') -> str:
+        """Return where the segment for key is stored"""
+        return os.path.join(self.cache_dir, key[:2], f"{key}.{extension}")
+
+    def get(self, key: str, extension: str = 'wav') -> Optional[str]:
+        """Return the cached segment path, refreshing its recency, or None on a miss"""
+        path = self.path_for(key, extension)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            with self._lock:
+                self._counters['misses'] += 1
+            CACHE_LOOKUPS.inc(cache=self.name, result='miss')
+            return None
+        with self._lock:
+            self._counters['hits'] += 1
+        CACHE_LOOKUPS.inc(cache=self.name, result='hit')
+        return path
+
+    def put(self, key: str, source_path: str, extension: str = 'wav') -> str:
+        """Move a freshly synthesized file into the cache and return its cached path"""
+        path = self.path_for(key, extension)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        size = os.path.getsize(source_path)
+        os.replace(source_path, path)
+
+        with self._lock:
+            self._size += size
+            over = self._size > self.max_bytes
+        if over:
+            self.evict()
+        return path
+
+    def _entries(self):
+        """Yield (path, size, mtime) for every cached file"""
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield path, stat.st_size, stat.st_mtime
+
+    def evict(self, min_age: float = 300.0) -> None:
+        """Delete least recently used segments until the cache fits in max_bytes
+
+        Files used within the last min_age seconds are kept so renders in
+        progress never lose a segment they are about to concatenate.
+        """
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        cutoff = time.time() - min_age
+        evicted = 0
+
+        for path, size, mtime in entries:
+            if total <= self.max_bytes or mtime > cutoff:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            evicted += 1
+
+        with self._lock:
+            self._size = total
+            self._counters['evictions'] += evicted
+
+    def stats(self) -> Dict:
+        """Return hit/miss/eviction counters and the current size"""
+        with self._lock:
+            stats = dict(self._counters)
+            stats['bytes'] = self._size
+        return stats
+
+
+class SegmentCache(AudioCache):
+    """Content-addressed, size-bounded directory of encoded per-slide video chunks"""
+
+    name = 'segment'
+    default_max_mb = 4096
+
+    @staticmethod
+    def make_key(frame: Dict, audio_key: str, encoder: Dict) -> str:
+        """Build a cache key from the slide, its narration and every encoder setting"""
+        parts = [frame, audio_key, encoder]
+        return hashlib.sha256(json.dumps(parts, sort_keys=True).encode('utf-8')).hexdigest()
@@ -2,83 +2,479 @@
 
 import openai
 import logging
-import json
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional, Tuple
 from datetime import datetime
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from .cache import ContentCache
+from .singleflight import SingleFlight
+from .parsing import (LESSON_EXTRAS, LESSON_FIELDS, SectionStreamParser, parse_json_lenient, parse_lesson,
+                      string_list, validate_section)
+from .ratelimit import TokenBudget
+from .llm_client import LLMClient
+from .metrics import CONTENT_STAGE_SECONDS, LESSON_PARSES, LLM_TOKENS
+
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover - token counts fall back to the character estimate
+    tiktoken = None
 
 logger = logging.getLogger(__name__)
 
+# Context window (prompt plus completion) by model; versioned names match by prefix
+MODEL_CONTEXT_TOKENS = {
+    'gpt-3.5-turbo': 4096,
+    'gpt-3.5-turbo-16k': 16385,
+    'gpt-4': 8192,
+    'gpt-4-32k': 32768,
+    'gpt-4-turbo': 128000,
+    'gpt-4o': 128000,
+    'gpt-4o-mini': 128000,
+}
+DEFAULT_CONTEXT_TOKENS = 4096
+
+# Tokens the chat format adds around each message and to prime the reply
+MESSAGE_OVERHEAD_TOKENS = 4
+REPLY_OVERHEAD_TOKENS = 3
+
+# Smallest completion worth sending a request for
+MIN_COMPLETION_TOKENS = 100
+
+GENERATION_MODES = ('single', 'sections', 'auto')
+
+# Encoding by model; None records one that could not be loaded
+_encodings: Dict[str, object] = {}
+
+
+def estimate_tokens(text: str) -> int:
+    """Roughly estimate the token count of text (about four characters per token)"""
+    return max(1, (len(text) + 3) // 4) if text else 0
+
+
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    """Count the tokens of text with the model's tokenizer, estimating them without tiktoken"""
+    if not text:
+        return 0
+    if tiktoken is None:
+        return estimate_tokens(text)
+    if model not in _encodings:
+        try:
+            try:
+                _encodings[model] = tiktoken.encoding_for_model(model)
+            except KeyError:
+                _encodings[model] = tiktoken.get_encoding('cl100k_base')
+        except Exception as e:
+            # Encodings are downloaded on first use, which fails offline
+            logger.warning(f"Could not load the tokenizer for {model}, estimating token counts: {str(e)}")
+            _encodings[model] = None
+    encoding = _encodings[model]
+    return len(encoding.encode(text)) if encoding is not None else estimate_tokens(text)
+
+
+def context_window(model: str) -> int:
+    """Return the context window of a model in tokens"""
+    for name in sorted(MODEL_CONTEXT_TOKENS, key=len, reverse=True):
+        if model == name or model.startswith(name + '-'):
+            return MODEL_CONTEXT_TOKENS[name]
+    return DEFAULT_CONTEXT_TOKENS
+
 
 class ContentGenerator:
     """Generate educational content using OpenAI GPT API"""
     
-    def __init__(self, api_key: Optional[str] = None):
+    # Bump whenever _create_prompt changes so cached lessons are regenerated
+    PROMPT_VERSION = '1'
+    
+    DEPTH_INSTRUCTIONS = {
+        'basic': 'Cover fundamentals only, simple language suitable for beginners',
+        'intermediate': 'Cover key concepts with some depth, suitable for learners with basic knowledge',
+        'advanced': 'Provide comprehensive coverage with advanced concepts and technical details'
+    }
+    
+    # Sections asked of the outline, so deeper lessons spread over more (smaller) calls
+    SECTION_COUNTS = {'basic': 3, 'intermediate': 5, 'advanced': 7}
+    
+    def __init__(self, api_key: Optional[str] = None, cache: Optional[ContentCache] = None,
+                 client: Optional[LLMClient] = None):
         """Initialize content generator with OpenAI API key"""
         self.api_key = api_key or os.getenv('OPENAI_API_KEY')
         self.model = os.getenv('OPENAI_MODEL', 'gpt-3.5-turbo')
-        self.max_tokens = 2000
+        self.max_tokens = int(os.getenv('CONTENT_MAX_TOKENS', 2000))
+        self.generation_mode = os.getenv('CONTENT_GENERATION_MODE', 'auto')
+        self.outline_max_tokens = int(os.getenv('OUTLINE_MAX_TOKENS', 600))
+        self.section_max_tokens = int(os.getenv('SECTION_MAX_TOKENS', 800))
+        self.section_concurrency = int(os.getenv('SECTION_MAX_CONCURRENCY', 4))
+        # Follow-up calls for the parts of a truncated or malformed response (0 disables)
+        self.repair_attempts = int(os.getenv('CONTENT_REPAIR_ATTEMPTS', 1))
+        self.context_tokens = int(os.getenv('OPENAI_CONTEXT_TOKENS', 0)) or context_window(self.model)
+        self.cache = cache if cache is not None else ContentCache()
+        # One tokens-per-minute budget for every batch this generator runs, so concurrent
+        # batch requests share it rather than each getting the full rate
+        self.batch_budget = TokenBudget(int(os.getenv('BATCH_TOKENS_PER_MINUTE', 90000)))
+        self.flight = SingleFlight()
+        self.client = client or LLMClient()
         
         if not self.api_key:
             raise ValueError("OPENAI_API_KEY not found in environment variables")
         
+        if self.generation_mode not in GENERATION_MODES:
+            raise ValueError(f"CONTENT_GENERATION_MODE must be one of: {', '.join(GENERATION_MODES)}")
+        
         openai.api_key = self.api_key
     
     def generate(self, topic: str, language: str = 'en', depth: str = 'intermediate') -> Dict:
         """Generate educational content for a given topic"""
         try:
-            logger.info(f"Generating content for topic: {topic}")
+            cache_key = self.cache_key(topic, language, depth)
+            cached = self._cached(cache_key)
+            if cached is not None:
+                logger.info(f"Cache hit for topic: {topic}")
+                return cached
             
-            # Create prompt
-            prompt = self._create_prompt(topic, language, depth)
+            # Identical concurrent requests wait for a single API call
+            result, shared = self.flight.do(
+                cache_key,
+                lambda: self._generate(topic, language, depth, cache_key),
+                lookup=lambda: self._cached(cache_key)
+            )
+            if shared:
+                result['tokens_used'] = 0
+            return result
+        
+        except openai.error.APIError as e:
+            logger.error(f"OpenAI API error: {str(e)}")
+            raise
+        except Exception as e:
+            logger.error(f"Error generating content: {str(e)}")
+            raise
+    
+    def generate_many(self, items: List[Dict], max_concurrency: Optional[int] = None,
+                      tokens_per_minute: Optional[int] = None) -> Dict:
+        """Generate several lessons concurrently under a concurrency and token budget
+        
+        Each item is a dict with ``topic`` and optional ``language``/``depth``.
+        Failures are reported per item; successful lessons are still returned.
+        Batches share the generator's token budget unless tokens_per_minute
+        gives this one its own.
+        """
+        max_concurrency = max_concurrency or int(os.getenv('BATCH_MAX_CONCURRENCY', 8))
+        budget = TokenBudget(tokens_per_minute) if tokens_per_minute else self.batch_budget
+        started = time.monotonic()
+        
+        def run(index: int, item: Dict) -> Dict:
+            topic = item.get('topic')
+            if not topic:
+                return {'index': index, 'status': 'failed', 'error': 'Topic is required'}
+            if not isinstance(topic, str):
+                return {'index': index, 'status': 'failed', 'error': 'Topic must be a string'}
+            language = item.get('language', 'en')
+            depth = item.get('depth', 'intermediate')
             
+            try:
+                cached = self._cached(self.cache_key(topic, language, depth))
+                if cached is not None:
+                    return {'index': index, 'status': 'completed', 'content': cached}
+                
+                estimate = self.estimate_request_tokens(topic, language, depth)
+                reservation = budget.acquire(estimate)
+                tokens_used = 0
+                try:
+                    content = self.generate(topic, language, depth)
+                    tokens_used = content['tokens_used']
+                finally:
+                    budget.settle(reservation, tokens_used)
+                return {'index': index, 'status': 'completed', 'content': content}
+            except Exception as e:
+                return {'index': index, 'status': 'failed', 'error': str(e)}
+        
+        with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+            results = list(executor.map(lambda pair: run(*pair), enumerate(items)))
+        
+        elapsed = time.monotonic() - started
+        succeeded = [r['content'] for r in results if r['status'] == 'completed']
+        tokens_used = sum(content['tokens_used'] for content in succeeded)
+        summary = {
+            'total': len(items),
+            'succeeded': len(succeeded),
+            'failed': len(items) - len(succeeded),
+            'cached': sum(1 for content in succeeded if content.get('cached')),
+            'tokens_used': tokens_used,
+            'elapsed_seconds': round(elapsed, 3),
+            'lessons_per_second': round(len(succeeded) / elapsed, 3) if elapsed else None,
+            'tokens_per_second': round(tokens_used / elapsed, 3) if elapsed else None
+        }
+        logger.info(f"Batch generated {summary['succeeded']}/{summary['total']} lessons "
+                    f"in {summary['elapsed_seconds']}s using {tokens_used} tokens")
+        
+        return {'results': results, 'summary': summary}
+    
+    def _cached(self, cache_key: str) -> Optional[Dict]:
+        """Return a cached lesson marked as free of token cost, if present"""
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            cached['cached'] = True
+            cached['tokens_used'] = 0
+        return cached
+    
+    def _generate(self, topic: str, language: str, depth: str, cache_key: str) -> Dict:
+        """Call the OpenAI API for a lesson and cache the result"""
+        logger.info(f"Generating content for topic: {topic}")
+        
+        # Create prompt
+        with CONTENT_STAGE_SECONDS.time(stage='prompt'):
+            prompt = self._create_prompt(topic, language, depth)
+            messages = self._create_messages(prompt)
+        
+        if self._use_sections(messages, depth):
+            for event, data in self._generate_sections(topic, language, depth):
+                if event == 'lesson':
+                    structured_content, tokens_used = data
+        else:
             # Call OpenAI API
-            response = openai.ChatCompletion.create(
+            with CONTENT_STAGE_SECONDS.time(stage='llm'):
+                content_text, tokens_used = self._complete(messages, self.max_tokens, mode='complete')
+            
+            # Parse content, then re-request only what a truncated or malformed response lacks
+            with CONTENT_STAGE_SECONDS.time(stage='parse'):
+                parsed = parse_lesson(content_text)
+            tokens_used += self._request_missing(topic, language, depth, parsed)
+            structured_content = self._fill_lesson(parsed['lesson'], content_text, topic)
+        
+        result = self._build_result(structured_content, topic, language, depth, tokens_used)
+        self.cache.set(cache_key, result)
+        return result
+    
+    def generate_stream(self, topic: str, language: str = 'en',
+                        depth: str = 'intermediate') -> Iterator[Tuple[str, Dict]]:
+        """Generate content, yielding (event, data) pairs as each part is completed
+        
+        Events are ``field`` (title/description), ``section`` (one per closed
+        section) and finally ``done`` with the same dict ``generate`` returns.
+        """
+        cache_key = self.cache_key(topic, language, depth)
+        cached = self._cached(cache_key)
+        if cached is not None:
+            logger.info(f"Cache hit for topic: {topic}")
+            for name in SectionStreamParser.FIELDS:
+                yield 'field', {'name': name, 'value': cached[name]}
+            for index, section in enumerate(cached['sections']):
+                yield 'section', {'index': index, 'section': section}
+            yield 'done', cached
+            return
+        
+        logger.info(f"Streaming content for topic: {topic}")
+        with CONTENT_STAGE_SECONDS.time(stage='prompt'):
+            prompt = self._create_prompt(topic, language, depth)
+            messages = self._create_messages(prompt)
+        
+        if self._use_sections(messages, depth):
+            # Sections are generated in parallel and emitted in order as each completes
+            for event, data in self._generate_sections(topic, language, depth):
+                if event == 'lesson':
+                    structured_content, tokens_used = data
+                else:
+                    yield event, data
+            result = self._build_result(structured_content, topic, language, depth, tokens_used)
+            self.cache.set(cache_key, result)
+            yield 'done', result
+            return
+        
+        prompt_tokens, max_tokens = self._completion_budget(messages, self.max_tokens)
+        started = time.perf_counter()
+        try:
+            response = self.client.chat_completion(
                 model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are an expert educational content creator. Create comprehensive, engaging, and accurate learning materials."},
-                    {"role": "user", "content": prompt}
-                ],
+                messages=messages,
                 temperature=0.7,
-                max_tokens=self.max_tokens,
-                top_p=0.9
+                max_tokens=max_tokens,
+                top_p=0.9,
+                stream=True
             )
             
-            # Extract content
-            content_text = response['choices'][0]['message']['content']
-            
-            # Parse content
-            structured_content = self._parse_content(content_text, topic)
-            
-            return {
-                'id': hash(topic + datetime.now().isoformat()),
-                'topic': topic,
-                'title': structured_content['title'],
-                'description': structured_content['description'],
-                'sections': structured_content['sections'],
-                'key_points': structured_content['key_points'],
-                'language': language,
-                'depth': depth,
-                'created_at': datetime.utcnow().isoformat(),
-                'status': 'completed',
-                'tokens_used': response['usage']['total_tokens']
-            }
+            parser = SectionStreamParser()
+            for chunk in response:
+                delta = chunk['choices'][0].get('delta', {}).get('content')
+                if delta:
+                    yield from parser.feed(delta)
         
         except openai.error.APIError as e:
             logger.error(f"OpenAI API error: {str(e)}")
             raise
-        except Exception as e:
-            logger.error(f"Error generating content: {str(e)}")
-            raise
+        
+        # Time to the last token, including the caller's pauses between events
+        CONTENT_STAGE_SECONDS.observe(time.perf_counter() - started, stage='llm')
+        
+        # Streaming responses carry no usage block, so count tokens locally
+        content_text = parser.buffer
+        tokens_used = prompt_tokens + count_tokens(content_text, self.model)
+        LLM_TOKENS.inc(tokens_used, model=self.model, mode='stream')
+        
+        with CONTENT_STAGE_SECONDS.time(stage='parse'):
+            parsed = parse_lesson(content_text)
+        salvaged = len(parsed['lesson'].get('sections', []))
+        tokens_used += self._request_missing(topic, language, depth, parsed)
+        structured_content = self._fill_lesson(parsed['lesson'], content_text, topic)
+        
+        # Sections recovered by a follow-up call continue the stream
+        for offset, section in enumerate(structured_content['sections'][salvaged:]):
+            yield 'section', {'index': len(parser.sections) + offset, 'section': section}
+        
+        result = self._build_result(structured_content, topic, language, depth, tokens_used)
+        self.cache.set(cache_key, result)
+        yield 'done', result
+    
+    def _generate_sections(self, topic: str, language: str,
+                           depth: str) -> Iterator[Tuple[str, object]]:
+        """Generate a lesson from an outline call and parallel per-section calls
+        
+        Yields ``field`` and ``section`` events as the parts complete, sections in
+        order, and finally ``lesson`` with the structured content and tokens used.
+        """
+        with CONTENT_STAGE_SECONDS.time(stage='outline'):
+            messages = self._create_messages(self._create_outline_prompt(topic, language, depth))
+            tokens_used = 0
+            for attempt in range(1 + self.repair_attempts):
+                outline_text, used = self._complete(messages, self.outline_max_tokens, mode='outline')
+                tokens_used += used
+                outline = self._parse_outline(outline_text)
+                if outline is not None:
+                    break
+                logger.warning(f"Failed to parse outline for {topic} (attempt {attempt + 1})")
+            else:
+                outline = self._fallback_outline(topic)
+        
+        for name in SectionStreamParser.FIELDS:
+            yield 'field', {'name': name, 'value': outline[name]}
+        
+        planned = outline['sections']
+        sections = []
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max(1, min(self.section_concurrency, len(planned)))) as executor:
+            futures = [executor.submit(self._generate_section, topic, language, depth, outline, index)
+                       for index in range(len(planned))]
+            for index, future in enumerate(futures):
+                section, section_tokens = future.result()
+                tokens_used += section_tokens
+                sections.append(section)
+                yield 'section', {'index': index, 'section': section}
+        CONTENT_STAGE_SECONDS.observe(time.perf_counter() - started, stage='sections')
+        
+        structured_content = {
+            'title': outline['title'],
+            'description': outline['description'],
+            'sections': sections,
+            'key_points': outline['key_points'],
+            'learning_objectives': outline['learning_objectives'],
+            'fun_facts': outline['fun_facts']
+        }
+        yield 'lesson', (structured_content, tokens_used)
+    
+    def _generate_section(self, topic: str, language: str, depth: str,
+                          outline: Dict, index: int) -> Tuple[Dict, int]:
+        """Write one section of an outlined lesson, returning it and the tokens used"""
+        planned = outline['sections'][index]
+        messages = self._create_messages(self._create_section_prompt(topic, language, depth, outline, index))
+        tokens_used = 0
+        
+        # Only this section is requested again when its answer is unusable
+        for attempt in range(1 + self.repair_attempts):
+            content_text, used = self._complete(messages, self.section_max_tokens, mode='section')
+            tokens_used += used
+            section = validate_section(parse_json_lenient(content_text)[0])
+            if section is not None:
+                LESSON_PARSES.inc(outcome='complete' if attempt == 0 else 'repaired')
+                return section, tokens_used
+        
+        LESSON_PARSES.inc(outcome='failed')
+        logger.warning(f"Failed to parse section {index} of {topic}, using its outline summary")
+        return {'title': planned['title'], 'content': planned['summary'], 'key_points': []}, tokens_used
+    
+    def _complete(self, messages: List[Dict], max_tokens: int, mode: str) -> Tuple[str, int]:
+        """Send one chat completion within the context budget, returning its text and tokens used"""
+        _, max_tokens = self._completion_budget(messages, max_tokens)
+        response = self.client.chat_completion(
+            model=self.model,
+            messages=messages,
+            temperature=0.7,
+            max_tokens=max_tokens,
+            top_p=0.9
+        )
+        tokens_used = response['usage']['total_tokens']
+        LLM_TOKENS.inc(tokens_used, model=self.model, mode=mode)
+        return response['choices'][0]['message']['content'], tokens_used
+    
+    def _prompt_tokens(self, messages: List[Dict]) -> int:
+        """Count the tokens messages occupy in the model's context"""
+        return REPLY_OVERHEAD_TOKENS + sum(
+            MESSAGE_OVERHEAD_TOKENS + count_tokens(message['content'], self.model) for message in messages
+        )
+    
+    def _completion_budget(self, messages: List[Dict], max_tokens: int) -> Tuple[int, int]:
+        """Return the prompt's token count and the completion budget left for it in the context
+        
+        Raises ValueError without calling the API when the prompt leaves no useful room.
+        """
+        prompt_tokens = self._prompt_tokens(messages)
+        room = self.context_tokens - prompt_tokens
+        if room < min(max_tokens, MIN_COMPLETION_TOKENS):
+            raise ValueError(f"Prompt of {prompt_tokens} tokens does not fit the "
+                             f"{self.context_tokens}-token context of {self.model}")
+        return prompt_tokens, min(max_tokens, room)
+    
+    def _use_sections(self, messages: List[Dict], depth: str) -> bool:
+        """Return whether a lesson should be generated outline-first, section by section"""
+        if self.generation_mode != 'auto':
+            return self.generation_mode == 'sections'
+        # Advanced lessons outgrow a single completion; so does any prompt that leaves too little room
+        return depth == 'advanced' or self.context_tokens - self._prompt_tokens(messages) < self.max_tokens
+    
+    def estimate_request_tokens(self, topic: str, language: str = 'en', depth: str = 'intermediate') -> int:
+        """Return the most tokens generating a lesson may consume, counted before sending"""
+        messages = self._create_messages(self._create_prompt(topic, language, depth))
+        if not self._use_sections(messages, depth):
+            return self._prompt_tokens(messages) + self.max_tokens
+        
+        outline_tokens = self._prompt_tokens(self._create_messages(
+            self._create_outline_prompt(topic, language, depth))) + self.outline_max_tokens
+        # Section prompts carry the outline, so each costs about an outline call plus its answer
+        section_tokens = outline_tokens + self.section_max_tokens
+        return outline_tokens + self.SECTION_COUNTS.get(depth, self.SECTION_COUNTS['intermediate']) * section_tokens
+    
+    def _create_messages(self, prompt: str) -> List[Dict]:
+        """Wrap a prompt in the chat messages sent to the API"""
+        return [
+            {"role": "system", "content": "You are an expert educational content creator. Create comprehensive, engaging, and accurate learning materials."},
+            {"role": "user", "content": prompt}
+        ]
+    
+    def _build_result(self, structured_content: Dict, topic: str, language: str,
+                      depth: str, tokens_used: int) -> Dict:
+        """Assemble the lesson dict returned to callers"""
+        return {
+            'id': hash(topic + datetime.now().isoformat()),
+            'topic': topic,
+            'title': structured_content['title'],
+            'description': structured_content['description'],
+            'sections': structured_content['sections'],
+            'key_points': structured_content['key_points'],
+            'learning_objectives': structured_content.get('learning_objectives', []),
+            'fun_facts': structured_content.get('fun_facts', []),
+            'language': language,
+            'depth': depth,
+            'created_at': datetime.utcnow().isoformat(),
+            'status': 'completed',
+            'tokens_used': tokens_used
+        }
+    
+    def cache_key(self, topic: str, language: str = 'en', depth: str = 'intermediate') -> str:
+        """Return the cache key for a generation request"""
+        return ContentCache.make_key(topic, language, depth, self.model, self.PROMPT_VERSION)
     
     def _create_prompt(self, topic: str, language: str, depth: str) -> str:
         """Create a detailed prompt for content generation"""
         
-        depth_instructions = {
-            'basic': 'Cover fundamentals only, simple language suitable for beginners',
-            'intermediate': 'Cover key concepts with some depth, suitable for learners with basic knowledge',
-            'advanced': 'Provide comprehensive coverage with advanced concepts and technical details'
-        }
+        depth_instructions = self.DEPTH_INSTRUCTIONS
         
         prompt = f"""
 Create comprehensive educational content for the topic: "{topic}"
@@ -121,37 +517,192 @@ Ensure the content is:
 """
         return prompt
     
-    def _parse_content(self, content_text: str, topic: str) -> Dict:
-        """Parse the GPT response into structured content"""
-        try:
-            # Try to extract JSON from the response
-            json_start = content_text.find('{')
-            json_end = content_text.rfind('}') + 1
-            
-            if json_start >= 0 and json_end > json_start:
-                json_str = content_text[json_start:json_end]
-                parsed = json.loads(json_str)
-            else:
-                # Fallback if no JSON found
-                parsed = {
-                    'title': f'Learning {topic}',
-                    'description': content_text[:200],
-                    'sections': [{'title': 'Content', 'content': content_text, 'key_points': []}],
-                    'key_points': [],
-                    'learning_objectives': []
-                }
-            
-            return parsed
+    def _create_outline_prompt(self, topic: str, language: str, depth: str) -> str:
+        """Create the prompt for a lesson outline, whose sections are written by separate calls"""
+        depth_instructions = self.DEPTH_INSTRUCTIONS
+        count = self.SECTION_COUNTS.get(depth, self.SECTION_COUNTS['intermediate'])
+        
+        return f"""
+Plan educational content for the topic: "{topic}"
+
+Depth Level: {depth_instructions.get(depth, depth_instructions['intermediate'])}
+Language: {'English' if language == 'en' else language}
+
+Provide an outline of about {count} sections, the last one being "Key Takeaways", in the following JSON format:
+{{
+    "title": "Topic Title",
+    "description": "2-3 sentence overview",
+    "sections": [
+        {{"title": "Section 1", "summary": "One sentence on what the section covers"}}
+    ],
+    "key_points": ["main_point_1", "main_point_2", "main_point_3"],
+    "learning_objectives": ["objective_1", "objective_2"],
+    "fun_facts": ["fact_1", "fact_2"]
+}}
+"""
+    
+    def _create_section_prompt(self, topic: str, language: str, depth: str,
+                               outline: Dict, index: int) -> str:
+        """Create the prompt for one section of an outlined lesson"""
+        depth_instructions = self.DEPTH_INSTRUCTIONS
+        planned = outline['sections'][index]
+        plan = "\n".join(f"{i + 1}. {section['title']}" for i, section in enumerate(outline['sections']))
         
-        except json.JSONDecodeError:
+        return f"""
+Write one section of the lesson "{outline['title']}" on the topic: "{topic}"
+
+Depth Level: {depth_instructions.get(depth, depth_instructions['intermediate'])}
+Language: {'English' if language == 'en' else language}
+
+Lesson outline:
+{plan}
+
+Write section {index + 1}, "{planned['title']}": {planned['summary']}
+Do not repeat material belonging to the other sections.
+
+Provide the section in the following JSON format:
+{{
+    "title": "{planned['title']}",
+    "content": "Detailed explanation suitable for video narration, with practical examples",
+    "key_points": ["point1", "point2", "point3"]
+}}
+"""
+    
+    def _create_missing_prompt(self, topic: str, language: str, depth: str,
+                               lesson: Dict, missing: List[str]) -> str:
+        """Create the prompt asking only for the parts a salvaged lesson lacks"""
+        depth_instructions = self.DEPTH_INSTRUCTIONS
+        templates = {
+            'title': '"title": "Topic Title"',
+            'description': '"description": "2-3 sentence overview"',
+            'sections': '"sections": [{"title": "Section title", "content": "Detailed explanation", '
+                        '"key_points": ["point1", "point2"]}]',
+            'key_points': '"key_points": ["main_point_1", "main_point_2", "main_point_3"]'
+        }
+        template = "{\n" + ",\n".join(f"    {templates[name]}" for name in missing) + "\n}"
+        
+        written = lesson.get('sections', [])
+        if 'sections' not in missing:
+            progress = ''
+        elif written:
+            plan = "\n".join(f"{i + 1}. {section['title']}" for i, section in enumerate(written))
+            progress = (f"These sections are already written:\n{plan}\n"
+                        f"Write only the sections that follow them, ending with \"Key Takeaways\".")
+        else:
+            progress = 'Write every section of the lesson, ending with "Key Takeaways".'
+        
+        return f"""
+Complete the educational content for the topic: "{topic}", titled "{lesson.get('title', topic)}"
+
+Depth Level: {depth_instructions.get(depth, depth_instructions['intermediate'])}
+Language: {'English' if language == 'en' else language}
+
+The previous response was cut short. Provide only the missing parts: {', '.join(missing)}.
+{progress}
+
+Provide the missing parts in the following JSON format:
+{template}
+"""
+    
+    def _parse_outline(self, content_text: str) -> Optional[Dict]:
+        """Parse an outline response, keeping sections that have a title; None if it has none"""
+        parsed, _ = parse_json_lenient(content_text)
+        if not isinstance(parsed, dict):
+            return None
+        
+        sections = []
+        for section in parsed.get('sections') or []:
+            if isinstance(section, dict) and isinstance(section.get('title'), str) and section['title'].strip():
+                summary = section.get('summary') or section.get('content') or section['title']
+                sections.append({'title': section['title'], 'summary': summary})
+        if not sections:
+            return None
+        
+        outline = {
+            'title': parsed.get('title') or sections[0]['title'],
+            'description': parsed.get('description') or '',
+            'sections': sections,
+            'key_points': string_list(parsed.get('key_points'))
+        }
+        outline.update((name, string_list(parsed.get(name))) for name in LESSON_EXTRAS)
+        return outline
+    
+    def _fallback_outline(self, topic: str) -> Dict:
+        """Return a single-section outline for when no outline could be parsed"""
+        logger.warning("Failed to parse outline, writing the lesson as a single section")
+        return {
+            'title': f'Learning {topic}',
+            'description': '',
+            'sections': [{'title': f'Learning {topic}', 'summary': f'An overview of {topic}'}],
+            'key_points': [],
+            'learning_objectives': [],
+            'fun_facts': []
+        }
+    
+    def _request_missing(self, topic: str, language: str, depth: str, parsed: Dict) -> int:
+        """Request the parts a salvaged lesson lacks and merge them in place, returning the tokens used
+        
+        Nothing is requested when nothing could be salvaged; the caller falls back instead.
+        """
+        lesson = parsed['lesson']
+        if not any(name in lesson for name in LESSON_FIELDS):
+            LESSON_PARSES.inc(outcome='failed')
+            return 0
+        if not parsed['missing']:
+            LESSON_PARSES.inc(outcome='complete')
+            return 0
+        
+        tokens_used = 0
+        for _ in range(self.repair_attempts):
+            logger.info(f"Requesting missing parts of {topic}: {', '.join(parsed['missing'])}")
+            prompt = self._create_missing_prompt(topic, language, depth, lesson, parsed['missing'])
+            with CONTENT_STAGE_SECONDS.time(stage='repair'):
+                content_text, used = self._complete(self._create_messages(prompt), self.max_tokens, mode='repair')
+            tokens_used += used
+            parsed['missing'] = self._merge_missing(lesson, parse_lesson(content_text), parsed['missing'])
+            if not parsed['missing']:
+                break
+        
+        LESSON_PARSES.inc(outcome='partial' if parsed['missing'] else 'repaired')
+        return tokens_used
+    
+    def _merge_missing(self, lesson: Dict, extra: Dict, missing: List[str]) -> List[str]:
+        """Merge the parts a follow-up response supplied into lesson, returning those still missing"""
+        still_missing = []
+        for name in missing:
+            value = extra['lesson'].get(name)
+            if name == 'sections':
+                known = {section['title'] for section in lesson.get('sections', [])}
+                added = [section for section in value or [] if section['title'] not in known]
+                lesson['sections'] = lesson.get('sections', []) + added
+                # A follow-up cut short may still be missing sections; an empty one means there are no more
+                if not lesson['sections'] or (added and 'sections' in extra['missing']):
+                    still_missing.append(name)
+            elif value is not None and name not in extra['missing']:
+                lesson[name] = value
+            else:
+                still_missing.append(name)
+        return still_missing
+    
+    def _fill_lesson(self, lesson: Dict, content_text: str, topic: str) -> Dict:
+        """Complete a parsed lesson with defaults, or wrap unparsable text as a single section"""
+        if not any(name in lesson for name in LESSON_FIELDS):
             logger.warning("Failed to parse JSON response, using fallback")
             return {
                 'title': f'Learning {topic}',
                 'description': content_text[:200],
                 'sections': [{'title': 'Content', 'content': content_text, 'key_points': []}],
                 'key_points': [],
-                'learning_objectives': []
+                'learning_objectives': [],
+                'fun_facts': []
             }
+        defaults = {'title': f'Learning {topic}', 'description': '', 'sections': [], 'key_points': [],
+                    'learning_objectives': [], 'fun_facts': []}
+        return dict(defaults, **lesson)
+    
+    def _parse_content(self, content_text: str, topic: str) -> Dict:
+        """Parse the GPT response into structured content, salvaging what a malformed response holds"""
+        return self._fill_lesson(parse_lesson(content_text)['lesson'], content_text, topic)
     
     def generate_script(self, content: Dict) -> str:
         """Generate a video script from the content"""
@@ -191,21 +742,3 @@ Key Points:
         
         return summary
 
-
-class ContentCache:
-    """Simple cache for generated content"""
-    
-    def __init__(self):
-        self.cache = {}
-    
-    def get(self, key: str) -> Optional[Dict]:
-        """Get cached content"""
-        return self.cache.get(key)
-    
-    def set(self, key: str, value: Dict) -> None:
-        """Set cached content"""
-        self.cache[key] = value
-    
-    def clear(self) -> None:
-        """Clear all cache"""
-        self.cache.clear()
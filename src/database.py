@@ -0,0 +1,51 @@
+"""Database engine tuning: connection pooling and SQLite concurrency settings"""
+
+import logging
+import sqlite3
+from typing import Dict
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, make_url
+
+logger = logging.getLogger(__name__)
+
+
+def build_engine_options(uri: str, settings: Dict) -> Dict:
+    """Return SQLAlchemy engine options for uri from DB_* settings
+
+    Server databases get a bounded, pre-pinged, recycled connection pool.
+    File-backed SQLite gets a busy timeout so writers wait instead of failing
+    with "database is locked"; in-memory SQLite keeps Flask-SQLAlchemy's
+    single shared connection.
+    """
+    url = make_url(uri)
+    options = {'pool_pre_ping': settings.get('DB_POOL_PRE_PING', True)}
+
+    if url.get_backend_name() == 'sqlite':
+        if url.database in (None, '', ':memory:'):
+            return {}
+        options['connect_args'] = {
+            'timeout': settings.get('SQLITE_BUSY_TIMEOUT_MS', 5000) / 1000.0,
+            'check_same_thread': False
+        }
+
+    options.update({
+        'pool_size': settings.get('DB_POOL_SIZE', 5),
+        'max_overflow': settings.get('DB_MAX_OVERFLOW', 10),
+        'pool_timeout': settings.get('DB_POOL_TIMEOUT', 30),
+        'pool_recycle': settings.get('DB_POOL_RECYCLE', 1800)
+    })
+    return options
+
+
+@event.listens_for(Engine, 'connect')
+def _configure_sqlite(dbapi_connection, connection_record):
+    """Switch SQLite connections to WAL so readers never block the writer"""
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+    finally:
+        cursor.close()
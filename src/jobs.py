@@ -0,0 +1,437 @@
+"""Background job queue for long-running render tasks"""
+
+import heapq
+import itertools
+import logging
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .metrics import JOB_RUN_SECONDS, JOB_WAIT_SECONDS, registry
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - without it each server process keeps its own slots
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUED = 'queued'
+JOB_PROCESSING = 'processing'
+JOB_COMPLETED = 'completed'
+JOB_FAILED = 'failed'
+
+JOB_STATUSES = (JOB_QUEUED, JOB_PROCESSING, JOB_COMPLETED, JOB_FAILED)
+
+# Lower values start first; both fit Celery's 0-9 message priority range
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BULK = 9
+JOB_PRIORITIES = {'interactive': PRIORITY_INTERACTIVE, 'bulk': PRIORITY_BULK}
+
+# Exit status of a job process that ran out of memory under its limit
+EXIT_OUT_OF_MEMORY = 3
+
+# Slots freed by other server processes cannot wake the dispatcher, so it polls for them
+SLOT_POLL_SECONDS = 0.5
+
+
+def _priority_name(priority: int) -> str:
+    """Return the label for a priority value"""
+    for name, value in JOB_PRIORITIES.items():
+        if value == priority:
+            return name
+    return str(priority)
+
+
+def available_cpus() -> int:
+    """Return the CPUs this process may use, honouring affinity and a cgroup v2 quota"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            quota, period = f.read().split()[:2]
+        if quota != 'max':
+            cpus = min(cpus, max(1, int(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return max(1, cpus)
+
+
+def _run_job(func: Callable, args: tuple, initializer: Optional[Callable], threads: int,
+             memory_limit_mb: int) -> None:
+    """Child process entry point: apply the job's resource limits, then run it"""
+    # Lead a process group so a timeout can kill the job's ffmpeg children too
+    if hasattr(os, 'setpgrp'):
+        os.setpgrp()
+    if memory_limit_mb:
+        import resource
+        limit = memory_limit_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    os.environ['RENDER_THREADS'] = str(threads)
+
+    try:
+        if initializer is not None:
+            initializer()
+        func(*args)
+    except MemoryError:
+        logger.error(f"Job {func.__name__}{args} ran out of memory")
+        sys.exit(EXIT_OUT_OF_MEMORY)
+    finally:
+        # Forked children skip atexit handlers, so publish their metrics now
+        try:
+            registry.flush()
+        except Exception:
+            pass
+
+
+def _kill_process_group(pid: int) -> None:
+    """Kill a job process and everything it started"""
+    try:
+        if hasattr(os, 'killpg'):
+            os.killpg(pid, signal.SIGKILL)
+        else:
+            os.kill(pid, signal.SIGTERM)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+class RenderSlots:
+    """Render slots shared by every server process on the machine through lock files
+
+    Each slot is a POSIX record lock on its own file in directory. The kernel
+    drops a process's locks when it exits, so a crashed worker never leaks a
+    slot, and the render processes it forks do not inherit them. Record locks
+    never conflict within one process, so slots held here are tracked too.
+    """
+
+    def __init__(self, directory: str, count: int):
+        """Initialize count slots under directory"""
+        self.directory = directory
+        self.count = count
+        self._files: Dict[int, object] = {}
+        self._held = set()
+
+    def acquire(self) -> Optional[int]:
+        """Take a free slot and return its number, or None while all are taken"""
+        os.makedirs(self.directory, exist_ok=True)
+        for slot in range(self.count):
+            if slot in self._held:
+                continue
+            # Closing any handle on the file would drop the lock, so each stays open
+            if slot not in self._files:
+                self._files[slot] = open(os.path.join(self.directory, f'slot-{slot}.lock'), 'a')
+            try:
+                fcntl.lockf(self._files[slot], fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                continue
+            self._held.add(slot)
+            return slot
+        return None
+
+    def release(self, slot: int) -> None:
+        """Give a slot back"""
+        self._held.discard(slot)
+        fcntl.lockf(self._files[slot], fcntl.LOCK_UN)
+
+
+class JobBackend:
+    """Base class for job execution backends"""
+
+    name = 'base'
+    # Called as on_failure(func, args, reason) when a job dies without handling its own error
+    on_failure: Optional[Callable] = None
+
+    def register(self, func: Callable) -> Callable:
+        """Register a job function with the backend"""
+        return func
+
+    def submit(self, func: Callable, *args, priority: int = PRIORITY_INTERACTIVE) -> None:
+        """Schedule a registered job function for execution"""
+        raise NotImplementedError
+
+    def stats(self) -> Dict:
+        """Return queue statistics"""
+        return {'backend': self.name}
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Release backend resources"""
+
+    def _failed(self, func: Callable, args: tuple, reason: str) -> None:
+        """Log a job that died and hand it to the failure hook"""
+        logger.error(f"Job {func.__name__}{args} failed: {reason}")
+        if self.on_failure is not None:
+            try:
+                self.on_failure(func, args, reason)
+            except Exception as e:
+                logger.error(f"Job failure handler raised: {str(e)}")
+
+
+class InlineJobBackend(JobBackend):
+    """Run jobs synchronously in the calling process (development and tests)"""
+
+    name = 'inline'
+
+    def submit(self, func: Callable, *args, priority: int = PRIORITY_INTERACTIVE) -> None:
+        """Run the job immediately"""
+        try:
+            func(*args)
+        except Exception as e:
+            self._failed(func, args, str(e))
+
+
+class RenderScheduler(JobBackend):
+    """Run each job in its own child process, as many at once as the CPUs allow
+
+    Every job gets threads_per_job cores (exported to the child as
+    RENDER_THREADS, which VideoGenerator passes on to ffmpeg). The max_workers
+    slots are shared through lock files in slots_dir by every server process
+    on the machine, so several gunicorn workers together never run more
+    renders than the CPUs allow; an empty slots_dir keeps the slots per
+    process. Queued jobs start by priority,
+    then submission order. A job running past timeout is killed along with any
+    ffmpeg it started, and memory_limit_mb caps the address space of each of
+    its processes. Job state is kept in the app database.
+    """
+
+    name = 'local'
+
+    def __init__(self, max_workers: Optional[int] = None, threads_per_job: Optional[int] = None,
+                 timeout: Optional[float] = None, memory_limit_mb: Optional[int] = None,
+                 initializer: Optional[Callable] = None, slots_dir: Optional[str] = None):
+        """Initialize the scheduler; its dispatcher thread starts on first submit"""
+        cpus = available_cpus()
+        self.threads_per_job = max(1, min(threads_per_job or int(os.getenv('RENDER_THREADS_PER_JOB', 2)), cpus))
+        self.max_workers = max_workers or max(1, cpus // self.threads_per_job)
+        self.timeout = timeout if timeout is not None else float(os.getenv('RENDER_TIMEOUT_SECONDS', 1800))
+        self.memory_limit_mb = (memory_limit_mb if memory_limit_mb is not None
+                                else int(os.getenv('RENDER_MEMORY_LIMIT_MB', 0)))
+        self.initializer = initializer
+        self.slots_dir = (slots_dir if slots_dir is not None
+                          else os.getenv('RENDER_SLOTS_DIR', './outputs/render_slots'))
+        self._slots = None
+        self._condition = threading.Condition()
+        self._queue: List[Tuple[int, int, Dict]] = []
+        self._running: Dict[int, Dict] = {}
+        self._sequence = itertools.count()
+        self._counters = {'completed': 0, 'failed': 0, 'timed_out': 0, 'out_of_memory': 0}
+        self._waits = deque(maxlen=256)
+        self._pid = None
+        self._start_lock = threading.Lock()
+        self._closed = False
+
+    def _ensure_dispatcher(self) -> None:
+        """Start the dispatcher thread, once per (forked) server process"""
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            # A forked server process inherits the parent's queue but none of its threads
+            self._condition = threading.Condition()
+            self._queue, self._running = [], {}
+            # Lock files are opened afresh: record locks are never inherited across fork
+            self._slots = RenderSlots(self.slots_dir, self.max_workers) if self.slots_dir and fcntl else None
+            self._closed = False
+            threading.Thread(target=self._dispatch, name='render-scheduler', daemon=True).start()
+            self._pid = os.getpid()
+
+    def submit(self, func: Callable, *args, priority: int = PRIORITY_INTERACTIVE) -> None:
+        """Queue the job; lower priority values start first"""
+        self._ensure_dispatcher()
+        with self._condition:
+            job = {'func': func, 'args': args, 'priority': priority, 'queued_at': time.monotonic()}
+            heapq.heappush(self._queue, (priority, next(self._sequence), job))
+            self._condition.notify_all()
+
+    def _dispatch(self) -> None:
+        """Start queued jobs whenever a slot is free"""
+        context = multiprocessing.get_context('fork' if hasattr(os, 'fork') else None)
+        while True:
+            with self._condition:
+                while not self._closed and (not self._queue or len(self._running) >= self.max_workers):
+                    self._condition.wait()
+                if self._closed:
+                    return
+                slot = self._slots.acquire() if self._slots is not None else None
+                if self._slots is not None and slot is None:
+                    # Other server processes hold every slot
+                    self._condition.wait(SLOT_POLL_SECONDS)
+                    continue
+                _, _, job = heapq.heappop(self._queue)
+
+                wait = time.monotonic() - job['queued_at']
+                self._waits.append(wait)
+                JOB_WAIT_SECONDS.observe(wait, priority=_priority_name(job['priority']))
+
+                # Not daemonic: renders start their own process pools
+                process = context.Process(
+                    target=_run_job,
+                    args=(job['func'], job['args'], self.initializer, self.threads_per_job, self.memory_limit_mb),
+                    name=f"render-{job['func'].__name__}", daemon=False
+                )
+                try:
+                    process.start()
+                except OSError as e:
+                    if slot is not None:
+                        self._slots.release(slot)
+                    self._counters['failed'] += 1
+                    self._failed(job['func'], job['args'], f"Could not start render process: {str(e)}")
+                    continue
+                job['process'] = process
+                job['slot'] = slot
+                job['started_at'] = time.monotonic()
+                self._running[process.pid] = job
+            threading.Thread(target=self._supervise, args=(job,), daemon=True).start()
+
+    def _supervise(self, job: Dict) -> None:
+        """Wait for a job, killing it at its timeout, and record how it ended"""
+        process = job['process']
+        process.join(self.timeout or None)
+        if process.is_alive():
+            _kill_process_group(process.pid)
+            # The job may not have made itself a group leader yet
+            process.kill()
+            process.join()
+            outcome, reason = 'timed_out', f"Render timed out after {self.timeout:g}s"
+        elif process.exitcode == 0:
+            outcome, reason = 'completed', None
+        elif process.exitcode == EXIT_OUT_OF_MEMORY:
+            outcome, reason = 'out_of_memory', f"Render exceeded the {self.memory_limit_mb} MB memory limit"
+        else:
+            outcome, reason = 'failed', f"Render process exited with code {process.exitcode}"
+        # The child is a process group leader; reap any ffmpeg it left behind
+        _kill_process_group(process.pid)
+
+        JOB_RUN_SECONDS.observe(time.monotonic() - job['started_at'],
+                                priority=_priority_name(job['priority']), outcome=outcome)
+        with self._condition:
+            self._running.pop(process.pid, None)
+            if job['slot'] is not None:
+                self._slots.release(job['slot'])
+            self._counters[outcome] += 1
+            self._condition.notify_all()
+
+        if reason:
+            self._failed(job['func'], job['args'], reason)
+
+    def stats(self) -> Dict:
+        """Return slot usage, queue depth by priority, wait times and outcome counts"""
+        now = time.monotonic()
+        with self._condition:
+            queued: Dict[str, int] = {}
+            for priority, _, _ in self._queue:
+                queued[_priority_name(priority)] = queued.get(_priority_name(priority), 0) + 1
+            oldest = max((now - job['queued_at'] for _, _, job in self._queue), default=0.0)
+            waits = list(self._waits)
+            stats = dict(self._counters)
+            stats.update({
+                'backend': self.name,
+                'slots': self.max_workers,
+                'shared_slots': bool(self.slots_dir and fcntl),
+                'threads_per_job': self.threads_per_job,
+                'running': len(self._running),
+                'queued': queued,
+                'queue_depth': len(self._queue),
+                'oldest_queued_seconds': round(oldest, 3),
+                'mean_wait_seconds': round(sum(waits) / len(waits), 3) if waits else 0.0,
+                'max_wait_seconds': round(max(waits), 3) if waits else 0.0
+            })
+        return stats
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop starting jobs; wait for running ones, or kill them"""
+        with self._condition:
+            self._closed = True
+            self._queue.clear()
+            running = list(self._running.values())
+            self._condition.notify_all()
+        for job in running:
+            if not wait:
+                _kill_process_group(job['process'].pid)
+            job['process'].join()
+
+
+class CeleryJobBackend(JobBackend):
+    """Dispatch jobs to Celery workers through a Redis (or other) broker"""
+
+    name = 'celery'
+
+    def __init__(self, broker_url: str, result_backend: Optional[str] = None):
+        """Initialize the Celery application"""
+        from celery import Celery
+
+        self.celery = Celery('ai_learning_platform', broker=broker_url, backend=result_backend)
+        self._tasks: Dict[str, object] = {}
+
+    def register(self, func: Callable) -> Callable:
+        """Register the function as a Celery task so workers can run it"""
+        name = f"{func.__module__}.{func.__name__}"
+        self._tasks[name] = self.celery.task(name=name)(func)
+        return func
+
+    def submit(self, func: Callable, *args, priority: int = PRIORITY_INTERACTIVE) -> None:
+        """Publish the job to the broker"""
+        name = f"{func.__module__}.{func.__name__}"
+        if name not in self._tasks:
+            raise ValueError(f"Job function {name} is not registered")
+        self._tasks[name].apply_async(args, priority=priority)
+
+
+class JobQueue:
+    """Front end for enqueueing jobs on a pluggable backend"""
+
+    def __init__(self, backend: JobBackend, on_failure: Optional[Callable] = None):
+        """Initialize the queue with an execution backend and an optional failure hook"""
+        self.backend = backend
+        self.on_failure = on_failure
+        self.backend.on_failure = on_failure
+        self._jobs: Dict[str, Callable] = {}
+
+    def task(self, func: Callable) -> Callable:
+        """Decorator registering a job function"""
+        self._jobs[func.__name__] = func
+        self.backend.register(func)
+        return func
+
+    def set_backend(self, backend: JobBackend) -> None:
+        """Swap the execution backend, re-registering known jobs"""
+        self.backend.shutdown(wait=False)
+        self.backend = backend
+        backend.on_failure = self.on_failure
+        for func in self._jobs.values():
+            backend.register(func)
+
+    def enqueue(self, func: Callable, *args, priority: int = PRIORITY_INTERACTIVE) -> None:
+        """Schedule a job for background execution"""
+        logger.info(f"Enqueueing job {func.__name__}{args} ({_priority_name(priority)})")
+        self.backend.submit(func, *args, priority=priority)
+
+    def stats(self) -> Dict:
+        """Return the backend's queue statistics"""
+        return self.backend.stats()
+
+
+def create_job_backend(name: str, max_workers: Optional[int] = None,
+                       initializer: Optional[Callable] = None,
+                       broker_url: Optional[str] = None,
+                       result_backend: Optional[str] = None,
+                       threads_per_job: Optional[int] = None,
+                       timeout: Optional[float] = None,
+                       memory_limit_mb: Optional[int] = None,
+                       slots_dir: Optional[str] = None) -> JobBackend:
+    """Create a job backend by name (inline, local or celery)"""
+    if name == 'inline':
+        return InlineJobBackend()
+    if name == 'local':
+        return RenderScheduler(max_workers=max_workers, threads_per_job=threads_per_job, timeout=timeout,
+                               memory_limit_mb=memory_limit_mb, initializer=initializer, slots_dir=slots_dir)
+    if name == 'celery':
+        return CeleryJobBackend(broker_url, result_backend)
+    raise ValueError(f"Unknown job backend: {name}")
@@ -0,0 +1,208 @@
+"""Resilient OpenAI client wrapper with retries, rate limiting and a circuit breaker"""
+
+import logging
+import os
+import random
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+import openai
+
+from .ratelimit import SharedTokenBucket
+
+logger = logging.getLogger(__name__)
+
+# Errors worth retrying: throttling, upstream 5xx and network trouble
+RETRYABLE_ERRORS = (
+    openai.error.RateLimitError,
+    openai.error.ServiceUnavailableError,
+    openai.error.APIConnectionError,
+    openai.error.Timeout,
+    openai.error.TryAgain,
+)
+
+
+class CircuitOpenError(openai.error.OpenAIError):
+    """Raised without calling the API while the circuit breaker is open"""
+
+
+class CircuitBreaker:
+    """Fail fast after repeated upstream failures, probing again after a cool-down"""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic):
+        """Initialize a closed breaker"""
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Return whether a call may go through now"""
+        with self._lock:
+            if self.state == self.OPEN and self.clock() - self.opened_at >= self.reset_timeout:
+                # Let a single probe through; its outcome decides the next state
+                self.state = self.HALF_OPEN
+                return True
+            return self.state == self.CLOSED
+
+    def record_success(self) -> None:
+        """Close the breaker after a successful call"""
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def reopen(self) -> None:
+        """Open the breaker again after a half-open probe that did not complete"""
+        with self._lock:
+            self.state = self.OPEN
+            self.opened_at = self.clock()
+
+    def record_failure(self) -> None:
+        """Count an upstream failure, opening the breaker past the threshold"""
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning(f"Circuit breaker opened after {self.failures} failures")
+                self.state = self.OPEN
+                self.opened_at = self.clock()
+
+
+def _is_retryable(error: Exception) -> bool:
+    """Return whether an OpenAI error is transient"""
+    if isinstance(error, RETRYABLE_ERRORS):
+        return True
+    if isinstance(error, openai.error.APIError):
+        return error.http_status is None or error.http_status >= 500
+    return False
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """Return the server's Retry-After delay in seconds, if it sent one"""
+    headers = getattr(error, 'headers', None) or {}
+    for name in ('retry-after-ms', 'Retry-After-Ms'):
+        if name in headers:
+            try:
+                return float(headers[name]) / 1000.0
+            except (TypeError, ValueError):
+                pass
+    for name in ('retry-after', 'Retry-After'):
+        if name in headers:
+            try:
+                return float(headers[name])
+            except (TypeError, ValueError):
+                pass
+    return None
+
+
+class LLMClient:
+    """Call the OpenAI chat API with backoff, Retry-After, rate limiting and a circuit breaker"""
+
+    def __init__(self, max_retries: Optional[int] = None, base_delay: float = 1.0,
+                 max_delay: float = 30.0, rate_limiter: Optional[SharedTokenBucket] = None,
+                 breaker: Optional[CircuitBreaker] = None,
+                 sleep: Callable[[float], None] = time.sleep):
+        """Initialize the client; rate limiting is configured by LLM_REQUESTS_PER_MINUTE"""
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv('LLM_MAX_RETRIES', 4))
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.sleep = sleep
+        self.breaker = breaker or CircuitBreaker(
+            failure_threshold=int(os.getenv('LLM_BREAKER_THRESHOLD', 5)),
+            reset_timeout=float(os.getenv('LLM_BREAKER_RESET_SECONDS', 30))
+        )
+
+        if rate_limiter is None:
+            requests_per_minute = float(os.getenv('LLM_REQUESTS_PER_MINUTE', 3000))
+            if requests_per_minute > 0:
+                rate_limiter = SharedTokenBucket(requests_per_minute)
+        self.rate_limiter = rate_limiter
+
+        self._lock = threading.Lock()
+        self.stats = {
+            'calls': 0, 'attempts': 0, 'retries': 0, 'rate_limited': 0,
+            'failures': 0, 'circuit_rejections': 0, 'retry_wait_seconds': 0.0
+        }
+
+    def _count(self, name: str, value: float = 1) -> None:
+        """Increment a metrics counter"""
+        with self._lock:
+            self.stats[name] += value
+
+    def backoff(self, attempt: int, error: Optional[Exception] = None) -> float:
+        """Return the delay before retry number attempt (0-based)"""
+        retry_after = _retry_after(error) if error is not None else None
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        # Full jitter: uniform between zero and the exponential cap
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def chat_completion(self, **kwargs):
+        """Call openai.ChatCompletion.create, retrying transient failures"""
+        self._count('calls')
+        attempt = 0
+
+        while True:
+            if not self.breaker.allow():
+                self._count('circuit_rejections')
+                raise CircuitOpenError("OpenAI circuit breaker is open; failing fast")
+
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+
+            self._count('attempts')
+            probing = self.breaker.state == CircuitBreaker.HALF_OPEN
+            try:
+                response = openai.ChatCompletion.create(**kwargs)
+            except Exception as e:
+                error = e
+            except BaseException:
+                # An interrupted probe must still resolve the breaker
+                if probing:
+                    self.breaker.reopen()
+                raise
+            else:
+                self.breaker.record_success()
+                return response
+
+            # 429s and client errors show the upstream is up: they count as failures neither
+            # when closed nor for a half-open probe, which closes the breaker again
+            upstream_failure = _is_retryable(error) and not isinstance(error, openai.error.RateLimitError)
+            if upstream_failure:
+                self.breaker.record_failure()
+            elif probing:
+                self.breaker.record_success()
+
+            if not _is_retryable(error):
+                raise error
+
+            if isinstance(error, openai.error.RateLimitError):
+                self._count('rate_limited')
+
+            if attempt >= self.max_retries:
+                self._count('failures')
+                logger.error(f"OpenAI call failed after {attempt + 1} attempts: {str(error)}")
+                raise error
+
+            delay = self.backoff(attempt, error)
+            logger.warning(f"OpenAI call failed ({str(error)}), retrying in {delay:.2f}s")
+            self._count('retries')
+            self._count('retry_wait_seconds', delay)
+            self.sleep(delay)
+            attempt += 1
+
+    def metrics(self) -> Dict:
+        """Return retry and breaker metrics"""
+        with self._lock:
+            stats = dict(self.stats)
+        stats['circuit_state'] = self.breaker.state
+        return stats
@@ -0,0 +1,381 @@
+"""Prometheus-style metrics aggregated across worker processes through a shared SQLite file"""
+
+import atexit
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Covers fast API responses through multi-minute video renders
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+                   10.0, 30.0, 60.0, 120.0, 300.0)
+
+COUNTER = 'counter'
+HISTOGRAM = 'histogram'
+
+
+def _label_key(labelnames: Sequence[str], labels: Dict) -> str:
+    """Serialize label values in declaration order"""
+    unknown = set(labels) - set(labelnames)
+    if unknown:
+        raise ValueError(f"Unknown labels: {sorted(unknown)}")
+    return json.dumps([str(labels.get(name, '')) for name in labelnames])
+
+
+def _format_labels(pairs: List[Tuple[str, str]]) -> str:
+    """Render {name="value",...} with Prometheus escaping"""
+    if not pairs:
+        return ''
+    escaped = (
+        f'{name}="' + value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"') + '"'
+        for name, value in pairs
+    )
+    return '{' + ','.join(escaped) + '}'
+
+
+def _format_value(value: float) -> str:
+    """Render a sample value"""
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metric:
+    """A named family of counter or histogram series"""
+
+    def __init__(self, registry: 'MetricsRegistry', name: str, help_text: str, kind: str,
+                 labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        """Initialize the metric; use MetricsRegistry.counter/histogram instead"""
+        self.registry = registry
+        self.name = name
+        self.help = help_text
+        self.kind = kind
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def inc(self, value: float = 1.0, **labels) -> None:
+        """Increment a counter"""
+        self.registry._update(self, _label_key(self.labelnames, labels), value)
+
+    def observe(self, value: float, **labels) -> None:
+        """Record one histogram observation"""
+        self.registry._update(self, _label_key(self.labelnames, labels), value)
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """Observe the wall time spent in the block, in seconds"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+
+class MetricsRegistry:
+    """Collect metrics in memory and periodically publish them for cross-process aggregation
+
+    Every process writes a snapshot of its own cumulative series to a shared
+    SQLite file at most every flush_interval seconds; a scrape from any worker
+    sums the snapshots of all of them. Snapshots of exited processes are folded
+    into a single row so counters never go backwards when workers recycle.
+    """
+
+    def __init__(self, db_path: Optional[str] = None, flush_interval: Optional[float] = None):
+        """Initialize the registry; pass db_path='' to keep metrics process-local"""
+        self._db_path = db_path
+        self._flush_interval = flush_interval
+        self._metrics: Dict[str, Metric] = {}
+        self._values: Dict[Tuple[str, str], object] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._dirty = False
+        self._flusher_pid = None
+        self._process = f"{os.getpid()}:{uuid.uuid4().hex}"
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self) -> None:
+        """Start a forked child with empty series so the parent's counts are not published twice"""
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._values = {}
+        self._dirty = False
+        self._flusher_pid = None
+        self._process = f"{os.getpid()}:{uuid.uuid4().hex}"
+
+    @property
+    def db_path(self) -> Optional[str]:
+        """Return the shared metrics file, read from METRICS_DB on first use"""
+        if self._db_path is None:
+            self._db_path = os.getenv(
+                'METRICS_DB', os.path.join(os.getenv('OUTPUT_DIR', './outputs'), 'metrics', 'metrics.db')
+            )
+        return self._db_path or None
+
+    @property
+    def flush_interval(self) -> float:
+        """Return the seconds between snapshot writes, read from METRICS_FLUSH_SECONDS"""
+        if self._flush_interval is None:
+            self._flush_interval = float(os.getenv('METRICS_FLUSH_SECONDS', 1.0))
+        return self._flush_interval
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Metric:
+        """Declare a monotonically increasing counter"""
+        return self._register(Metric(self, name, help_text, COUNTER, labelnames))
+
+    def histogram(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Metric:
+        """Declare a histogram of observed values"""
+        return self._register(Metric(self, name, help_text, HISTOGRAM, labelnames, buckets))
+
+    def _register(self, metric: Metric) -> Metric:
+        """Add a metric, returning the existing one if it was already declared"""
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def _update(self, metric: Metric, label_key: str, value: float) -> None:
+        """Apply one increment or observation to this process's series"""
+        key = (metric.name, label_key)
+        with self._lock:
+            if metric.kind == COUNTER:
+                self._values[key] = self._values.get(key, 0.0) + value
+            else:
+                series = self._values.get(key)
+                if series is None:
+                    series = self._values[key] = {'buckets': [0] * len(metric.buckets), 'sum': 0.0, 'count': 0}
+                for index, bound in enumerate(metric.buckets):
+                    if value <= bound:
+                        series['buckets'][index] += 1
+                series['sum'] += value
+                series['count'] += 1
+            self._dirty = True
+        self._ensure_flusher()
+
+    def _ensure_flusher(self) -> None:
+        """Start this process's background snapshot thread (again after a fork)"""
+        if not self.db_path or self._flusher_pid == os.getpid():
+            return
+        with self._lock:
+            if self._flusher_pid == os.getpid():
+                return
+            self._flusher_pid = os.getpid()
+        threading.Thread(target=self._flush_loop, name='metrics-flush', daemon=True).start()
+        atexit.register(self._flush_at_exit)
+
+    def _flush_loop(self) -> None:
+        """Publish a snapshot every flush_interval seconds for the life of this process"""
+        pid = os.getpid()
+        while self._flusher_pid == pid:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                logger.warning(f"Metrics flush failed: {str(e)}")
+
+    def _flush_at_exit(self) -> None:
+        """Publish the last updates of a process that is shutting down"""
+        try:
+            self.flush()
+        except sqlite3.Error:
+            pass
+
+    def _db(self) -> sqlite3.Connection:
+        """Return this thread's connection to the shared metrics database"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS metric_snapshot ("
+                "process TEXT NOT NULL, pid INTEGER NOT NULL, name TEXT NOT NULL, "
+                "labels TEXT NOT NULL, value TEXT NOT NULL, PRIMARY KEY (process, name, labels))"
+            )
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def flush(self) -> None:
+        """Write this process's series to the shared file if anything changed"""
+        if not self.db_path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            rows = [(self._process, os.getpid(), name, labels, json.dumps(value))
+                    for (name, labels), value in self._values.items()]
+            self._dirty = False
+
+        db = self._db()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            db.executemany(
+                "INSERT OR REPLACE INTO metric_snapshot (process, pid, name, labels, value) "
+                "VALUES (?, ?, ?, ?, ?)", rows
+            )
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            with self._lock:
+                self._dirty = True
+            raise
+
+    def _local_snapshot(self) -> List[Tuple[str, str, object]]:
+        """Return (name, labels, value) for this process only"""
+        with self._lock:
+            return [(name, labels, json.loads(json.dumps(value)))
+                    for (name, labels), value in self._values.items()]
+
+    def _shared_snapshot(self) -> List[Tuple[str, str, object]]:
+        """Publish this process, fold exited processes together and return every snapshot row"""
+        self.flush()
+        db = self._db()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            rows = db.execute("SELECT process, pid, name, labels, value FROM metric_snapshot").fetchall()
+            dead = {process for process, pid, _, _, _ in rows if process != 'exited' and not _pid_alive(pid)}
+            if dead:
+                merged: Dict[Tuple[str, str], object] = {}
+                for process, _, name, labels, value in rows:
+                    if process == 'exited' or process in dead:
+                        key = (name, labels)
+                        merged[key] = _merge(merged.get(key), json.loads(value))
+                db.executemany("DELETE FROM metric_snapshot WHERE process = ?", [(p,) for p in dead])
+                db.executemany(
+                    "INSERT OR REPLACE INTO metric_snapshot (process, pid, name, labels, value) "
+                    "VALUES ('exited', 0, ?, ?, ?)",
+                    [(name, labels, json.dumps(value)) for (name, labels), value in merged.items()]
+                )
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+        return [(name, labels, json.loads(value)) for _, _, name, labels, value in rows]
+
+    def collect(self) -> Dict[Tuple[str, str], object]:
+        """Return every series summed across processes, keyed by (name, label values JSON)"""
+        try:
+            rows = self._shared_snapshot() if self.db_path else self._local_snapshot()
+        except sqlite3.Error as e:
+            logger.warning(f"Metrics aggregation failed, reporting this process only: {str(e)}")
+            rows = self._local_snapshot()
+
+        totals: Dict[Tuple[str, str], object] = {}
+        for name, labels, value in rows:
+            totals[(name, labels)] = _merge(totals.get((name, labels)), value)
+        return totals
+
+    def value(self, name: str, **labels) -> object:
+        """Return the aggregated value of one series (0 if never updated)"""
+        metric = self._metrics[name]
+        return self.collect().get((name, _label_key(metric.labelnames, labels)), 0.0)
+
+    def render(self) -> str:
+        """Render all metrics in the Prometheus text exposition format"""
+        totals = self.collect()
+        lines = []
+        for metric in sorted(self._metrics.values(), key=lambda m: m.name):
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            series = sorted((labels, value) for (name, labels), value in totals.items()
+                            if name == metric.name)
+            for labels, value in series:
+                pairs = list(zip(metric.labelnames, json.loads(labels)))
+                if metric.kind == COUNTER:
+                    lines.append(f"{metric.name}{_format_labels(pairs)} {_format_value(value)}")
+                    continue
+                # Bucket counts are stored cumulatively, as the format expects
+                for bound, count in zip(metric.buckets, value['buckets']):
+                    le = pairs + [('le', _format_value(bound))]
+                    lines.append(f"{metric.name}_bucket{_format_labels(le)} {count}")
+                le = pairs + [('le', '+Inf')]
+                lines.append(f"{metric.name}_bucket{_format_labels(le)} {value['count']}")
+                lines.append(f"{metric.name}_sum{_format_labels(pairs)} {_format_value(value['sum'])}")
+                lines.append(f"{metric.name}_count{_format_labels(pairs)} {value['count']}")
+        lines.extend(self._derived_lines(totals))
+        return "\n".join(lines) + "\n"
+
+    def _derived_lines(self, totals: Dict[Tuple[str, str], object]) -> List[str]:
+        """Render cache hit ratios computed from the aggregated lookup counters"""
+        lookups: Dict[str, List[float]] = {}
+        for (name, labels), value in totals.items():
+            if name != CACHE_LOOKUPS.name:
+                continue
+            cache, result = json.loads(labels)
+            counts = lookups.setdefault(cache, [0.0, 0.0])
+            counts[0 if result == 'hit' else 1] += value
+
+        lines = ["# HELP cache_hit_ratio Fraction of cache lookups that were hits",
+                 "# TYPE cache_hit_ratio gauge"]
+        for cache, (hits, misses) in sorted(lookups.items()):
+            ratio = hits / (hits + misses) if hits + misses else 0.0
+            lines.append(f"cache_hit_ratio{_format_labels([('cache', cache)])} {_format_value(round(ratio, 6))}")
+        return lines
+
+    def reset(self) -> None:
+        """Forget this process's series (the shared file is left alone)"""
+        with self._lock:
+            self._values.clear()
+            self._dirty = False
+
+
+def _merge(total: Optional[object], value: object) -> object:
+    """Add a counter value or histogram snapshot into a running total"""
+    if total is None:
+        return json.loads(json.dumps(value))
+    if isinstance(value, dict):
+        return {
+            'buckets': [a + b for a, b in zip(total['buckets'], value['buckets'])],
+            'sum': total['sum'] + value['sum'],
+            'count': total['count'] + value['count']
+        }
+    return total + value
+
+
+def _pid_alive(pid: int) -> bool:
+    """Return whether a process with this PID exists on this host"""
+    if pid <= 0:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+registry = MetricsRegistry()
+
+HTTP_REQUEST_SECONDS = registry.histogram(
+    'http_request_duration_seconds', 'HTTP request latency by route', ('method', 'route', 'status')
+)
+CONTENT_STAGE_SECONDS = registry.histogram(
+    'content_generation_stage_seconds', 'Time spent in each lesson generation stage', ('stage',)
+)
+VIDEO_STAGE_SECONDS = registry.histogram(
+    'video_render_stage_seconds', 'Time spent in each video render stage', ('stage',)
+)
+LLM_TOKENS = registry.counter(
+    'llm_tokens_total', 'Tokens consumed by LLM calls (estimated for streams)', ('model', 'mode')
+)
+LESSON_PARSES = registry.counter(
+    'lesson_parse_total', 'LLM lesson responses by parse outcome', ('outcome',)
+)
+CACHE_LOOKUPS = registry.counter(
+    'cache_lookups_total', 'Cache lookups by cache and result', ('cache', 'result')
+)
+JOB_WAIT_SECONDS = registry.histogram(
+    'job_queue_wait_seconds', 'Time jobs wait in the render queue before starting', ('priority',)
+)
+JOB_RUN_SECONDS = registry.histogram(
+    'job_run_seconds', 'Render job run time by priority and outcome', ('priority', 'outcome')
+)
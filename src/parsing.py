@@ -0,0 +1,293 @@
+"""Parsers for structured lesson JSON returned by the LLM"""
+
+import json
+import logging
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_decoder = json.JSONDecoder()
+
+# Opening code fence with an optional language tag, e.g. ```json
+_FENCE = re.compile(r'```[A-Za-z]*[ \t]*\n?')
+
+_CLOSERS = {'{': '}', '[': ']'}
+
+LESSON_FIELDS = ('title', 'description', 'sections', 'key_points')
+
+# Optional lists that are stored and served with a lesson but never re-requested
+LESSON_EXTRAS = ('learning_objectives', 'fun_facts')
+
+
+class SectionStreamParser:
+    """Incrementally scan streamed lesson JSON and emit parts as soon as they close
+
+    Top-level string fields (``title``, ``description``) are emitted when their
+    closing quote arrives and each object in the ``sections`` array is emitted
+    when its closing brace arrives, without waiting for the full document.
+    """
+
+    FIELDS = ('title', 'description')
+
+    def __init__(self):
+        """Initialize an empty parser"""
+        self.buffer = ''
+        self.sections: List[Dict] = []
+        self.fields: Dict[str, str] = {}
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._started = False
+        self._string_start = None
+        self._last_string: Optional[Tuple[int, int]] = None
+        self._key = None
+        self._in_sections = False
+        self._section_start = None
+
+    def feed(self, chunk: str) -> List[Tuple[str, Dict]]:
+        """Consume a chunk of text and return (event, data) pairs completed by it"""
+        self.buffer += chunk
+        events = []
+        text = self.buffer
+
+        for i in range(self._pos, len(text)):
+            ch = text[i]
+
+            if not self._started:
+                if ch == '{':
+                    self._started = True
+                    self._depth = 1
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == '\\':
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    self._on_string(self._string_start, i + 1, events)
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                self._string_start = i
+            elif ch == ':' and self._depth == 1 and self._last_string is not None:
+                self._key = self._decode(*self._last_string)
+                self._last_string = None
+                if self._key == 'sections':
+                    self._in_sections = True
+            elif ch in '{[':
+                self._depth += 1
+                if ch == '{' and self._in_sections and self._depth == 3:
+                    self._section_start = i
+            elif ch in '}]':
+                self._depth -= 1
+                if ch == '}' and self._in_sections and self._depth == 2 and self._section_start is not None:
+                    self._on_section(text[self._section_start:i + 1], events)
+                    self._section_start = None
+                elif ch == ']' and self._in_sections and self._depth == 1:
+                    self._in_sections = False
+            elif ch == ',' and self._depth == 1:
+                self._key = None
+                self._last_string = None
+
+        self._pos = len(text)
+        return events
+
+    def _on_string(self, start: int, end: int, events: List[Tuple[str, Dict]]) -> None:
+        """Handle a string that just closed"""
+        if self._depth != 1:
+            return
+        if self._key is None:
+            self._last_string = (start, end)
+        elif self._key in self.FIELDS and self._key not in self.fields:
+            value = self._decode(start, end)
+            if value is not None:
+                self.fields[self._key] = value
+                events.append(('field', {'name': self._key, 'value': value}))
+
+    def _on_section(self, raw: str, events: List[Tuple[str, Dict]]) -> None:
+        """Handle a section object that just closed"""
+        try:
+            section = json.loads(raw)
+        except json.JSONDecodeError:
+            logger.warning("Skipping malformed streamed section")
+            return
+        # Streamed indexes must match the sections parse_lesson keeps for the lesson
+        section = validate_section(section)
+        if section is None:
+            logger.warning("Skipping invalid streamed section")
+            return
+        events.append(('section', {'index': len(self.sections), 'section': section}))
+        self.sections.append(section)
+
+    def _decode(self, start: int, end: int) -> Optional[str]:
+        """Decode a JSON string literal from the buffer"""
+        try:
+            return json.loads(self.buffer[start:end])
+        except json.JSONDecodeError:
+            return None
+
+
+def repair_json(text: str) -> Tuple[Optional[str], bool]:
+    """Repair common LLM JSON faults in the first object of text
+
+    Code fences and surrounding prose are dropped, trailing commas removed,
+    raw newlines in strings escaped and mismatched closers corrected. Text
+    that ends mid-document is cut back to its last complete value and the
+    open containers are closed. Returns the repaired JSON (None if there is no
+    object) and whether the text was truncated.
+    """
+    text = _FENCE.sub('', text)
+    start = text.find('{')
+    if start < 0:
+        return None, False
+
+    out: List[str] = []
+    stack: List[str] = []
+    # Per open container: whether the next string is a value (after ':' or in an array)
+    expect_value: List[bool] = []
+    checkpoint: Optional[Tuple[int, Tuple[str, ...]]] = None
+    in_string = escape = string_is_value = False
+
+    for ch in text[start:]:
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == '\\':
+                escape = True
+            elif ch == '"':
+                in_string = False
+                if string_is_value:
+                    out.append(ch)
+                    checkpoint = (len(out), tuple(stack))
+                    continue
+            elif ch == '\n':
+                ch = '\\n'
+            out.append(ch)
+            continue
+
+        if ch == '"':
+            in_string = True
+            string_is_value = stack[-1] == '[' or expect_value[-1]
+            out.append(ch)
+        elif ch in '{[':
+            stack.append(ch)
+            expect_value.append(False)
+            out.append(ch)
+            checkpoint = (len(out), tuple(stack))
+        elif ch in '}]':
+            _drop_trailing_comma(out)
+            out.append(_CLOSERS[stack.pop()])
+            expect_value.pop()
+            if not stack:
+                return ''.join(out), False
+            checkpoint = (len(out), tuple(stack))
+        elif ch == ':':
+            expect_value[-1] = True
+            out.append(ch)
+        elif ch == ',':
+            checkpoint = (len(out), tuple(stack))
+            expect_value[-1] = False
+            out.append(ch)
+        else:
+            out.append(ch)
+
+    if checkpoint is None:
+        return None, True
+    length, open_containers = checkpoint
+    out = out[:length]
+    _drop_trailing_comma(out)
+    out.extend(_CLOSERS[c] for c in reversed(open_containers))
+    return ''.join(out), True
+
+
+def _drop_trailing_comma(out: List[str]) -> None:
+    """Remove trailing whitespace and a dangling comma from the output buffer"""
+    while out and out[-1].isspace():
+        out.pop()
+    if out and out[-1] == ',':
+        out.pop()
+
+
+def parse_json_lenient(text: str) -> Tuple[Any, bool]:
+    """Decode the first JSON object in text, repairing it if needed
+
+    Well-formed responses take the fast path through the C decoder. Returns the
+    decoded value (None if nothing could be recovered) and whether the text
+    was truncated.
+    """
+    start = text.find('{')
+    if start < 0:
+        return None, False
+    try:
+        return _decoder.raw_decode(text, start)[0], False
+    except json.JSONDecodeError:
+        pass
+
+    repaired, truncated = repair_json(text)
+    if repaired is None:
+        return None, truncated
+    try:
+        return json.loads(repaired), truncated
+    except json.JSONDecodeError:
+        logger.warning("Could not repair JSON response")
+        return None, truncated
+
+
+def string_list(value: Any) -> List[str]:
+    """Return the strings of a JSON list, or an empty list for anything else"""
+    return [item for item in value if isinstance(item, str)] if isinstance(value, list) else []
+
+
+def validate_section(section: Any) -> Optional[Dict]:
+    """Return a section with a title, content and string key points, or None if it is incomplete"""
+    if not isinstance(section, dict):
+        return None
+    title, content = section.get('title'), section.get('content')
+    if not (isinstance(title, str) and title.strip() and isinstance(content, str) and content.strip()):
+        return None
+    return dict(section, key_points=string_list(section.get('key_points')))
+
+
+def parse_lesson(text: str) -> Dict:
+    """Parse lesson JSON leniently, keeping every complete and valid part
+
+    Returns ``lesson`` with the fields that parsed (sections filtered to
+    complete ones), ``missing`` with the lesson fields still to be requested
+    and ``truncated``. In a truncated response the last field written may be
+    cut short, so it is reported missing along with the absent ones.
+    """
+    parsed, truncated = parse_json_lenient(text)
+    if not isinstance(parsed, dict):
+        return {'lesson': {}, 'missing': list(LESSON_FIELDS), 'truncated': truncated}
+
+    lesson = {key: value for key, value in parsed.items() if key not in LESSON_FIELDS + LESSON_EXTRAS}
+    for name in LESSON_EXTRAS:
+        if name in parsed:
+            lesson[name] = string_list(parsed[name])
+    for name in ('title', 'description'):
+        if isinstance(parsed.get(name), str) and parsed[name].strip():
+            lesson[name] = parsed[name]
+
+    if isinstance(parsed.get('sections'), list):
+        sections = [validate_section(section) for section in parsed['sections']]
+        if None in sections:
+            logger.warning(f"Dropped {sections.count(None)} incomplete section(s)")
+        sections = [section for section in sections if section is not None]
+        # An empty list is kept as given; one emptied by validation still has to be requested
+        if sections or not parsed['sections']:
+            lesson['sections'] = sections
+
+    if isinstance(parsed.get('key_points'), list):
+        lesson['key_points'] = string_list(parsed['key_points'])
+
+    missing = [name for name in LESSON_FIELDS if name not in lesson]
+    # Only the last key written can be cut short; optional extras are never re-requested
+    cut_short = list(parsed)[-1] if truncated and parsed else None
+    if cut_short in LESSON_FIELDS and cut_short not in missing:
+        missing.append(cut_short)
+    return {'lesson': lesson, 'missing': missing, 'truncated': truncated}
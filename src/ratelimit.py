@@ -0,0 +1,132 @@
+"""Rate limiting helpers for LLM API calls"""
+
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from typing import Callable, List, Optional
+
+
+class TokenBudget:
+    """Sliding-window tokens-per-minute budget shared by threads in one process
+
+    Callers reserve an estimated token count before a call and settle the
+    reservation with the actual usage afterwards.
+    """
+
+    def __init__(self, tokens_per_minute: int, window: float = 60.0):
+        """Initialize the budget"""
+        self.tokens_per_minute = tokens_per_minute
+        self.window = window
+        self._entries: "deque[List[float]]" = deque()
+        self._cond = threading.Condition()
+
+    def _purge(self, now: float) -> None:
+        """Drop reservations older than the window (lock held)"""
+        while self._entries and self._entries[0][0] <= now - self.window:
+            self._entries.popleft()
+
+    def used(self) -> int:
+        """Return tokens consumed within the current window"""
+        with self._cond:
+            self._purge(time.monotonic())
+            return int(sum(entry[1] for entry in self._entries))
+
+    def acquire(self, tokens: int, timeout: Optional[float] = None) -> List[float]:
+        """Block until tokens fit in the budget and return the reservation"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self._purge(now)
+                used = sum(entry[1] for entry in self._entries)
+                # An oversized request still runs once the window is empty
+                if used + tokens <= self.tokens_per_minute or not self._entries:
+                    entry = [now, tokens]
+                    self._entries.append(entry)
+                    return entry
+                wait = self._entries[0][0] + self.window - now
+                if deadline is not None:
+                    if now >= deadline:
+                        raise TimeoutError("Timed out waiting for token budget")
+                    wait = min(wait, deadline - now)
+                self._cond.wait(max(wait, 0.01))
+
+    def settle(self, reservation: List[float], tokens: int) -> None:
+        """Replace a reservation's estimate with the tokens actually used"""
+        with self._cond:
+            reservation[1] = tokens
+            self._cond.notify_all()
+
+
+class SharedTokenBucket:
+    """Token bucket whose state lives in a SQLite file shared by all worker processes"""
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None,
+                 db_path: Optional[str] = None, name: str = 'openai',
+                 sleep: Callable[[float], None] = time.sleep):
+        """Initialize the bucket; capacity defaults to one second's worth of burst"""
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or max(1.0, self.rate)
+        self.name = name
+        self.sleep = sleep
+        if db_path is None:
+            db_path = os.path.join(os.getenv('CACHE_DIR', './outputs/cache'), 'ratelimit.db')
+        self.db_path = db_path
+        self._local = threading.local()
+
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._db().execute(
+            "CREATE TABLE IF NOT EXISTS token_bucket ("
+            "name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+
+    def _db(self) -> sqlite3.Connection:
+        """Return this thread's connection to the bucket database"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def try_acquire(self, cost: float = 1.0) -> float:
+        """Take cost tokens if available; return 0, or the seconds to wait before retrying"""
+        db = self._db()
+        now = time.time()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            row = db.execute(
+                "SELECT tokens, updated_at FROM token_bucket WHERE name = ?", (self.name,)
+            ).fetchone()
+            tokens = self.capacity if row is None else min(
+                self.capacity, row[0] + max(0.0, now - row[1]) * self.rate
+            )
+            wait = 0.0
+            if tokens >= cost:
+                tokens -= cost
+            else:
+                wait = (cost - tokens) / self.rate
+            db.execute(
+                "INSERT OR REPLACE INTO token_bucket (name, tokens, updated_at) VALUES (?, ?, ?)",
+                (self.name, tokens, now)
+            )
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+        return wait
+
+    def acquire(self, cost: float = 1.0, timeout: Optional[float] = None) -> float:
+        """Block until cost tokens are taken; return the total seconds waited"""
+        waited = 0.0
+        while True:
+            wait = self.try_acquire(cost)
+            if wait <= 0:
+                return waited
+            if timeout is not None and waited + wait > timeout:
+                raise TimeoutError("Timed out waiting for rate limiter")
+            self.sleep(wait)
+            waited += wait
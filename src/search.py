@@ -0,0 +1,146 @@
+"""Full-text search over stored lessons (SQLite FTS5 or PostgreSQL tsvector)"""
+
+import json
+import logging
+import re
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+logger = logging.getLogger(__name__)
+
+
+def lesson_body_text(content_json: Optional[str]) -> str:
+    """Flatten the searchable text of a lesson's sections and key points"""
+    if not content_json:
+        return ''
+    try:
+        body = json.loads(content_json)
+    except ValueError:
+        return content_json
+
+    parts = []
+    for section in body.get('sections', []):
+        parts.append(str(section.get('title', '')))
+        parts.append(str(section.get('content', '')))
+        parts.extend(str(point) for point in section.get('key_points', []))
+    parts.extend(str(point) for point in body.get('key_points', []))
+    return "\n".join(part for part in parts if part)
+
+
+class ContentSearchIndex:
+    """Maintain and query a full-text index of Content title, description and sections"""
+
+    def __init__(self, table: str = 'content'):
+        """Initialize the index for the given content table"""
+        self.table = table
+        self._ready = set()
+
+    def is_ready(self, engine: Engine) -> bool:
+        """Return whether ensure() has completed for this database"""
+        return self._key(engine) in self._ready
+
+    def _key(self, engine: Engine):
+        return (engine.dialect.name, str(engine.url))
+
+    def ensure(self, engine: Engine) -> None:
+        """Create the index structures and index existing rows (idempotent, once per database)
+
+        Runs in its own committed transaction, so call it at startup or before
+        a request opens its session transaction, never from a read-only path.
+        """
+        if self.is_ready(engine):
+            return
+
+        with engine.begin() as conn:
+            self._create(conn)
+        self._ready.add(self._key(engine))
+
+    def _create(self, conn: Connection) -> None:
+        """Create the dialect's index structures, backfilling rows they do not cover yet"""
+        if conn.dialect.name == 'sqlite':
+            exists = conn.execute(text(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'content_fts'"
+            )).first()
+            if not exists:
+                conn.execute(text(
+                    "CREATE VIRTUAL TABLE content_fts USING fts5("
+                    "title, description, body, tokenize = 'porter unicode61')"
+                ))
+                self._backfill(conn)
+        elif conn.dialect.name == 'postgresql':
+            conn.execute(text(
+                f"ALTER TABLE {self.table} ADD COLUMN IF NOT EXISTS search_vector tsvector"
+            ))
+            conn.execute(text(
+                f"CREATE INDEX IF NOT EXISTS ix_{self.table}_search_vector "
+                f"ON {self.table} USING GIN (search_vector)"
+            ))
+            self._backfill(conn, only_missing=True)
+
+    def _backfill(self, conn: Connection, only_missing: bool = False) -> None:
+        """Index rows that existed before the index did"""
+        query = f"SELECT id, title, description, content FROM {self.table}"
+        if only_missing:
+            query += " WHERE search_vector IS NULL"
+        rows = conn.execute(text(query)).fetchall()
+        for row in rows:
+            self._write(conn, row[0], row[1], row[2], lesson_body_text(row[3]))
+        if rows:
+            logger.info(f"Indexed {len(rows)} existing lessons for full-text search")
+
+    def index(self, conn: Connection, content_id: int, title: str,
+              description: Optional[str], content_json: Optional[str]) -> None:
+        """Add or replace one lesson in the index (after ensure() has run for its database)"""
+        self._write(conn, content_id, title, description, lesson_body_text(content_json))
+
+    def _write(self, conn: Connection, content_id: int, title: str,
+               description: Optional[str], body: str) -> None:
+        """Write one lesson's searchable text"""
+        params = {'id': content_id, 'title': title or '', 'description': description or '', 'body': body}
+        if conn.dialect.name == 'sqlite':
+            conn.execute(text("DELETE FROM content_fts WHERE rowid = :id"), params)
+            conn.execute(text(
+                "INSERT INTO content_fts (rowid, title, description, body) "
+                "VALUES (:id, :title, :description, :body)"
+            ), params)
+        elif conn.dialect.name == 'postgresql':
+            conn.execute(text(
+                f"UPDATE {self.table} SET search_vector = "
+                "setweight(to_tsvector('english', :title), 'A') || "
+                "setweight(to_tsvector('english', :description), 'B') || "
+                "setweight(to_tsvector('english', :body), 'C') "
+                "WHERE id = :id"
+            ), params)
+
+    def search(self, conn: Connection, query: str, limit: int = 20) -> List[int]:
+        """Return IDs of lessons matching query, best match first
+
+        The index is created by ensure() on the primary; searching never
+        creates it, so replica connections can be passed as well.
+        """
+        terms = re.findall(r"\w+", query, re.UNICODE)
+        if not terms:
+            return []
+
+        if conn.dialect.name == 'sqlite':
+            # Quote every term so user input can never be parsed as FTS5 syntax
+            match = " ".join('"' + term.replace('"', '""') + '"' for term in terms)
+            rows = conn.execute(text(
+                "SELECT rowid FROM content_fts WHERE content_fts MATCH :match "
+                "ORDER BY bm25(content_fts, 10.0, 5.0, 1.0) LIMIT :limit"
+            ), {'match': match, 'limit': limit})
+        elif conn.dialect.name == 'postgresql':
+            rows = conn.execute(text(
+                f"SELECT id FROM {self.table}, plainto_tsquery('english', :query) AS q "
+                "WHERE search_vector @@ q ORDER BY ts_rank(search_vector, q) DESC LIMIT :limit"
+            ), {'query': " ".join(terms), 'limit': limit})
+        else:
+            # No full-text engine available; fall back to a scan
+            rows = conn.execute(text(
+                f"SELECT id FROM {self.table} WHERE title LIKE :pattern OR description LIKE :pattern "
+                "ORDER BY created_at DESC LIMIT :limit"
+            ), {'pattern': f"%{' '.join(terms)}%", 'limit': limit})
+
+        return [row[0] for row in rows]
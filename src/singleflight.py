@@ -0,0 +1,141 @@
+"""Single-flight deduplication of identical concurrent calls"""
+
+import copy
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows has no flock, fall back to threads only
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    """An in-flight call shared by the leader and its followers"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+        self.followers = 0
+
+
+class SingleFlight:
+    """Run at most one call per key at a time, across threads and worker processes
+
+    Threads in the same process wait on the leader and share its result.
+    Other processes serialize on a per-key file lock and then read the
+    leader's result through ``lookup`` (typically the shared cache).
+    """
+
+    def __init__(self, lock_dir: Optional[str] = None, timeout: float = 120.0,
+                 poll_interval: float = 0.05):
+        """Initialize with the directory holding per-key lock files"""
+        self.lock_dir = lock_dir or os.path.join(os.getenv('CACHE_DIR', './outputs/cache'), 'locks')
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+        self.stats = {'leaders': 0, 'followers': 0, 'remote_waits': 0}
+
+        if fcntl is not None:
+            os.makedirs(self.lock_dir, exist_ok=True)
+
+    def do(self, key: str, func: Callable[[], Any],
+           lookup: Optional[Callable[[], Any]] = None) -> Tuple[Any, bool]:
+        """Return (result, shared) where shared is True if another caller did the work"""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.followers += 1
+                self.stats['followers'] += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                self.stats['leaders'] += 1
+                leader = True
+
+        if not leader:
+            if not call.done.wait(self.timeout):
+                raise TimeoutError(f"Timed out waiting for in-flight call {key}")
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result), True
+
+        try:
+            call.result, shared = self._run_exclusive(key, func, lookup)
+            return call.result, shared
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def _run_exclusive(self, key: str, func: Callable[[], Any],
+                       lookup: Optional[Callable[[], Any]]) -> Tuple[Any, bool]:
+        """Run func while holding the cross-process lock for key"""
+        if fcntl is None:
+            return func(), False
+
+        fd = self._acquire(key)
+        try:
+            if fd is None:
+                logger.warning(f"Timed out waiting for lock on {key}, running anyway")
+            elif lookup is not None:
+                # Another process may have produced the result while we waited
+                result = lookup()
+                if result is not None:
+                    return result, True
+            return func(), False
+        finally:
+            if fd is not None:
+                self._release(key, fd)
+
+    def _lock_path(self, key: str) -> str:
+        """Return the lock file path for key"""
+        return os.path.join(self.lock_dir, f"{key}.lock")
+
+    def _acquire(self, key: str) -> Optional[int]:
+        """Take the exclusive file lock for key, or return None on timeout"""
+        path = self._lock_path(key)
+        deadline = time.monotonic() + self.timeout
+        waited = False
+
+        while True:
+            fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                os.close(fd)
+                if not waited:
+                    waited = True
+                    with self._lock:
+                        self.stats['remote_waits'] += 1
+                if time.monotonic() >= deadline:
+                    return None
+                time.sleep(self.poll_interval)
+                continue
+
+            # The previous holder unlinks the file on release; make sure we
+            # locked the file that is still at the path and not a stale inode
+            try:
+                if os.fstat(fd).st_ino == os.stat(path).st_ino:
+                    return fd
+            except FileNotFoundError:
+                pass
+            os.close(fd)
+
+    def _release(self, key: str, fd: int) -> None:
+        """Remove the lock file and drop the lock"""
+        try:
+            os.unlink(self._lock_path(key))
+        except FileNotFoundError:
+            pass
+        os.close(fd)
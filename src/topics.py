@@ -0,0 +1,144 @@
+"""Topic normalization and near-duplicate detection over stored lessons"""
+
+import re
+import threading
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Common abbreviations expanded before comparison
+ABBREVIATIONS = {
+    'ml': 'machine learning',
+    'ai': 'artificial intelligence',
+    'dl': 'deep learning',
+    'nlp': 'natural language processing',
+    'cv': 'computer vision',
+    'js': 'javascript',
+    'db': 'database',
+    'dbs': 'databases',
+    'os': 'operating systems',
+    'oop': 'object oriented programming',
+    'ds': 'data structures',
+    'stats': 'statistics',
+    'bio': 'biology',
+    'chem': 'chemistry',
+    'econ': 'economics',
+    'math': 'mathematics',
+    'maths': 'mathematics',
+}
+
+# Words that describe the kind of lesson rather than its subject
+FILLER_WORDS = {
+    'a', 'an', 'the', 'to', 'of', 'in', 'on', 'for', 'and', 'with', 'about',
+    'intro', 'introduction', 'introductory', 'basic', 'basics', 'fundamental', 'fundamentals',
+    'beginner', 'beginners', 'overview', 'guide', 'course', 'lesson', 'tutorial',
+    'learn', 'understanding', 'what', 'is', 'are', 'essentials', '101',
+}
+
+# Weight of a whole-word feature relative to one character n-gram. Topics must agree on
+# their words to match: "Organic" and "Inorganic" share most n-grams but not the word.
+WORD_WEIGHT = 8.0
+
+
+def _singular(word: str) -> str:
+    """Crudely singularize an English word"""
+    if len(word) > 4 and word.endswith('ies'):
+        return word[:-3] + 'y'
+    if len(word) > 3 and word.endswith('s') and not word.endswith(('ss', 'us', 'is')):
+        return word[:-1]
+    return word
+
+
+def normalize_topic(topic: str) -> str:
+    """Reduce a topic to its subject words: lowercase, expand abbreviations, drop filler"""
+    words = re.findall(r"[a-z0-9+#]+", topic.lower())
+    expanded = []
+    for word in words:
+        expanded.extend(ABBREVIATIONS.get(word, word).split())
+
+    subject = [_singular(word) for word in expanded if word not in FILLER_WORDS]
+    # A topic made only of filler ("Introduction") is its own subject
+    return " ".join(subject or expanded)
+
+
+class TopicIndex:
+    """In-memory cosine-similarity index of hashed character n-gram topic embeddings"""
+
+    def __init__(self, dim: int = 1024, ngram_range: Tuple[int, int] = (3, 5)):
+        """Initialize an empty index"""
+        self.dim = dim
+        self.ngram_range = ngram_range
+        self._vectors = np.zeros((0, dim), dtype=np.float32)
+        # (language, depth) is stored as a small integer code so filtering stays vectorized
+        self._groups = np.zeros(0, dtype=np.int32)
+        self._group_codes: Dict[Tuple[str, str], int] = {}
+        self._ids: List[int] = []
+        self._id_set = set()
+        self._topics: List[str] = []
+        self._count = 0
+        self.max_id = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, content_id: int) -> bool:
+        return content_id in self._id_set
+
+    def embed(self, topic: str) -> np.ndarray:
+        """Embed a topic as an L2-normalized hashed bag of words and character n-grams"""
+        text = normalize_topic(topic)
+        vector = np.zeros(self.dim, dtype=np.float32)
+        padded = f" {text} "
+
+        features = [(f"w:{word}", WORD_WEIGHT) for word in text.split()]
+        for n in range(self.ngram_range[0], self.ngram_range[1] + 1):
+            features.extend((padded[i:i + n], 1.0) for i in range(len(padded) - n + 1))
+
+        for feature, weight in features:
+            digest = zlib.crc32(feature.encode('utf-8'))
+            # The sign bit keeps hash collisions from only ever adding up
+            vector[digest % self.dim] += weight if digest & 0x80000000 else -weight
+
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def add(self, content_id: int, topic: str, language: str = 'en', depth: str = 'intermediate') -> None:
+        """Add a stored lesson's topic to the index; an id already indexed is ignored"""
+        vector = self.embed(topic)
+        with self._lock:
+            if content_id in self._id_set:
+                return
+            if self._count == len(self._vectors):
+                capacity = max(64, 2 * len(self._vectors))
+                grown = np.zeros((capacity, self.dim), dtype=np.float32)
+                grown[:self._count] = self._vectors[:self._count]
+                self._vectors = grown
+                groups = np.full(capacity, -1, dtype=np.int32)
+                groups[:self._count] = self._groups[:self._count]
+                self._groups = groups
+            group = self._group_codes.setdefault((language, depth), len(self._group_codes))
+            self._vectors[self._count] = vector
+            self._groups[self._count] = group
+            self._ids.append(content_id)
+            self._id_set.add(content_id)
+            self._topics.append(topic)
+            self._count += 1
+            self.max_id = max(self.max_id, content_id)
+
+    def match(self, topic: str, language: str = 'en', depth: str = 'intermediate',
+              threshold: float = 0.85) -> Optional[Dict]:
+        """Return the most similar stored lesson with the same language and depth, if close enough"""
+        vector = self.embed(topic)
+        with self._lock:
+            group = self._group_codes.get((language, depth))
+            if group is None:
+                return None
+            scores = self._vectors[:self._count] @ vector
+            scores = np.where(self._groups[:self._count] == group, scores, -1.0)
+            best = int(np.argmax(scores))
+            score = float(scores[best])
+            if score < threshold:
+                return None
+            return {'id': self._ids[best], 'topic': self._topics[best], 'score': score}
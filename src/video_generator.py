@@ -1,62 +1,259 @@
 """Video generation module using MoviePy and FFmpeg"""
 
-import moviepy.editor as mpy
 import pyttsx3
 import logging
 import os
-from typing import Dict, Optional
+import shutil
+import subprocess
+import tempfile
+import uuid
+import wave
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
 from PIL import Image, ImageDraw, ImageFont
+import copy
 import io
+from .cache import AudioCache, SegmentCache
+from .metrics import VIDEO_STAGE_SECONDS
 
 logger = logging.getLogger(__name__)
 
+FONT_PATH = "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf"
+
+# Rendition ladder: frame size and bitrate caps for each HLS variant
+RENDITIONS = {
+    '360p': {'width': 640, 'height': 360, 'video_bitrate': '400k', 'buffer_size': '800k', 'audio_bitrate': '64k'},
+    '480p': {'width': 854, 'height': 480, 'video_bitrate': '800k', 'buffer_size': '1600k', 'audio_bitrate': '96k'},
+    '720p': {'width': 1280, 'height': 720, 'video_bitrate': '1500k', 'buffer_size': '3000k', 'audio_bitrate': '128k'},
+    '1080p': {'width': 1920, 'height': 1080, 'video_bitrate': '3000k', 'buffer_size': '6000k', 'audio_bitrate': '128k'},
+}
+
+MASTER_PLAYLIST = 'master.m3u8'
+
+
+@lru_cache(maxsize=64)
+def load_font(path: str, size: int) -> ImageFont.ImageFont:
+    """Load a TrueType font once per (path, size), falling back to the default font"""
+    try:
+        return ImageFont.truetype(path, size)
+    except (OSError, ValueError):
+        return ImageFont.load_default()
+
+
+@lru_cache(maxsize=16)
+def _background(width: int, height: int, bg_color: tuple) -> Image.Image:
+    """Return a shared solid background layer; callers must copy before drawing"""
+    return Image.new('RGB', (width, height), bg_color)
+
+
+def render_text_frame(text: str, width: int = 1920, height: int = 1080,
+                      bg_color: tuple = (67, 126, 234), text_color: tuple = (255, 255, 255),
+                      font_size: int = 60) -> Image.Image:
+    """Render centered text on a solid background as a PIL image"""
+    img = _background(width, height, tuple(bg_color)).copy()
+    draw = ImageDraw.Draw(img)
+    font = load_font(FONT_PATH, font_size)
+    
+    # Draw text
+    bbox = draw.textbbox((0, 0), text, font=font)
+    text_width = bbox[2] - bbox[0]
+    text_height = bbox[3] - bbox[1]
+    
+    x = (width - text_width) // 2
+    y = (height - text_height) // 2
+    
+    draw.text((x, y), text, fill=text_color, font=font)
+    
+    return img
+
+
+@lru_cache(maxsize=1)
+def ffmpeg_binary() -> str:
+    """Return the ffmpeg executable, resolving it through MoviePy's config on first use"""
+    # moviepy.config locates (and may download) ffmpeg at import time, so defer it
+    from moviepy.config import get_setting
+    return get_setting('FFMPEG_BINARY')
+
+
+def _render_frame_file(job: Tuple[Dict, str]) -> str:
+    """Render one frame description straight to a PNG file and return its path
+
+    Module level so process pools can pickle it.
+    """
+    spec, path = job
+    render_text_frame(**spec).save(path, compress_level=1)
+    return path
+
+
+def _audio_duration(path: str) -> float:
+    """Return the length of an audio file in seconds"""
+    try:
+        with wave.open(path, 'rb') as f:
+            return f.getnframes() / float(f.getframerate())
+    except (wave.Error, EOFError):
+        # Not a plain PCM WAV (e.g. an MP3 from another TTS driver)
+        import moviepy.editor as mpy
+        clip = mpy.AudioFileClip(path)
+        try:
+            return clip.duration
+        finally:
+            clip.close()
+
+
+def _write_silence(path: str, seconds: float, rate: int = 22050) -> str:
+    """Write a silent mono 16-bit WAV file"""
+    with wave.open(path, 'wb') as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(rate)
+        f.writeframes(b'\x00\x00' * int(seconds * rate))
+    return path
+
+
+_frame_pool = None
+
+
+def _get_frame_pool(workers: int) -> ProcessPoolExecutor:
+    """Return the process-wide frame rendering pool, starting it on first use"""
+    global _frame_pool
+    if _frame_pool is None or _frame_pool[0] != (os.getpid(), workers):
+        _frame_pool = ((os.getpid(), workers), ProcessPoolExecutor(max_workers=workers))
+    return _frame_pool[1]
+
 
 class VideoGenerator:
     """Generate educational videos from content using MoviePy"""
     
-    def __init__(self, output_dir: str = './outputs/videos'):
+    def __init__(self, output_dir: str = './outputs/videos', audio_cache: Optional[AudioCache] = None,
+                 segment_cache: Optional[SegmentCache] = None):
         """Initialize video generator"""
         self.output_dir = output_dir
         self.fps = int(os.getenv('VIDEO_FPS', 30))
         self.format = os.getenv('VIDEO_FORMAT', 'mp4')
-        self.tts_engine = pyttsx3.init()
-        self.tts_engine.setProperty('rate', int(os.getenv('TTS_VOICE_RATE', 150)))
-        self.tts_engine.setProperty('volume', float(os.getenv('TTS_VOICE_VOLUME', 0.9)))
+        self.encode_mode = os.getenv('VIDEO_ENCODE_MODE', 'still')
+        self.still_fps = int(os.getenv('VIDEO_STILL_FPS', 1))
+        self.silent_slide_seconds = float(os.getenv('VIDEO_SILENT_SLIDE_SECONDS', 3))
+        self.tts_engine_name = os.getenv('TTS_ENGINE', 'pyttsx3')
+        self.tts_rate = int(os.getenv('TTS_VOICE_RATE', 150))
+        self.tts_volume = float(os.getenv('TTS_VOICE_VOLUME', 0.9))
+        self.tts_voice = os.getenv('TTS_VOICE')
+        self._tts_engine = None
+        self.audio_cache = audio_cache or AudioCache()
+        self._segment_cache = segment_cache
+        self.frame_workers = int(os.getenv('FRAME_RENDER_WORKERS', os.cpu_count() or 1))
+        self.frame_pool_threshold = int(os.getenv('FRAME_RENDER_POOL_THRESHOLD', 8))
+        # Cores granted by the render scheduler; 0 lets ffmpeg and the frame pool size themselves
+        self.threads = int(os.getenv('RENDER_THREADS', 0))
+        if self.threads:
+            self.frame_workers = min(self.frame_workers, self.threads)
+        self.quality = os.getenv('VIDEO_QUALITY', '1080p')
+        self.renditions = [name.strip() for name in os.getenv('VIDEO_RENDITIONS', '360p,720p,1080p').split(',')
+                           if name.strip()]
+        self.hls_segment_seconds = int(os.getenv('HLS_SEGMENT_SECONDS', 6))
+        self.preset = os.getenv('VIDEO_PRESET', 'veryfast')
+        self.preview_quality = os.getenv('PREVIEW_QUALITY', '480p')
+        self.preview_fps = int(os.getenv('PREVIEW_FPS', 5))
+        self.preview_preset = os.getenv('PREVIEW_PRESET', 'ultrafast')
+        self.preview_sections = int(os.getenv('PREVIEW_SECTIONS', 0))
+        self.output_suffix = ''
+        
+        unknown = [name for name in [self.quality, self.preview_quality] + self.renditions if name not in RENDITIONS]
+        if unknown:
+            raise ValueError(f"Unknown video rendition(s) {', '.join(unknown)}; expected one of {', '.join(RENDITIONS)}")
         
         os.makedirs(output_dir, exist_ok=True)
     
-    def create_video(self, content: Dict, style: str = 'experimental', duration_seconds: int = 120) -> Dict:
-        """Create a video from educational content"""
+    @property
+    def tts_engine(self):
+        """Return the TTS engine, initializing it on first use so fully cached renders never load a driver"""
+        if self._tts_engine is None:
+            engine = pyttsx3.init()
+            engine.setProperty('rate', self.tts_rate)
+            engine.setProperty('volume', self.tts_volume)
+            if self.tts_voice:
+                engine.setProperty('voice', self.tts_voice)
+            self._tts_engine = engine
+        return self._tts_engine
+    
+    @property
+    def segment_cache(self) -> SegmentCache:
+        """Return the encoded segment cache, creating its directory only once segments mode uses it"""
+        if self._segment_cache is None:
+            self._segment_cache = SegmentCache()
+        return self._segment_cache
+    
+    def create_video(self, content: Dict, style: str = 'experimental', duration_seconds: int = 120,
+                     preview: bool = False, preview_sections: Optional[int] = None) -> Dict:
+        """Create a video from educational content, or a quick low-resolution preview of it"""
+        if preview:
+            return self.create_preview_video(content, style, preview_sections)
+        
         try:
             logger.info(f"Creating video for topic: {content['topic']}")
             
-            # Generate narration script
-            script = self._generate_script(content)
-            
-            # Create audio from script
-            audio_path = self._create_audio(script)
+            # Generate narration script, one segment per slide
+            with VIDEO_STAGE_SECONDS.time(stage='script'):
+                segments = self._generate_script_segments(content)
+            ladder = self._ladder()
+            # Chunks are MP4s joined by stream copy, so other containers take the single-pass path
+            incremental = self.encode_mode == 'segments' and self.format == 'mp4'
             
-            # Create video frames
-            frames = self._create_frames(content, style)
-            
-            # Combine frames with audio
-            video_path = self._combine_audio_video(frames, audio_path, content['topic'])
+            # Slides go straight to disk so memory does not grow with lesson length
+            with tempfile.TemporaryDirectory(dir=self.output_dir) as work_dir:
+                # Narrate in the background while the slides render
+                with ThreadPoolExecutor(max_workers=1) as tts_executor:
+                    audio_future = tts_executor.submit(self._timed_segment_audio, segments)
+                    with VIDEO_STAGE_SECONDS.time(stage='frames'):
+                        if incremental:
+                            # Only slides without a cached encoded chunk are drawn
+                            frame_paths = self._plan_segments(content, style, segments, ladder or [self.quality],
+                                                              work_dir)
+                        elif ladder:
+                            # Each rendition is drawn at its own size rather than scaled down
+                            frame_paths = {name: self._render_frame_files(content, style, work_dir, name)
+                                           for name in ladder}
+                        else:
+                            frame_paths = self._render_frame_files(content, style, work_dir)
+                    segment_paths, durations = audio_future.result()
+                
+                if incremental:
+                    # Each chunk carries its own narration, so there is no joined track to build
+                    with VIDEO_STAGE_SECONDS.time(stage='encode'):
+                        video_path = self._build_from_segments(frame_paths, segment_paths, durations,
+                                                               content['topic'], ladder)
+                else:
+                    # Join the narration and time each slide to its own segment
+                    with VIDEO_STAGE_SECONDS.time(stage='audio_concat'):
+                        audio_path = self._concat_audio(segment_paths)
+                    try:
+                        with VIDEO_STAGE_SECONDS.time(stage='encode'):
+                            video_path = self._combine_audio_video(frame_paths, audio_path, content['topic'],
+                                                                   durations)
+                    finally:
+                        os.remove(audio_path)
             
             # Calculate file size
             file_size_mb = os.path.getsize(video_path) / (1024 * 1024)
             
+            hls_dir = os.path.splitext(video_path)[0]
+            has_hls = os.path.exists(os.path.join(hls_dir, MASTER_PLAYLIST))
+            
             return {
                 'video_id': hash(content['topic'] + datetime.now().isoformat()),
                 'content_id': content.get('id'),
                 'video_path': video_path,
                 'video_url': f"/outputs/videos/{os.path.basename(video_path)}",
+                'hls_url': f"/outputs/videos/{os.path.basename(hls_dir)}/{MASTER_PLAYLIST}" if has_hls else None,
+                'renditions': ladder if has_hls else [self.quality],
                 'title': content['title'],
                 'topic': content['topic'],
-                'duration': duration_seconds,
+                'duration': round(sum(durations), 2),
                 'file_size': f"{file_size_mb:.2f} MB",
                 'format': self.format,
                 'style': style,
+                'preview': False,
                 'created_at': datetime.utcnow().isoformat(),
                 'status': 'completed'
             }
@@ -67,17 +264,23 @@ class VideoGenerator:
     
     def _generate_script(self, content: Dict) -> str:
         """Generate narration script from content"""
-        script_parts = [content['description']]
+        return " ".join(self._generate_script_segments(content))
+    
+    def _generate_script_segments(self, content: Dict) -> List[str]:
+        """Generate the narration for each slide: title, one per section, then key points"""
+        segments = [f"{content['title']}. {content['description']}"]
         
         for section in content.get('sections', []):
-            script_parts.append(f"\n{section['title']}")
-            script_parts.append(section['content'])
+            segments.append(f"{section['title']}. {section['content']}")
         
-        return " ".join(script_parts)
+        key_points = content.get('key_points', [])[:5]
+        segments.append("Key points. " + ". ".join(key_points) if key_points else "")
+        
+        return segments
     
-    def _create_audio(self, script: str) -> str:
+    def _create_audio(self, script: str, audio_path: Optional[str] = None) -> str:
         """Create audio from text using text-to-speech"""
-        audio_path = os.path.join(self.output_dir, f"audio_{datetime.now().timestamp()}.mp3")
+        audio_path = audio_path or os.path.join(self.output_dir, f"audio_{datetime.now().timestamp()}.wav")
         
         try:
             self.tts_engine.save_to_file(script, audio_path)
@@ -88,106 +291,506 @@ class VideoGenerator:
             logger.error(f"Error creating audio: {str(e)}")
             raise
     
-    def _create_frames(self, content: Dict, style: str) -> list:
-        """Create video frames from content"""
-        frames = []
+    def _timed_segment_audio(self, segments: List[str]) -> Tuple[List[str], List[float]]:
+        """Run _create_segment_audio, recording its time as the tts stage"""
+        with VIDEO_STAGE_SECONDS.time(stage='tts'):
+            return self._create_segment_audio(segments)
+    
+    def _create_segment_audio(self, segments: List[str]) -> Tuple[List[str], List[float]]:
+        """Return cached narration files and durations for each segment, synthesizing misses"""
+        paths: List[Optional[str]] = []
+        pending = []
+        
+        for text in segments:
+            key = self._audio_key(text)
+            path = self.audio_cache.get(key)
+            if path is None:
+                tmp_path = os.path.join(self.audio_cache.cache_dir, f".tmp_{uuid.uuid4().hex}.wav")
+                pending.append((len(paths), key, text, tmp_path))
+            paths.append(path)
+        
+        speech = [(index, key, text, tmp_path) for index, key, text, tmp_path in pending if text.strip()]
+        if speech:
+            # Queue every missing segment and let the engine synthesize them in one run
+            for _, _, text, tmp_path in speech:
+                self.tts_engine.save_to_file(text, tmp_path)
+            self.tts_engine.runAndWait()
+            logger.info(f"Synthesized {len(speech)} of {len(segments)} narration segments")
+        
+        for index, key, text, tmp_path in pending:
+            if not text.strip():
+                _write_silence(tmp_path, self.silent_slide_seconds)
+            paths[index] = self.audio_cache.put(key, tmp_path)
+        
+        return paths, [_audio_duration(path) for path in paths]
+    
+    def _audio_key(self, text: str) -> str:
+        """Return the audio cache key for a narration segment under the current voice"""
+        if not text.strip():
+            return AudioCache.make_key('', 'silence', 0, 0.0, f"silence:{self.silent_slide_seconds}")
+        return AudioCache.make_key(text, self.tts_voice or 'default', self.tts_rate,
+                                   self.tts_volume, self.tts_engine_name)
+    
+    def _concat_audio(self, paths: List[str]) -> str:
+        """Concatenate narration segments into a single WAV track"""
+        output_path = os.path.join(self.output_dir, f"audio_{datetime.now().timestamp()}.wav")
+        list_path = output_path + '.txt'
+        
+        with open(list_path, 'w') as f:
+            f.write("".join(f"file '{os.path.abspath(path)}'\n" for path in paths))
+        
+        try:
+            # Re-encode rather than stream-copy so the joined file gets one correct WAV header
+            subprocess.run(
+                [ffmpeg_binary(), '-y', '-loglevel', 'error', '-f', 'concat',
+                 '-safe', '0', '-i', list_path, '-c:a', 'pcm_s16le', output_path],
+                check=True, capture_output=True
+            )
+        finally:
+            os.remove(list_path)
+        
+        return output_path
+    
+    def _render_frame_files(self, content: Dict, style: str, work_dir: str,
+                            rendition: Optional[str] = None) -> List[str]:
+        """Render each slide to a PNG in work_dir, holding at most one image per worker"""
+        rendition = rendition or self.quality
+        jobs = [(spec, os.path.join(work_dir, f"slide_{rendition}_{index:04d}.png"))
+                for index, spec in enumerate(self._frame_specs(content, style, rendition))]
+        return self._render_jobs(jobs)
+    
+    def _render_jobs(self, jobs: List[Tuple[Dict, str]]) -> List[str]:
+        """Render (spec, path) jobs to PNG files, across the process pool for long lessons"""
+        # Rendering is CPU bound, so long lessons fan out across processes
+        if len(jobs) >= self.frame_pool_threshold and self.frame_workers > 1:
+            try:
+                pool = _get_frame_pool(self.frame_workers)
+                return list(pool.map(_render_frame_file, jobs))
+            except Exception as e:
+                logger.warning(f"Parallel frame rendering failed, rendering serially: {str(e)}")
+        
+        return [_render_frame_file(job) for job in jobs]
+    
+    def _frame_specs(self, content: Dict, style: str, rendition: Optional[str] = None) -> List[Dict]:
+        """Describe each frame as keyword arguments for render_text_frame, sized for a rendition"""
+        size = RENDITIONS[rendition or self.quality]
+        width, height = size['width'], size['height']
+        # Font sizes are designed for 1080p and scale with the frame height
+        scale = height / 1080
+        specs = []
         
         # Create title frame
-        title_frame = self._create_text_frame(
-            content['title'],
-            width=1920,
-            height=1080,
-            bg_color=(67, 126, 234),
-            text_color=(255, 255, 255),
-            font_size=80
-        )
-        frames.append(title_frame)
+        specs.append({
+            'text': content['title'],
+            'width': width,
+            'height': height,
+            'bg_color': (67, 126, 234),
+            'text_color': (255, 255, 255),
+            'font_size': round(80 * scale)
+        })
         
         # Create content frames
         for section in content.get('sections', []):
-            content_frame = self._create_text_frame(
-                f"{section['title']}\n\n{section['content'][:200]}...",
-                width=1920,
-                height=1080,
-                bg_color=(248, 249, 250),
-                text_color=(51, 51, 51),
-                font_size=40
-            )
-            frames.append(content_frame)
+            specs.append({
+                'text': f"{section['title']}\n\n{section['content'][:200]}...",
+                'width': width,
+                'height': height,
+                'bg_color': (248, 249, 250),
+                'text_color': (51, 51, 51),
+                'font_size': round(40 * scale)
+            })
         
         # Create summary frame
         key_points = content.get('key_points', [])
         summary_text = "Key Points:\n" + "\n".join([f"• {point}" for point in key_points[:5]])
-        summary_frame = self._create_text_frame(
-            summary_text,
-            width=1920,
-            height=1080,
-            bg_color=(118, 75, 162),
-            text_color=(255, 255, 255),
-            font_size=50
-        )
-        frames.append(summary_frame)
+        specs.append({
+            'text': summary_text,
+            'width': width,
+            'height': height,
+            'bg_color': (118, 75, 162),
+            'text_color': (255, 255, 255),
+            'font_size': round(50 * scale)
+        })
         
-        return frames
+        return specs
+    
+    def _ladder(self) -> List[str]:
+        """Return the renditions to encode as HLS, smallest first, or [] to write a single file"""
+        if not self.renditions or self.format != 'mp4' or self.encode_mode not in ('still', 'segments'):
+            return []
+        # The download MP4 is cut from the VIDEO_QUALITY rendition, so it is always on the ladder
+        names = set(self.renditions) | {self.quality}
+        return sorted(names, key=lambda name: RENDITIONS[name]['height'])
     
     def _create_text_frame(self, text: str, width: int = 1920, height: int = 1080,
                           bg_color: tuple = (67, 126, 234), text_color: tuple = (255, 255, 255),
                           font_size: int = 60) -> Image:
         """Create a text frame as PIL image"""
-        # Create image
-        img = Image.new('RGB', (width, height), bg_color)
-        draw = ImageDraw.Draw(img)
+        return render_text_frame(text, width, height, bg_color, text_color, font_size)
+    
+    def _combine_audio_video(self, frames, audio_path: str, topic: str,
+                             durations: Optional[List[float]] = None) -> str:
+        """Combine slides and audio into a video file, showing slide i for durations[i] seconds
         
-        # Try to use a nice font, fallback to default
-        try:
-            font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", font_size)
-        except:
-            font = ImageFont.load_default()
+        frames may be PIL images or paths to rendered slides; either way the
+        encoder reads one slide at a time, so memory does not grow with their number.
+        A dict of such lists keyed by rendition name encodes the whole ladder in
+        one ffmpeg run, writing HLS playlists to a directory named after the video.
+        """
+        # Get audio duration
+        duration = _audio_duration(audio_path)
         
-        # Draw text
-        bbox = draw.textbbox((0, 0), text, font=font)
-        text_width = bbox[2] - bbox[0]
-        text_height = bbox[3] - bbox[1]
+        if durations is None:
+            count = len(next(iter(frames.values()))) if isinstance(frames, dict) else len(frames)
+            clip_duration = duration / count if count else 5
+            durations = [clip_duration] * count
         
-        x = (width - text_width) // 2
-        y = (height - text_height) // 2
+        # Write output
+        output_path = self._output_path(topic)
         
-        draw.text((x, y), text, fill=text_color, font=font)
+        with tempfile.TemporaryDirectory(dir=self.output_dir) as tmp_dir:
+            if isinstance(frames, dict):
+                ladder = {name: self._frame_files(rendition_frames, tmp_dir, name)
+                          for name, rendition_frames in frames.items()}
+                try:
+                    self._encode_ladder(ladder, durations, audio_path, output_path)
+                    logger.info(f"Video created: {output_path} ({', '.join(ladder)})")
+                    return output_path
+                except (OSError, subprocess.CalledProcessError) as e:
+                    logger.warning(f"Rendition ladder encode failed, writing a single file: {str(e)}")
+                    shutil.rmtree(os.path.splitext(output_path)[0], ignore_errors=True)
+                frames = ladder[self.quality]
+            
+            frame_paths = self._frame_files(frames, tmp_dir)
+            
+            if self.encode_mode == 'still' and self.format == 'mp4':
+                try:
+                    self._encode_stills(frame_paths, durations, audio_path, output_path)
+                    logger.info(f"Video created: {output_path}")
+                    return output_path
+                except (OSError, subprocess.CalledProcessError) as e:
+                    logger.warning(f"Still-image encode failed, falling back to streaming encode: {str(e)}")
+            
+            self._encode_stream(frame_paths, durations, audio_path, output_path)
         
-        return img
+        logger.info(f"Video created: {output_path}")
+        return output_path
     
-    def _combine_audio_video(self, frames: list, audio_path: str, topic: str) -> str:
-        """Combine frames and audio into a video file"""
-        # Get audio duration
-        audio = mpy.AudioFileClip(audio_path)
-        duration = audio.duration
+    def _output_path(self, topic: str) -> str:
+        """Return a unique path for a new video about topic"""
+        return os.path.join(
+            self.output_dir,
+            f"{topic.replace(' ', '_')}_{datetime.now().timestamp()}{self.output_suffix}.{self.format}"
+        )
+    
+    def _frame_files(self, frames: list, tmp_dir: str, prefix: str = 'slide') -> List[str]:
+        """Return a path for each frame, saving any PIL images to tmp_dir"""
+        frame_paths = []
+        for index, frame in enumerate(frames):
+            if not isinstance(frame, str):
+                path = os.path.join(tmp_dir, f"{prefix}_{index:04d}.png")
+                frame.save(path, compress_level=1)
+                frame = path
+            frame_paths.append(frame)
+        return frame_paths
+    
+    def _write_concat_list(self, frame_paths: List[str], durations: List[float], list_path: str) -> str:
+        """Write an ffmpeg concat demuxer script showing each slide for its duration"""
+        lines = [f"file '{os.path.abspath(path)}'\nduration {seconds:.3f}"
+                 for path, seconds in zip(frame_paths, durations)]
+        # The concat demuxer ignores the last duration unless the file is repeated
+        lines.append(f"file '{os.path.abspath(frame_paths[-1])}'")
         
-        # Convert PIL images to numpy arrays and create clips
-        clip_duration = duration / len(frames) if frames else 5
-        clips = []
+        with open(list_path, 'w') as f:
+            f.write("\n".join(lines) + "\n")
+        return list_path
+    
+    def _encode_stills(self, frame_paths: List[str], durations: List[float], audio_path: Optional[str],
+                       output_path: str) -> None:
+        """Encode each slide once with ffmpeg's concat demuxer instead of frame by frame"""
+        with tempfile.TemporaryDirectory(dir=self.output_dir) as tmp_dir:
+            list_path = self._write_concat_list(frame_paths, durations, os.path.join(tmp_dir, 'slides.txt'))
+            
+            command = [
+                ffmpeg_binary(), '-y', '-loglevel', 'error',
+                '-f', 'concat', '-safe', '0', '-i', list_path
+            ]
+            if audio_path:
+                command += ['-i', audio_path]
+            command += [
+                '-c:v', 'libx264', '-tune', 'stillimage', '-preset', self.preset,
+                '-r', str(self.still_fps), '-g', str(self.still_fps * 10),
+                '-pix_fmt', 'yuv420p', '-profile:v', 'high', '-level', '4.1'
+            ]
+            if audio_path:
+                command += ['-c:a', 'aac', '-b:a', '128k', '-shortest']
+            command += self._thread_args() + ['-movflags', '+faststart', output_path]
+            
+            result = subprocess.run(command, capture_output=True, text=True)
+            if result.returncode != 0:
+                raise subprocess.CalledProcessError(result.returncode, command, stderr=result.stderr)
+    
+    def _encode_ladder(self, ladder: Dict[str, List[str]], durations: List[float], audio_path: str,
+                       output_path: str) -> None:
+        """Encode every rendition as fMP4 HLS in a single ffmpeg run, then remux the download MP4
         
-        for frame in frames:
-            # Convert PIL image to numpy array
-            import numpy as np
-            frame_array = np.array(frame)
-            clip = mpy.ImageClip(frame_array).set_duration(clip_duration)
-            clips.append(clip)
+        Playlists go to a directory next to output_path with the same stem:
+        master.m3u8 plus <rendition>/index.m3u8 and its segments.
+        """
+        hls_dir = os.path.splitext(output_path)[0]
+        names = list(ladder)
         
-        # Create video
-        video = mpy.concatenate_videoclips(clips)
-        video = video.set_audio(audio)
+        with tempfile.TemporaryDirectory(dir=self.output_dir) as tmp_dir:
+            command = [ffmpeg_binary(), '-y', '-loglevel', 'error']
+            for name in names:
+                list_path = self._write_concat_list(ladder[name], durations, os.path.join(tmp_dir, f"{name}.txt"))
+                command += ['-f', 'concat', '-safe', '0', '-i', list_path]
+            command += ['-i', audio_path]
+            
+            for index in range(len(names)):
+                command += ['-map', f"{index}:v", '-map', f"{len(names)}:a"]
+            
+            # A keyframe at every segment boundary keeps segments the same length in every rendition
+            gop = str(self.still_fps * self.hls_segment_seconds)
+            command += [
+                '-c:v', 'libx264', '-tune', 'stillimage', '-preset', self.preset,
+                '-r', str(self.still_fps), '-g', gop, '-keyint_min', gop, '-sc_threshold', '0',
+                '-pix_fmt', 'yuv420p', '-c:a', 'aac'
+            ]
+            for index, name in enumerate(names):
+                rendition = RENDITIONS[name]
+                command += [
+                    f"-b:v:{index}", rendition['video_bitrate'],
+                    f"-maxrate:v:{index}", rendition['video_bitrate'],
+                    f"-bufsize:v:{index}", rendition['buffer_size'],
+                    f"-b:a:{index}", rendition['audio_bitrate']
+                ]
+            
+            command += self._thread_args() + ['-shortest'] + self._hls_output(hls_dir, names)
+            
+            result = subprocess.run(command, capture_output=True, text=True)
+            if result.returncode != 0:
+                raise subprocess.CalledProcessError(result.returncode, command, stderr=result.stderr)
+            
+            # The download MP4 reuses the encoded segments rather than encoding a second time
+            self._remux_rendition(os.path.join(hls_dir, self.quality), output_path, tmp_dir)
+    
+    def _hls_output(self, hls_dir: str, names: List[str]) -> List[str]:
+        """Return ffmpeg output arguments writing stream pair i as the HLS variant names[i]"""
+        return [
+            '-f', 'hls', '-hls_time', str(self.hls_segment_seconds),
+            '-hls_playlist_type', 'vod', '-hls_segment_type', 'fmp4',
+            '-hls_flags', 'independent_segments',
+            '-hls_segment_filename', os.path.join(hls_dir, '%v', 'segment_%03d.m4s'),
+            '-master_pl_name', MASTER_PLAYLIST,
+            '-var_stream_map', " ".join(f"v:{index},a:{index},name:{name}" for index, name in enumerate(names)),
+            os.path.join(hls_dir, '%v', 'index.m3u8')
+        ]
+    
+    def _remux_rendition(self, rendition_dir: str, output_path: str, tmp_dir: str) -> None:
+        """Join a rendition's init and media segments and stream-copy them into a faststart MP4"""
+        parts = []
+        with open(os.path.join(rendition_dir, 'index.m3u8')) as f:
+            for line in f:
+                line = line.strip()
+                if line.startswith('#EXT-X-MAP:'):
+                    parts.append(line.split('URI="', 1)[1].rstrip('"'))
+                elif line and not line.startswith('#'):
+                    parts.append(line)
         
-        # Write output
-        output_path = os.path.join(
-            self.output_dir,
-            f"{topic.replace(' ', '_')_{datetime.now().timestamp()}.{self.format}"
-        )
+        joined_path = os.path.join(tmp_dir, 'joined.mp4')
+        with open(joined_path, 'wb') as joined:
+            for part in parts:
+                with open(os.path.join(rendition_dir, part), 'rb') as segment:
+                    shutil.copyfileobj(segment, joined)
         
-        video.write_videofile(output_path, fps=self.fps, verbose=False, logger=None)
-        logger.info(f"Video created: {output_path}")
+        command = [ffmpeg_binary(), '-y', '-loglevel', 'error', '-i', joined_path,
+                   '-c', 'copy', '-movflags', '+faststart', output_path]
+        result = subprocess.run(command, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise subprocess.CalledProcessError(result.returncode, command, stderr=result.stderr)
+    
+    def _thread_args(self, concurrent: int = 1) -> List[str]:
+        """Return ffmpeg's -threads option, sharing this render's cores among concurrent encodes"""
+        if not self.threads:
+            return []
+        return ['-threads', str(max(1, self.threads // concurrent))]
+    
+    def _segment_encoder(self, rendition: str) -> Dict:
+        """Return every setting that shapes an encoded chunk, so changing one misses the cache"""
+        return dict(RENDITIONS[rendition], rendition=rendition, fps=self.still_fps,
+                    gop=self.still_fps * self.hls_segment_seconds, preset=self.preset, font=FONT_PATH)
+    
+    def _plan_segments(self, content: Dict, style: str, segments: List[str], renditions: List[str],
+                       work_dir: str) -> Dict[str, List[Dict]]:
+        """Look up each slide's encoded chunk per rendition, rendering frames only for the missing ones
         
+        Returns {rendition: [{'key', 'path', 'frame'}]} with path set on a cache
+        hit and frame set to the rendered slide on a miss.
+        """
+        plan, jobs = {}, []
+        for rendition in renditions:
+            encoder = self._segment_encoder(rendition)
+            entries = []
+            for index, (spec, text) in enumerate(zip(self._frame_specs(content, style, rendition), segments)):
+                key = SegmentCache.make_key(spec, self._audio_key(text), encoder)
+                entry = {'key': key, 'path': self.segment_cache.get(key, 'mp4'), 'frame': None}
+                if entry['path'] is None:
+                    entry['frame'] = os.path.join(work_dir, f"slide_{rendition}_{index:04d}.png")
+                    jobs.append((spec, entry['frame']))
+                entries.append(entry)
+            plan[rendition] = entries
+        
+        self._render_jobs(jobs)
+        return plan
+    
+    def _encode_segment(self, frame_path: str, audio_path: str, seconds: float, rendition: str,
+                        output_path: str, list_path: str, concurrent: int = 1) -> None:
+        """Encode one slide and its narration as a self-contained MP4 chunk"""
+        encoder = RENDITIONS[rendition]
+        self._write_concat_list([frame_path], [seconds], list_path)
+        gop = str(self.still_fps * self.hls_segment_seconds)
+        
+        command = [
+            ffmpeg_binary(), '-y', '-loglevel', 'error',
+            '-f', 'concat', '-safe', '0', '-i', list_path, '-i', audio_path,
+            '-c:v', 'libx264', '-tune', 'stillimage', '-preset', self.preset,
+            '-r', str(self.still_fps), '-g', gop, '-keyint_min', gop, '-sc_threshold', '0',
+            '-pix_fmt', 'yuv420p', '-profile:v', 'high',
+            '-b:v', encoder['video_bitrate'], '-maxrate', encoder['video_bitrate'],
+            '-bufsize', encoder['buffer_size'],
+            # Every chunk gets the same audio format so they can be joined by stream copy
+            '-c:a', 'aac', '-b:a', encoder['audio_bitrate'], '-ar', '44100', '-ac', '2',
+            # Cut the video to the narration rather than a whole number of frames, or joins drift
+            '-t', f"{seconds:.3f}"
+        ] + self._thread_args(concurrent) + ['-f', 'mp4', output_path]
+        
+        result = subprocess.run(command, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise subprocess.CalledProcessError(result.returncode, command, stderr=result.stderr)
+    
+    def _build_from_segments(self, plan: Dict[str, List[Dict]], audio_paths: List[str], durations: List[float],
+                             topic: str, ladder: List[str]) -> str:
+        """Encode the chunks missing from the cache, then join every rendition by stream copy"""
+        output_path = self._output_path(topic)
+        names = list(plan)
+        dirty = [(name, index, entry) for name in names
+                 for index, entry in enumerate(plan[name]) if entry['path'] is None]
+        
+        with tempfile.TemporaryDirectory(dir=self.output_dir) as tmp_dir:
+            def encode(item):
+                name, index, entry = item
+                tmp_path = os.path.join(self.segment_cache.cache_dir, f".tmp_{uuid.uuid4().hex}.mp4")
+                try:
+                    self._encode_segment(entry['frame'], audio_paths[index], durations[index], name, tmp_path,
+                                         os.path.join(tmp_dir, f"{name}_{index:04d}.txt"), workers)
+                except Exception:
+                    if os.path.exists(tmp_path):
+                        os.remove(tmp_path)
+                    raise
+                entry['path'] = self.segment_cache.put(entry['key'], tmp_path, 'mp4')
+            
+            # Chunks are independent ffmpeg runs, so the dirty ones encode side by side
+            workers = max(1, min(self.frame_workers, len(dirty)))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                list(executor.map(encode, dirty))
+            logger.info(f"Encoded {len(dirty)} of {sum(len(entries) for entries in plan.values())} segments")
+            
+            command = [ffmpeg_binary(), '-y', '-loglevel', 'error']
+            for name in names:
+                list_path = os.path.join(tmp_dir, f"{name}.txt")
+                with open(list_path, 'w') as f:
+                    f.write("".join(f"file '{os.path.abspath(entry['path'])}'\n" for entry in plan[name]))
+                command += ['-f', 'concat', '-safe', '0', '-i', list_path]
+            
+            quality = names.index(self.quality)
+            command += ['-map', f"{quality}:v", '-map', f"{quality}:a", '-c', 'copy',
+                        '-movflags', '+faststart', output_path]
+            if ladder:
+                for index in range(len(names)):
+                    command += ['-map', f"{index}:v", '-map', f"{index}:a"]
+                command += ['-c', 'copy'] + self._hls_output(os.path.splitext(output_path)[0], names)
+            
+            result = subprocess.run(command, capture_output=True, text=True)
+            if result.returncode != 0:
+                raise subprocess.CalledProcessError(result.returncode, command, stderr=result.stderr)
+        
+        logger.info(f"Video created: {output_path}")
         return output_path
     
+    def _encode_stream(self, frame_paths: List[str], durations: List[float], audio_path: Optional[str],
+                       output_path: str) -> None:
+        """Pipe raw frames to ffmpeg at self.fps, decoding one slide at a time"""
+        with Image.open(frame_paths[0]) as first:
+            width, height = first.size
+        
+        command = [
+            ffmpeg_binary(), '-y', '-loglevel', 'error',
+            '-f', 'rawvideo', '-pix_fmt', 'rgb24', '-s', f"{width}x{height}",
+            '-r', str(self.fps), '-i', '-'
+        ]
+        if audio_path:
+            command += ['-i', audio_path]
+        if self.format == 'mp4':
+            command += ['-c:v', 'libx264', '-preset', self.preset, '-pix_fmt', 'yuv420p'] + self._thread_args()
+            if audio_path:
+                command += ['-c:a', 'aac', '-b:a', '128k']
+            command += ['-movflags', '+faststart']
+        if audio_path:
+            command += ['-shortest']
+        command.append(output_path)
+        
+        with tempfile.TemporaryFile() as stderr:
+            process = subprocess.Popen(command, stdin=subprocess.PIPE, stderr=stderr)
+            try:
+                written, elapsed = 0, 0.0
+                for path, seconds in zip(frame_paths, durations):
+                    with Image.open(path) as image:
+                        data = image.convert('RGB').tobytes()
+                    # Round the running total so per-slide rounding never drifts from the audio
+                    elapsed += seconds
+                    count = round(elapsed * self.fps) - written
+                    for _ in range(count):
+                        process.stdin.write(data)
+                    written += count
+                process.stdin.close()
+            except BrokenPipeError:
+                pass
+            finally:
+                returncode = process.wait()
+            
+            if returncode != 0:
+                stderr.seek(0)
+                raise subprocess.CalledProcessError(returncode, command, stderr=stderr.read().decode(errors='replace'))
+    
+    def create_preview_video(self, content: Dict, style: str = 'experimental',
+                             sections: Optional[int] = None) -> Dict:
+        """Render a quick, low-resolution check of a video, optionally of its first sections only
+        
+        The preview narrates through the same audio cache as the full render, so
+        the final encode synthesizes nothing the preview already spoke.
+        """
+        sections = sections if sections is not None else self.preview_sections
+        if sections:
+            content = dict(content, sections=content.get('sections', [])[:sections])
+        
+        preview = copy.copy(self)
+        preview.quality = self.preview_quality
+        preview.renditions = []
+        # Cached segments belong to full renders; a preview is a single throwaway encode
+        preview.encode_mode = 'still' if self.format == 'mp4' else 'stream'
+        preview.preset = self.preview_preset
+        # Previews encode still slides, so the cap applies to the still frame rate too
+        preview.fps = min(self.fps, self.preview_fps)
+        preview.still_fps = min(self.still_fps, self.preview_fps)
+        preview.output_suffix = '_preview'
+        
+        result = preview.create_video(content, style)
+        # Keep a TTS engine the preview started for the full render
+        self._tts_engine = preview._tts_engine
+        result['preview'] = True
+        return result
+    
     def create_experimental_video(self, content: Dict) -> Dict:
         """Create an experimental creative video with special effects"""
         return self.create_video(content, style='experimental')
@@ -1,14 +1,15 @@
 """Test cases for AI Learning Platform API endpoints"""
 
+import os
 import pytest
 import json
-from datetime import datetime
+from datetime import datetime, timedelta
 
 
 class TestContentGeneration:
     """Test suite for content generation API"""
     
-    def test_generate_content_success(self, client):
+    def test_generate_content_success(self, client, fake_llm):
         """Test successful content generation"""
         response = client.post(
             '/api/generate-content',
@@ -22,6 +23,88 @@ class TestContentGeneration:
         assert 'title' in data
         assert 'description' in data
         assert data['status'] == 'completed'
+        assert data['sections'][0]['title'] == 'Overview'
+    
+    def test_generated_content_is_persisted(self, client, fake_llm):
+        """Test generated lessons can be read back by ID"""
+        response = client.post(
+            '/api/generate-content',
+            data=json.dumps({'topic': 'Persistence', 'depth': 'basic'}),
+            content_type='application/json'
+        )
+        created = json.loads(response.data)
+        
+        response = client.get(f"/api/content/{created['id']}")
+        assert response.status_code == 200
+        data = json.loads(response.data)
+        assert data['title'] == created['title']
+        assert data['sections'] == created['sections']
+        assert data['depth'] == 'basic'
+        assert created['learning_objectives'] == data['learning_objectives'] == ['learn']
+        assert created['fun_facts'] == data['fun_facts'] == ['fun']
+    
+    def test_near_duplicate_topic_reuses_lesson(self, client, fake_llm, monkeypatch):
+        """Test a rephrased topic returns the stored lesson without calling the LLM"""
+        import openai
+        
+        first = client.post(
+            '/api/generate-content',
+            data=json.dumps({'topic': 'Thermodynamics'}),
+            content_type='application/json'
+        )
+        assert first.status_code == 201
+        created = json.loads(first.data)
+        
+        def fail_create(**kwargs):
+            raise AssertionError('LLM should not be called for a near-duplicate topic')
+        
+        monkeypatch.setattr(openai.ChatCompletion, 'create', fail_create)
+        response = client.post(
+            '/api/generate-content',
+            data=json.dumps({'topic': 'Intro to thermodynamics basics'}),
+            content_type='application/json'
+        )
+        
+        assert response.status_code == 200
+        data = json.loads(response.data)
+        assert data['id'] == created['id']
+        assert data['reused'] is True
+        assert data['matched_topic'] == 'Thermodynamics'
+        assert data['tokens_used'] == 0
+    
+    def test_near_duplicate_requires_same_depth(self, client, fake_llm):
+        """Test a lesson at another depth is generated rather than reused"""
+        first = client.post(
+            '/api/generate-content',
+            data=json.dumps({'topic': 'Plate Tectonics', 'depth': 'basic'}),
+            content_type='application/json'
+        )
+        response = client.post(
+            '/api/generate-content',
+            data=json.dumps({'topic': 'Plate Tectonics', 'depth': 'advanced'}),
+            content_type='application/json'
+        )
+        
+        assert response.status_code == 201
+        assert json.loads(response.data)['id'] != json.loads(first.data)['id']
+    
+    def test_late_committed_lesson_is_indexed(self, app):
+        """Test a lesson committed after a higher id was indexed is still found for reuse"""
+        from app import db, Content, get_topic_index
+        
+        with app.app_context():
+            top = db.session.query(db.func.max(Content.id)).scalar() or 0
+            db.session.add(Content(id=top + 20, topic='Volcanoes', title='Volcanoes'))
+            db.session.commit()
+            assert get_topic_index().max_id == top + 20
+            
+            # Another writer's transaction commits a lower id afterwards
+            db.session.add(Content(id=top + 10, topic='Glacier Formation', title='Glaciers'))
+            db.session.commit()
+            match = get_topic_index().match('glacier formation')
+            
+            assert match['id'] == top + 10
+            assert get_topic_index().match('Volcanoes')['id'] == top + 20
     
     def test_generate_content_missing_topic(self, client):
         """Test content generation without topic"""
@@ -35,7 +118,7 @@ class TestContentGeneration:
         data = json.loads(response.data)
         assert 'error' in data
     
-    def test_generate_content_invalid_language(self, client):
+    def test_generate_content_invalid_language(self, client, fake_llm):
         """Test content generation with invalid language"""
         response = client.post(
             '/api/generate-content',
@@ -47,22 +130,249 @@ class TestContentGeneration:
         assert response.status_code in [400, 201]  # Depends on implementation
 
 
+class TestContentRetrieval:
+    """Test suite for reading stored content"""
+    
+    def test_etag_revalidation(self, client, content_id):
+        """Test a matching If-None-Match gets a 304 with no body"""
+        response = client.get(f'/api/content/{content_id}')
+        assert response.status_code == 200
+        etag = response.headers['ETag']
+        
+        response = client.get(f'/api/content/{content_id}', headers={'If-None-Match': etag})
+        assert response.status_code == 304
+        assert response.data == b''
+        
+        response = client.get(f'/api/content/{content_id}', headers={'If-None-Match': '"stale"'})
+        assert response.status_code == 200
+    
+    def test_content_not_found(self, client):
+        """Test unknown content IDs return 404"""
+        response = client.get('/api/content/999999')
+        assert response.status_code == 404
+
+
+class TestContentLibrary:
+    """Test suite for listing and searching stored content"""
+    
+    def _create(self, topics):
+        from app import save_content
+        return [save_content({
+            'topic': topic,
+            'title': f'All about {topic}',
+            'description': f'An introduction to {topic}.',
+            'sections': [{'title': 'Basics', 'content': f'{topic} explained with examples.', 'key_points': []}],
+            'key_points': []
+        })['id'] for topic in topics]
+    
+    def test_cursor_pagination_walks_every_row_once(self, app, client):
+        """Test following next_cursor visits all content newest first without repeats"""
+        with app.app_context():
+            created = self._create([f'Paging topic {i}' for i in range(5)])
+        
+        seen = []
+        url = '/api/content?limit=2'
+        while url:
+            data = json.loads(client.get(url).data)
+            seen.extend(item['id'] for item in data['items'])
+            url = f"/api/content?limit=2&cursor={data['next_cursor']}" if data['next_cursor'] else None
+        
+        assert len(seen) == len(set(seen))
+        assert [content_id for content_id in seen if content_id in created] == sorted(created, reverse=True)
+    
+    def test_invalid_cursor(self, client):
+        """Test a malformed cursor is rejected"""
+        response = client.get('/api/content?cursor=not-a-cursor')
+        assert response.status_code == 400
+    
+    def test_full_text_search(self, app, client):
+        """Test search matches section text and ranks title matches"""
+        with app.app_context():
+            volcano, glacier = self._create(['Volcanoes', 'Glaciers'])
+        
+        data = json.loads(client.get('/api/content/search?q=volcanoes').data)
+        assert [item['id'] for item in data['items']][:1] == [volcano]
+        
+        data = json.loads(client.get('/api/content/search?q=glaciers examples').data)
+        assert glacier in [item['id'] for item in data['items']]
+        assert volcano not in [item['id'] for item in data['items']]
+    
+    def test_search_requires_query(self, client):
+        """Test search without q"""
+        response = client.get('/api/content/search')
+        assert response.status_code == 400
+
+
+class TestContentStreaming:
+    """Test suite for the streaming content generation API"""
+    
+    def test_stream_emits_sections_then_done(self, client, monkeypatch):
+        """Test the SSE stream delivers fields, sections and the final lesson"""
+        import app as app_module
+        import openai
+        from src import ContentCache, ContentGenerator
+        
+        lesson = json.dumps({
+            'title': 'Streams',
+            'description': 'About streams.',
+            'sections': [{'title': 'One', 'content': 'First', 'key_points': []}],
+            'key_points': ['k']
+        })
+        
+        def fake_create(**kwargs):
+            assert kwargs['stream'] is True
+            for i in range(0, len(lesson), 7):
+                yield {'choices': [{'delta': {'content': lesson[i:i + 7]}}]}
+        
+        monkeypatch.setattr(openai.ChatCompletion, 'create', fake_create)
+        monkeypatch.setattr(app_module, '_content_generator',
+                            ContentGenerator(api_key='test', cache=ContentCache(db_path='')))
+        
+        response = client.post(
+            '/api/generate-content/stream',
+            data=json.dumps({'topic': 'Streams'}),
+            content_type='application/json'
+        )
+        
+        assert response.status_code == 200
+        assert response.mimetype == 'text/event-stream'
+        events = [block.split('\n') for block in response.get_data(as_text=True).strip().split('\n\n')]
+        names = [lines[0][len('event: '):] for lines in events]
+        assert names == ['field', 'field', 'section', 'done']
+        done = json.loads(events[-1][1][len('data: '):])
+        assert done['title'] == 'Streams'
+        assert done['tokens_used'] > 0
+    
+    def test_stream_missing_topic(self, client):
+        """Test streaming without topic"""
+        response = client.post(
+            '/api/generate-content/stream',
+            data=json.dumps({}),
+            content_type='application/json'
+        )
+        
+        assert response.status_code == 400
+    
+    def test_non_string_topic(self, client):
+        """Test a topic that is not a string is rejected rather than failing the request"""
+        for url in ('/api/generate-content', '/api/generate-content/stream'):
+            response = client.post(url, data=json.dumps({'topic': 5}), content_type='application/json')
+            
+            assert response.status_code == 400
+            assert json.loads(response.data)['error'] == 'Topic must be a string'
+
+
+class TestBatchGeneration:
+    """Test suite for the batch content generation API"""
+    
+    def test_batch_returns_partial_results(self, client, monkeypatch):
+        """Test a batch reports per-item errors, cache reuse and token totals"""
+        import app as app_module
+        import openai
+        from src import ContentCache, ContentGenerator
+        
+        def fake_create(**kwargs):
+            lesson = {'title': 'T', 'description': 'D', 'sections': [], 'key_points': []}
+            return {
+                'choices': [{'message': {'content': json.dumps(lesson)}}],
+                'usage': {'total_tokens': 100}
+            }
+        
+        monkeypatch.setattr(openai.ChatCompletion, 'create', fake_create)
+        generator = ContentGenerator(api_key='test', cache=ContentCache(db_path=''))
+        generator.generate('Biology')
+        monkeypatch.setattr(app_module, '_content_generator', generator)
+        
+        response = client.post(
+            '/api/generate-content/batch',
+            data=json.dumps({'items': ['Chemistry', {'topic': 'biology'}, {'depth': 'basic'}]}),
+            content_type='application/json'
+        )
+        
+        assert response.status_code == 200
+        data = json.loads(response.data)
+        assert [r['status'] for r in data['results']] == ['completed', 'completed', 'failed']
+        assert data['results'][1]['content']['cached'] is True
+        assert data['summary']['succeeded'] == 2
+        assert data['summary']['cached'] == 1
+        assert data['summary']['tokens_used'] == 100
+    
+    def test_batch_reuses_stored_lessons(self, client, fake_llm):
+        """Test batch items matching a stored lesson are not generated again"""
+        client.post(
+            '/api/generate-content',
+            data=json.dumps({'topic': 'Organic Chemistry'}),
+            content_type='application/json'
+        )
+        
+        response = client.post(
+            '/api/generate-content/batch',
+            data=json.dumps({'items': ['Ocean Currents', 'organic chemistry basics']}),
+            content_type='application/json'
+        )
+        
+        data = json.loads(response.data)
+        assert [r['index'] for r in data['results']] == [0, 1]
+        assert data['results'][0]['content'].get('reused') is None
+        assert data['results'][1]['content']['reused'] is True
+        assert data['summary']['reused'] == 1
+        assert data['summary']['succeeded'] == 2
+        assert data['summary']['tokens_used'] == 50
+    
+    def test_batch_isolates_invalid_items(self, client, fake_llm):
+        """Test invalid batch items fail on their own while the valid ones complete"""
+        response = client.post(
+            '/api/generate-content/batch',
+            data=json.dumps({'items': ['Ocean Currents', {'topic': 5}, 7, {'topic': 'Tides'}]}),
+            content_type='application/json'
+        )
+        
+        assert response.status_code == 200
+        data = json.loads(response.data)
+        assert [r['status'] for r in data['results']] == ['completed', 'failed', 'failed', 'completed']
+        assert data['results'][1]['error'] == 'Topic must be a string'
+        assert data['results'][2]['error'] == 'Topic is required'
+        assert data['summary']['succeeded'] == 2
+        assert data['summary']['failed'] == 2
+    
+    def test_batch_requires_items(self, client):
+        """Test batch generation without items"""
+        response = client.post(
+            '/api/generate-content/batch',
+            data=json.dumps({'items': []}),
+            content_type='application/json'
+        )
+        
+        assert response.status_code == 400
+
+
 class TestVideoGeneration:
     """Test suite for video generation API"""
     
-    def test_generate_video_success(self, client):
-        """Test successful video generation"""
+    def test_generate_video_success(self, client, content_id):
+        """Test video generation is queued as a background job"""
         response = client.post(
             '/api/generate-video',
-            data=json.dumps({'content_id': 1, 'style': 'experimental'}),
+            data=json.dumps({'content_id': content_id, 'style': 'experimental'}),
             content_type='application/json'
         )
         
-        assert response.status_code == 201
+        assert response.status_code == 202
         data = json.loads(response.data)
         assert 'video_id' in data
-        assert 'video_url' in data
-        assert data['status'] == 'completed'
+        assert 'job_id' in data
+        assert data['status_url'] == f"/api/jobs/{data['job_id']}"
+        assert data['status'] == 'queued'
+    
+    def test_generate_video_unknown_content(self, client):
+        """Test video generation for content that does not exist"""
+        response = client.post(
+            '/api/generate-video',
+            data=json.dumps({'content_id': 999999, 'style': 'experimental'}),
+            content_type='application/json'
+        )
+        
+        assert response.status_code == 404
     
     def test_generate_video_missing_content_id(self, client):
         """Test video generation without content ID"""
@@ -76,16 +386,188 @@ class TestVideoGeneration:
         data = json.loads(response.data)
         assert 'error' in data
     
-    def test_generate_video_invalid_style(self, client):
+    def test_generate_video_invalid_style(self, client, content_id):
         """Test video generation with invalid style"""
         response = client.post(
             '/api/generate-video',
-            data=json.dumps({'content_id': 1, 'style': 'invalid_style'}),
+            data=json.dumps({'content_id': content_id, 'style': 'invalid_style'}),
             content_type='application/json'
         )
         
         # Should either handle gracefully or validate
-        assert response.status_code in [400, 201]
+        assert response.status_code in [400, 202]
+
+
+class TestJobs:
+    """Test suite for background job status API"""
+    
+    def test_job_completes(self, client, content_id, monkeypatch):
+        """Test a rendered job reports completion and its video URL"""
+        import src
+        
+        class FakeVideoGenerator:
+            def __init__(self, output_dir):
+                pass
+            
+            def create_video(self, content, style='experimental'):
+                return {
+                    'video_path': '/tmp/fake.mp4',
+                    'video_url': '/outputs/videos/fake.mp4',
+                    'hls_url': '/outputs/videos/fake/master.m3u8',
+                    'duration': 12,
+                    'file_size': '1.00 MB'
+                }
+        
+        monkeypatch.setattr(src, 'VideoGenerator', FakeVideoGenerator)
+        response = client.post(
+            '/api/generate-video',
+            data=json.dumps({'content_id': content_id}),
+            content_type='application/json'
+        )
+        job_id = json.loads(response.data)['job_id']
+        
+        response = client.get(f'/api/jobs/{job_id}')
+        assert response.status_code == 200
+        data = json.loads(response.data)
+        assert data['status'] == 'completed'
+        assert data['video_url'] == '/outputs/videos/fake.mp4'
+        assert data['hls_url'] == '/outputs/videos/fake/master.m3u8'
+    
+    def test_job_failure_is_recorded(self, client, content_id, monkeypatch):
+        """Test a crashing render marks the job failed"""
+        import src
+        
+        class BrokenVideoGenerator:
+            def __init__(self, output_dir):
+                raise RuntimeError('no TTS engine')
+        
+        monkeypatch.setattr(src, 'VideoGenerator', BrokenVideoGenerator)
+        response = client.post(
+            '/api/generate-video',
+            data=json.dumps({'content_id': content_id}),
+            content_type='application/json'
+        )
+        job_id = json.loads(response.data)['job_id']
+        
+        data = json.loads(client.get(f'/api/jobs/{job_id}').data)
+        assert data['status'] == 'failed'
+        assert 'no TTS engine' in data['error']
+    
+    def test_job_not_found(self, client):
+        """Test unknown job IDs return 404"""
+        response = client.get('/api/jobs/999999')
+        assert response.status_code == 404
+    
+    def test_priority_is_validated_and_passed_on(self, client, content_id, monkeypatch):
+        """Test bulk renders are queued at bulk priority and unknown priorities are rejected"""
+        import app as app_module
+        from src.jobs import PRIORITY_BULK
+        queued = []
+        monkeypatch.setattr(app_module.job_queue, 'enqueue',
+                            lambda func, *args, priority: queued.append((func.__name__, args, priority)))
+        
+        response = client.post(
+            '/api/generate-video',
+            data=json.dumps({'content_id': content_id, 'priority': 'urgent'}),
+            content_type='application/json'
+        )
+        assert response.status_code == 400
+        
+        response = client.post(
+            '/api/generate-video',
+            data=json.dumps({'content_id': content_id, 'priority': 'bulk'}),
+            content_type='application/json'
+        )
+        assert response.status_code == 202
+        assert queued == [('process_video_job', (json.loads(response.data)['job_id'],), PRIORITY_BULK)]
+    
+    def test_killed_job_is_marked_failed(self, client, content_id, monkeypatch):
+        """Test a job the scheduler kills is recorded as failed with the reason"""
+        import app as app_module
+        monkeypatch.setattr(app_module.job_queue, 'enqueue', lambda func, *args, priority: None)
+        response = client.post(
+            '/api/generate-video',
+            data=json.dumps({'content_id': content_id}),
+            content_type='application/json'
+        )
+        job_id = json.loads(response.data)['job_id']
+        
+        app_module._on_job_failure(app_module.process_video_job, (job_id,), 'Render timed out after 5s')
+        
+        data = json.loads(client.get(f'/api/jobs/{job_id}').data)
+        assert data['status'] == 'failed'
+        assert data['error'] == 'Render timed out after 5s'
+    
+    def test_jobs_are_recovered_after_a_restart(self, app, client, content_id, monkeypatch):
+        """Test a new worker re-enqueues jobs left queued and fails renders orphaned mid-way"""
+        import app as app_module
+        from app import db, Video
+        
+        with app.app_context():
+            old = datetime.utcnow() - timedelta(seconds=app.config['RENDER_TIMEOUT_SECONDS'] + 120)
+            queued = Video(content_id=content_id, video_path='', status='queued')
+            orphaned = Video(content_id=content_id, video_path='', status='processing', updated_at=old)
+            running = Video(content_id=content_id, video_path='', status='processing')
+            db.session.add_all([queued, orphaned, running])
+            db.session.commit()
+            ids = (queued.id, orphaned.id, running.id)
+        
+        # The worker that held these jobs is gone; a fresh one starts with an empty queue
+        enqueued = []
+        monkeypatch.setattr(app_module.job_queue, 'enqueue', lambda func, *args, **kwargs: enqueued.append(args))
+        result = app_module.recover_jobs()
+        
+        assert (ids[0],) in enqueued
+        assert result['failed'] == 1
+        statuses = [json.loads(client.get(f'/api/jobs/{job_id}').data)['status'] for job_id in ids]
+        assert statuses == ['queued', 'failed', 'processing']
+        
+        # A job also still queued in a live worker is rendered only once
+        app_module.process_video_job(ids[2])
+        assert json.loads(client.get(f'/api/jobs/{ids[2]}').data)['status'] == 'processing'
+    
+    def test_preview_render(self, client, content_id, monkeypatch):
+        """Test preview options are validated and handed to the renderer"""
+        import src
+        calls = []
+        
+        class PreviewVideoGenerator:
+            def __init__(self, output_dir):
+                pass
+            
+            def create_video(self, content, style='experimental', **options):
+                calls.append(options)
+                return {'video_path': '/tmp/fake_preview.mp4', 'video_url': '/outputs/videos/fake_preview.mp4',
+                        'duration': 3, 'file_size': '0.10 MB'}
+        
+        monkeypatch.setattr(src, 'VideoGenerator', PreviewVideoGenerator)
+        for invalid in (0, 'two', True):
+            response = client.post(
+                '/api/generate-video',
+                data=json.dumps({'content_id': content_id, 'preview': True, 'preview_sections': invalid}),
+                content_type='application/json'
+            )
+            assert response.status_code == 400
+        
+        response = client.post(
+            '/api/generate-video',
+            data=json.dumps({'content_id': content_id, 'preview': True, 'preview_sections': 2}),
+            content_type='application/json'
+        )
+        assert response.status_code == 202
+        assert json.loads(response.data)['preview'] is True
+        assert calls == [{'preview': True, 'preview_sections': 2}]
+        
+        data = json.loads(client.get(f"/api/jobs/{json.loads(response.data)['job_id']}").data)
+        assert data['status'] == 'completed'
+        assert data['preview'] is True
+    
+    def test_job_stats(self, client):
+        """Test queue statistics are reported for the configured backend"""
+        response = client.get('/api/jobs/stats')
+        
+        assert response.status_code == 200
+        assert json.loads(response.data)['backend'] == 'inline'
 
 
 class TestHealthCheck:
@@ -116,6 +598,139 @@ class TestHealthCheck:
         assert is_valid_timestamp
 
 
+class TestVideoDelivery:
+    """Test suite for serving rendered videos"""
+    
+    @pytest.fixture
+    def video(self, app, tmp_path, monkeypatch):
+        """Write a fake rendered video and return its URL and bytes"""
+        monkeypatch.setitem(app.config, 'VIDEO_OUTPUT_DIR', str(tmp_path))
+        data = bytes(range(256)) * 40
+        (tmp_path / 'lesson.mp4').write_bytes(data)
+        return '/outputs/videos/lesson.mp4', data
+    
+    def test_full_response(self, client, video):
+        """Test a plain GET returns the whole file with validators and range support advertised"""
+        url, data = video
+        response = client.get(url)
+        
+        assert response.status_code == 200
+        assert response.data == data
+        assert response.mimetype == 'video/mp4'
+        assert response.headers['Accept-Ranges'] == 'bytes'
+        assert response.headers['ETag']
+        assert 'immutable' in response.headers['Cache-Control']
+    
+    def test_hls_files(self, client, app, tmp_path, monkeypatch):
+        """Test playlists and segments are served from a video's HLS directory"""
+        monkeypatch.setitem(app.config, 'VIDEO_OUTPUT_DIR', str(tmp_path))
+        (tmp_path / 'lesson.mp4').write_bytes(b'\x00' * 64)
+        (tmp_path / 'lesson' / '360p').mkdir(parents=True)
+        (tmp_path / 'lesson' / 'master.m3u8').write_text('#EXTM3U\n360p/index.m3u8\n')
+        (tmp_path / 'lesson' / '360p' / 'segment_000.m4s').write_bytes(b'\x00' * 64)
+        
+        response = client.get('/outputs/videos/lesson/master.m3u8')
+        assert response.status_code == 200
+        assert response.mimetype == 'application/vnd.apple.mpegurl'
+        
+        response = client.get('/outputs/videos/lesson/360p/segment_000.m4s')
+        assert response.status_code == 200
+        assert response.mimetype == 'video/iso.segment'
+        assert len(response.data) == 64
+    
+    def test_byte_ranges(self, client, video):
+        """Test seeking requests get 206 Partial Content with the requested bytes"""
+        url, data = video
+        response = client.get(url, headers={'Range': 'bytes=100-199'})
+        assert response.status_code == 206
+        assert response.data == data[100:200]
+        assert response.headers['Content-Range'] == f'bytes 100-199/{len(data)}'
+        assert response.headers['Content-Length'] == '100'
+        
+        response = client.get(url, headers={'Range': 'bytes=-10'})
+        assert response.status_code == 206
+        assert response.data == data[-10:]
+        
+        response = client.get(url, headers={'Range': f'bytes={len(data)}-'})
+        assert response.status_code == 416
+    
+    def test_conditional_requests(self, client, video):
+        """Test validators produce 304s and a stale If-Range falls back to the full file"""
+        url, data = video
+        etag = client.get(url).headers['ETag']
+        
+        response = client.get(url, headers={'If-None-Match': etag})
+        assert response.status_code == 304
+        assert response.data == b''
+        
+        response = client.get(url, headers={'Range': 'bytes=0-9', 'If-Range': '"stale"'})
+        assert response.status_code == 200
+        assert response.data == data
+    
+    def test_path_traversal_rejected(self, client, video):
+        """Test paths outside the video directory are not served"""
+        response = client.get('/outputs/videos/../app.py')
+        assert response.status_code == 404
+        response = client.get('/outputs/videos/missing.mp4')
+        assert response.status_code == 404
+    
+    def test_work_files_not_served(self, client, video, tmp_path):
+        """Test only finished videos are served, not a render's temporary files"""
+        (tmp_path / 'audio_1.wav').write_bytes(b'\x00' * 64)
+        (tmp_path / '.tmp_1.mp4').write_bytes(b'\x00' * 64)
+        (tmp_path / 'tmpabc').mkdir()
+        (tmp_path / 'tmpabc' / 'segment_0000.mp4').write_bytes(b'\x00' * 64)
+        (tmp_path / 'rendering' / '360p').mkdir(parents=True)
+        (tmp_path / 'rendering' / '360p' / 'index.m3u8').write_text('#EXTM3U\n')
+        
+        for name in ('audio_1.wav', '.tmp_1.mp4', 'tmpabc/segment_0000.mp4', 'rendering/360p/index.m3u8'):
+            assert client.get(f'/outputs/videos/{name}').status_code == 404
+        assert client.get(video[0]).status_code == 200
+    
+    def test_x_accel_redirect(self, app, client, video, monkeypatch):
+        """Test nginx offload hands the internal location to the proxy without a body"""
+        monkeypatch.setitem(app.config, 'VIDEO_DELIVERY', 'x-accel')
+        response = client.get(video[0])
+        
+        assert response.status_code == 200
+        assert response.headers['X-Accel-Redirect'] == '/protected/videos/lesson.mp4'
+        assert response.mimetype == 'video/mp4'
+        assert response.data == b''
+    
+    def test_x_sendfile(self, app, client, video, monkeypatch):
+        """Test X-Sendfile mode names the file for the web server to send"""
+        monkeypatch.setitem(app.config, 'USE_X_SENDFILE', True)
+        response = client.get(video[0])
+        
+        assert response.headers['X-Sendfile'].endswith('lesson.mp4')
+        assert response.data == b''
+
+
+class TestMetrics:
+    """Test suite for the Prometheus metrics endpoint"""
+    
+    def test_metrics_exposes_route_latency_and_stages(self, client, fake_llm):
+        """Test request latency is labelled by route template and generation stages are timed"""
+        client.get('/api/health')
+        client.post(
+            '/api/generate-content',
+            data=json.dumps({'topic': 'Metrics and Observability'}),
+            content_type='application/json'
+        )
+        
+        response = client.get('/metrics')
+        
+        assert response.status_code == 200
+        assert response.content_type.startswith('text/plain; version=0.0.4')
+        body = response.get_data(as_text=True)
+        assert 'http_request_duration_seconds_count{method="GET",route="/api/health",status="200"}' in body
+        assert 'http_request_duration_seconds_bucket{method="POST",route="/api/generate-content",status="201",le="+Inf"}' in body
+        for stage in ('prompt', 'llm', 'parse'):
+            assert f'content_generation_stage_seconds_count{{stage="{stage}"}}' in body
+        assert 'llm_tokens_total{model="gpt-3.5-turbo",mode="complete"}' in body
+        assert 'cache_hit_ratio{cache="content"}' in body
+
+
 class TestDatabaseOperations:
     """Test suite for database operations"""
     
@@ -186,17 +801,59 @@ class TestErrorHandling:
 @pytest.fixture
 def app():
     """Create and configure a Flask application for testing"""
+    os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
+    os.environ['JOB_BACKEND'] = 'inline'
+    os.environ.setdefault('METRICS_DB', '')
+    
     from app import app as flask_app
     flask_app.config['TESTING'] = True
     flask_app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
     
-    with flask_app.app_context():
-        from app import db
-        db.create_all()
+    from app import init_database
+    init_database()
     
     yield flask_app
 
 
+@pytest.fixture
+def fake_llm(monkeypatch):
+    """Serve lessons from a stubbed OpenAI API through a fresh ContentGenerator"""
+    import app as app_module
+    import openai
+    from src import ContentCache, ContentGenerator
+    
+    def fake_create(**kwargs):
+        lesson = {
+            'title': 'Introduction',
+            'description': 'A short lesson.',
+            'sections': [{'title': 'Overview', 'content': 'Overview text', 'key_points': ['a']}],
+            'key_points': ['a'],
+            'learning_objectives': ['learn'],
+            'fun_facts': ['fun']
+        }
+        return {
+            'choices': [{'message': {'content': json.dumps(lesson)}}],
+            'usage': {'total_tokens': 50}
+        }
+    
+    monkeypatch.setattr(openai.ChatCompletion, 'create', fake_create)
+    generator = ContentGenerator(api_key='test', cache=ContentCache(db_path=''))
+    monkeypatch.setattr(app_module, '_content_generator', generator)
+    return generator
+
+
+@pytest.fixture
+def content_id(app):
+    """Create a stored Content row and return its ID"""
+    from app import db, Content
+    
+    with app.app_context():
+        content = Content(topic='Test Topic', title='Test Title', description='Test Description')
+        db.session.add(content)
+        db.session.commit()
+        return content.id
+
+
 @pytest.fixture
 def client(app):
     """Create a test client"""
@@ -0,0 +1,58 @@
+"""Smoke tests for the benchmark harness"""
+
+import json
+import os
+
+from benchmarks import run as bench
+
+
+class TestBenchmarkHarness:
+    """Test suite for benchmarks/run.py"""
+    
+    def test_run_reports_latency_and_memory(self):
+        """Test each benchmark reports throughput, percentiles and peak RSS"""
+        document = bench.run_benchmarks(['parse_content', 'text_frame', 'api_generate_content'], iterations=3)
+        
+        assert set(document['results']) == {'parse_content', 'text_frame', 'api_generate_content'}
+        for result in document['results'].values():
+            assert result['iterations'] == 3
+            assert result['ops_per_second'] > 0
+            assert 0 < result['p50_ms'] <= result['p99_ms']
+            assert result['peak_rss_mb']['self'] > 0
+        assert document['revision']
+    
+    def test_workspace_isolates_settings(self, monkeypatch):
+        """Test a run uses its own cache and database, restoring exported settings afterwards"""
+        monkeypatch.setenv('CACHE_DIR', '/srv/real/cache')
+        monkeypatch.delenv('SEGMENT_CACHE_DIR', raising=False)
+        ws = bench.Workspace()
+        
+        assert os.environ['CACHE_DIR'].startswith(ws.path)
+        assert os.environ['DATABASE_URL'] == 'sqlite:///:memory:'
+        ws.cleanup()
+        assert os.environ['CACHE_DIR'] == '/srv/real/cache'
+        assert 'SEGMENT_CACHE_DIR' not in os.environ
+    
+    def test_percentile_nearest_rank(self):
+        """Test percentiles pick an observed sample"""
+        samples = [float(i) for i in range(1, 101)]
+        
+        assert bench.percentile(samples, 50) == 50.0
+        assert bench.percentile(samples, 99) == 99.0
+        assert bench.percentile([3.0], 99) == 3.0
+    
+    def test_compare_flags_regressions(self, tmp_path, capsys):
+        """Test --compare fails only when a p50 regresses past the threshold"""
+        baseline = {'revision': 'base', 'results': {
+            'parse_content': {'p50_ms': 1e-6},
+            'text_frame': {'p50_ms': 1e6}
+        }}
+        path = tmp_path / 'base.json'
+        path.write_text(json.dumps(baseline))
+        
+        status = bench.main(['parse_content', 'text_frame', '-n', '2', '--no-save', '--compare', str(path)])
+        
+        output = capsys.readouterr().out
+        assert status == 1
+        assert 'parse_content' in output and 'REGRESSION' in output
+        assert output.count('REGRESSION') == 1
@@ -0,0 +1,124 @@
+"""Test cases for the generated content cache"""
+
+import os
+import time
+
+from src.cache import AudioCache, ContentCache, SegmentCache
+
+
+class TestContentCache:
+    """Test suite for ContentCache"""
+    
+    def test_key_normalizes_topic(self):
+        """Test keys ignore case and whitespace differences in the topic"""
+        a = ContentCache.make_key('Machine  Learning', 'en', 'basic', 'gpt-3.5-turbo', '1')
+        b = ContentCache.make_key(' machine learning ', 'EN', 'basic', 'gpt-3.5-turbo', '1')
+        c = ContentCache.make_key('machine learning', 'en', 'basic', 'gpt-4', '1')
+        
+        assert a == b
+        assert a != c
+    
+    def test_lru_eviction(self):
+        """Test the memory tier evicts the least recently used entry"""
+        cache = ContentCache(max_entries=2, ttl=60, db_path='')
+        cache.set('a', {'v': 1})
+        cache.set('b', {'v': 2})
+        cache.get('a')
+        cache.set('c', {'v': 3})
+        
+        assert cache.get('b') is None
+        assert cache.get('a') == {'v': 1}
+        assert cache.stats()['evictions'] == 1
+    
+    def test_ttl_expiry(self):
+        """Test expired entries are treated as misses"""
+        cache = ContentCache(ttl=60, db_path='')
+        cache.set('a', {'v': 1}, ttl=-1)
+        
+        assert cache.get('a') is None
+        assert cache.stats()['misses'] == 1
+    
+    def test_disk_tier_shared_between_instances(self, tmp_path):
+        """Test a second cache (another worker) reads entries from the shared file"""
+        path = str(tmp_path / 'cache.db')
+        ContentCache(ttl=60, db_path=path).set('a', {'v': 1})
+        
+        other = ContentCache(ttl=60, db_path=path)
+        assert other.get('a') == {'v': 1}
+        assert other.stats()['disk_hits'] == 1
+    
+    def test_disk_tier_is_bounded(self, tmp_path):
+        """Test the disk tier keeps only the most recently used entries"""
+        cache = ContentCache(max_entries=1, ttl=60, db_path=str(tmp_path / 'cache.db'),
+                             max_disk_entries=2)
+        for key in ('a', 'b', 'c'):
+            cache.set(key, {'key': key})
+            time.sleep(0.01)
+        
+        assert cache.get('a') is None
+        assert cache.get('c') == {'key': 'c'}
+
+
+class TestAudioCache:
+    """Test suite for AudioCache"""
+    
+    def test_key_covers_voice_settings(self):
+        """Test any voice setting change produces a different key"""
+        base = AudioCache.make_key('Hello', 'default', 150, 0.9, 'pyttsx3')
+        
+        assert base == AudioCache.make_key('Hello', 'default', 150, 0.9, 'pyttsx3')
+        assert base != AudioCache.make_key('Hello', 'default', 175, 0.9, 'pyttsx3')
+        assert base != AudioCache.make_key('Hello', 'english', 150, 0.9, 'pyttsx3')
+    
+    def test_put_and_get(self, tmp_path):
+        """Test a stored segment is found again by key"""
+        cache = AudioCache(str(tmp_path / 'audio'))
+        source = tmp_path / 'segment.wav'
+        source.write_bytes(b'x' * 10)
+        
+        path = cache.put('ab' * 32, str(source))
+        
+        assert cache.get('ab' * 32) == path
+        assert cache.get('cd' * 32) is None
+        assert not source.exists()
+    
+    def test_eviction_removes_least_recently_used(self, tmp_path):
+        """Test the directory is trimmed oldest-first to its byte limit"""
+        cache = AudioCache(str(tmp_path / 'audio'), max_bytes=25)
+        for index, key in enumerate(('aa', 'bb', 'cc')):
+            source = tmp_path / f'{key}.wav'
+            source.write_bytes(b'x' * 10)
+            path = cache.put(key * 32, str(source))
+            os.utime(path, (1000 + index, 1000 + index))
+        
+        cache.evict(min_age=0)
+        
+        assert cache.get('aa' * 32) is None
+        assert cache.get('bb' * 32) is not None
+        assert cache.stats()['bytes'] == 20
+
+
+class TestSegmentCache:
+    """Test suite for SegmentCache"""
+    
+    def test_key_covers_slide_narration_and_encoder(self):
+        """Test changing the slide, its narration or the encoder produces a different key"""
+        frame = {'text': 'Optics', 'width': 640, 'height': 360}
+        encoder = {'rendition': '360p', 'fps': 1}
+        base = SegmentCache.make_key(frame, 'audio-key', encoder)
+        
+        assert base == SegmentCache.make_key(dict(frame), 'audio-key', dict(encoder))
+        assert base != SegmentCache.make_key(dict(frame, text='Lenses'), 'audio-key', encoder)
+        assert base != SegmentCache.make_key(frame, 'other-audio', encoder)
+        assert base != SegmentCache.make_key(frame, 'audio-key', dict(encoder, fps=2))
+    
+    def test_uses_its_own_directory_and_metric(self, tmp_path, monkeypatch):
+        """Test segments are kept apart from narration and counted under their own label"""
+        from src.metrics import registry
+        monkeypatch.setenv('OUTPUT_DIR', str(tmp_path))
+        cache = SegmentCache()
+        before = registry.value('cache_lookups_total', cache='segment', result='miss') or 0
+        
+        assert cache.cache_dir == os.path.join(str(tmp_path), 'segment_cache')
+        assert cache.get('ab' * 32, 'mp4') is None
+        assert registry.value('cache_lookups_total', cache='segment', result='miss') == before + 1
@@ -0,0 +1,289 @@
+"""Test cases for lesson generation and token budgeting"""
+
+import json
+import threading
+
+import openai
+import pytest
+
+from src import content_generator
+from src.cache import ContentCache
+from src.content_generator import ContentGenerator, context_window, count_tokens, estimate_tokens
+
+OUTLINE = {
+    'title': 'Thermodynamics',
+    'description': 'Heat, work and energy.',
+    'sections': [
+        {'title': 'Energy', 'summary': 'What energy is'},
+        {'title': 'Entropy', 'summary': 'Why disorder grows'},
+        {'title': 'Key Takeaways', 'summary': 'The laws in brief'}
+    ],
+    'key_points': ['Energy is conserved'],
+    'learning_objectives': ['State the first law'],
+    'fun_facts': ['Heat death is a long way off']
+}
+LESSON = dict(OUTLINE, sections=[
+    {'title': section['title'], 'content': f"All about {section['title']}", 'key_points': []}
+    for section in OUTLINE['sections']
+])
+
+
+class FakeChatAPI:
+    """Answer outline, section and whole-lesson prompts like the chat API, recording each call"""
+    
+    def __init__(self, parallel=1):
+        self.calls = []
+        self.lock = threading.Lock()
+        # Section calls wait for each other, so they only finish if sent concurrently
+        self.barrier = threading.Barrier(parallel, timeout=5) if parallel > 1 else None
+    
+    def __call__(self, **kwargs):
+        prompt = kwargs['messages'][-1]['content']
+        with self.lock:
+            self.calls.append({'prompt': prompt, 'max_tokens': kwargs['max_tokens']})
+        if 'Plan educational content' in prompt:
+            body = OUTLINE
+        elif 'Write one section' not in prompt:
+            body = LESSON
+        else:
+            if self.barrier is not None:
+                self.barrier.wait()
+            title = next(s['title'] for s in OUTLINE['sections'] if f'"{s["title"]}":' in prompt)
+            body = {'title': title, 'content': f'All about {title}', 'key_points': [title.lower()]}
+        return {'choices': [{'message': {'content': json.dumps(body)}}], 'usage': {'total_tokens': 10}}
+
+
+@pytest.fixture
+def generator(monkeypatch):
+    """Create a ContentGenerator generating section by section against a fake chat API"""
+    monkeypatch.setenv('CONTENT_GENERATION_MODE', 'sections')
+    return ContentGenerator(api_key='test', cache=ContentCache(db_path=''))
+
+
+class TestTokenCounting:
+    """Test suite for local token counting"""
+    
+    def test_falls_back_to_estimate_without_tiktoken(self, monkeypatch):
+        """Test token counts are estimated when tiktoken is not installed"""
+        monkeypatch.setattr(content_generator, 'tiktoken', None)
+        
+        assert count_tokens('a' * 40, 'gpt-4') == estimate_tokens('a' * 40) == 10
+        assert count_tokens('', 'gpt-4') == 0
+    
+    def test_falls_back_to_estimate_when_encoding_cannot_load(self, monkeypatch):
+        """Test an encoding that fails to download is estimated, and not retried on every call"""
+        lookups = []
+        
+        def offline(name):
+            lookups.append(name)
+            raise OSError('Could not download the BPE file')
+        
+        fake = type('FakeTiktoken', (), {'encoding_for_model': staticmethod(offline),
+                                         'get_encoding': staticmethod(offline)})
+        monkeypatch.setattr(content_generator, 'tiktoken', fake)
+        monkeypatch.setattr(content_generator, '_encodings', {})
+        
+        assert count_tokens('a' * 40, 'gpt-4') == 10
+        assert count_tokens('a' * 80, 'gpt-4') == 20
+        assert lookups == ['gpt-4']
+    
+    def test_context_window_matches_versioned_models(self):
+        """Test dated model names resolve to their family's context window"""
+        assert context_window('gpt-3.5-turbo-0613') == 4096
+        assert context_window('gpt-3.5-turbo-16k-0613') == 16385
+        assert context_window('gpt-4o-mini-2024-07-18') == 128000
+        assert context_window('unknown-model') == 4096
+
+
+class TestSectionGeneration:
+    """Test suite for outline-then-sections generation"""
+    
+    def test_sections_are_generated_in_parallel(self, generator, monkeypatch):
+        """Test sections are written concurrently and assembled into the usual lesson shape"""
+        api = FakeChatAPI(parallel=len(OUTLINE['sections']))
+        monkeypatch.setattr(openai.ChatCompletion, 'create', api)
+        
+        lesson = generator.generate('Thermodynamics', depth='basic')
+        
+        assert lesson['title'] == 'Thermodynamics'
+        assert lesson['key_points'] == ['Energy is conserved']
+        assert lesson['learning_objectives'] == ['State the first law']
+        assert lesson['fun_facts'] == ['Heat death is a long way off']
+        assert [s['title'] for s in lesson['sections']] == ['Energy', 'Entropy', 'Key Takeaways']
+        assert lesson['sections'][1] == {'title': 'Entropy', 'content': 'All about Entropy',
+                                         'key_points': ['entropy']}
+        assert lesson['tokens_used'] == 40
+        assert lesson['status'] == 'completed'
+        # One outline call, then one call per section, each with its own budget
+        assert [call['max_tokens'] for call in api.calls] == [generator.outline_max_tokens] + \
+            [generator.section_max_tokens] * 3
+    
+    def test_unparsable_section_keeps_outline_summary(self, generator, monkeypatch):
+        """Test a section whose answers are never JSON falls back to its outline summary"""
+        api = FakeChatAPI()
+        
+        def garbled(**kwargs):
+            response = api(**kwargs)
+            if '"Entropy":' in kwargs['messages'][-1]['content']:
+                response['choices'][0]['message']['content'] = 'Sorry, I cannot'
+            return response
+        
+        monkeypatch.setattr(openai.ChatCompletion, 'create', garbled)
+        lesson = generator.generate('Thermodynamics')
+        
+        assert lesson['sections'][1] == {'title': 'Entropy', 'content': 'Why disorder grows', 'key_points': []}
+    
+    def test_stream_emits_sections_in_order(self, generator, monkeypatch):
+        """Test streaming in sections mode emits the outline fields, each section and the lesson"""
+        monkeypatch.setattr(openai.ChatCompletion, 'create', FakeChatAPI(parallel=3))
+        
+        events = list(generator.generate_stream('Thermodynamics'))
+        
+        assert [event for event, _ in events] == ['field', 'field', 'section', 'section', 'section', 'done']
+        assert [data['index'] for event, data in events if event == 'section'] == [0, 1, 2]
+        assert events[-1][1]['sections'][2]['title'] == 'Key Takeaways'
+    
+    def test_auto_mode_splits_advanced_lessons(self, monkeypatch):
+        """Test auto mode writes advanced lessons section by section and others in one call"""
+        api = FakeChatAPI()
+        monkeypatch.setattr(openai.ChatCompletion, 'create', api)
+        generator = ContentGenerator(api_key='test', cache=ContentCache(db_path=''))
+        
+        generator.generate('Thermodynamics', depth='advanced')
+        assert len(api.calls) == 4
+        
+        api.calls.clear()
+        generator.generate('Thermodynamics', depth='basic')
+        assert len(api.calls) == 1
+        assert api.calls[0]['max_tokens'] == generator.max_tokens
+        assert generator.estimate_request_tokens('Thermodynamics', depth='advanced') > \
+            generator.estimate_request_tokens('Thermodynamics', depth='basic')
+    
+    def test_unparsable_section_is_requested_again(self, generator, monkeypatch):
+        """Test only the section with an unusable answer is requested a second time"""
+        api = FakeChatAPI()
+        garbled = []
+        
+        def once(**kwargs):
+            response = api(**kwargs)
+            if '"Entropy":' in kwargs['messages'][-1]['content'] and not garbled:
+                garbled.append(True)
+                response['choices'][0]['message']['content'] = '{"title": "Entropy", "content": "Why dis'
+            return response
+        
+        monkeypatch.setattr(openai.ChatCompletion, 'create', once)
+        lesson = generator.generate('Thermodynamics')
+        
+        assert lesson['sections'][1]['content'] == 'All about Entropy'
+        assert len(api.calls) == 5
+        assert lesson['tokens_used'] == 50
+
+
+class TestPartialResults:
+    """Test suite for salvaging truncated lessons"""
+    
+    @pytest.fixture
+    def truncated_api(self, monkeypatch):
+        """Cut the first lesson off inside its second section and answer the follow-up with the rest"""
+        calls = []
+        
+        def fake_create(**kwargs):
+            prompt = kwargs['messages'][-1]['content']
+            calls.append(prompt)
+            if len(calls) == 1:
+                text = '```json\n' + json.dumps(LESSON, indent=2)
+                content = text[:text.index('All about Entropy') + 5]
+            else:
+                content = json.dumps({'sections': LESSON['sections'][1:], 'key_points': LESSON['key_points']})
+            return {'choices': [{'message': {'content': content}}], 'usage': {'total_tokens': 100 * len(calls)}}
+        
+        monkeypatch.setattr(openai.ChatCompletion, 'create', fake_create)
+        return calls
+    
+    def test_only_missing_parts_are_requested(self, truncated_api, monkeypatch):
+        """Test a truncated lesson keeps its complete sections and asks only for the rest"""
+        monkeypatch.setenv('CONTENT_GENERATION_MODE', 'single')
+        generator = ContentGenerator(api_key='test', cache=ContentCache(db_path=''))
+        
+        lesson = generator.generate('Thermodynamics')
+        
+        assert len(truncated_api) == 2
+        assert 'only the missing parts: key_points, sections' in truncated_api[1]
+        assert '1. Energy' in truncated_api[1]
+        assert [s['title'] for s in lesson['sections']] == ['Energy', 'Entropy', 'Key Takeaways']
+        assert lesson['key_points'] == LESSON['key_points']
+        assert lesson['tokens_used'] == 300
+    
+    def test_repairs_can_be_disabled(self, truncated_api, monkeypatch):
+        """Test with no repair attempts the salvaged part of the lesson is returned as is"""
+        monkeypatch.setenv('CONTENT_GENERATION_MODE', 'single')
+        monkeypatch.setenv('CONTENT_REPAIR_ATTEMPTS', '0')
+        generator = ContentGenerator(api_key='test', cache=ContentCache(db_path=''))
+        
+        lesson = generator.generate('Thermodynamics')
+        
+        assert len(truncated_api) == 1
+        assert [s['title'] for s in lesson['sections']] == ['Energy']
+        assert lesson['key_points'] == []
+    
+    def test_stream_emits_recovered_sections(self, monkeypatch):
+        """Test sections recovered after a truncated stream are streamed before the lesson"""
+        monkeypatch.setenv('CONTENT_GENERATION_MODE', 'single')
+        text = json.dumps(LESSON)
+        truncated = text[:text.index('All about Entropy') + 5]
+        
+        def fake_create(**kwargs):
+            if kwargs.get('stream'):
+                return iter([{'choices': [{'delta': {'content': truncated[i:i + 9]}}]}
+                             for i in range(0, len(truncated), 9)])
+            content = json.dumps({'sections': LESSON['sections'][1:], 'key_points': ['k']})
+            return {'choices': [{'message': {'content': content}}], 'usage': {'total_tokens': 10}}
+        
+        monkeypatch.setattr(openai.ChatCompletion, 'create', fake_create)
+        generator = ContentGenerator(api_key='test', cache=ContentCache(db_path=''))
+        
+        events = list(generator.generate_stream('Thermodynamics'))
+        
+        sections = [data for event, data in events if event == 'section']
+        assert [data['index'] for data in sections] == [0, 1, 2]
+        assert [data['section']['title'] for data in sections] == ['Energy', 'Entropy', 'Key Takeaways']
+        assert events[-1][0] == 'done'
+        assert events[-1][1]['key_points'] == ['k']
+
+
+class TestTokenBudget:
+    """Test suite for per-call completion budgets"""
+    
+    def test_completion_is_capped_to_the_context(self, generator, monkeypatch):
+        """Test max_tokens shrinks so prompt and completion fit the context window"""
+        api = FakeChatAPI()
+        monkeypatch.setattr(openai.ChatCompletion, 'create', api)
+        generator.context_tokens = 800
+        
+        generator.generate('Thermodynamics')
+        
+        for call in api.calls:
+            messages = generator._create_messages(call['prompt'])
+            assert generator._prompt_tokens(messages) + call['max_tokens'] <= 800
+        assert api.calls[1]['max_tokens'] < generator.section_max_tokens
+    
+    def test_oversized_prompt_is_not_sent(self, generator, monkeypatch):
+        """Test a prompt that leaves no room for an answer fails before calling the API"""
+        api = FakeChatAPI()
+        monkeypatch.setattr(openai.ChatCompletion, 'create', api)
+        generator.context_tokens = 200
+        
+        with pytest.raises(ValueError, match='does not fit'):
+            generator.generate('Thermodynamics')
+        assert api.calls == []
+    
+    def test_batches_share_the_token_budget(self, generator, monkeypatch):
+        """Test successive batches draw on one tokens-per-minute budget instead of a fresh one each"""
+        monkeypatch.setattr(openai.ChatCompletion, 'create', FakeChatAPI())
+        
+        first = generator.generate_many([{'topic': 'Thermodynamics'}])
+        second = generator.generate_many([{'topic': 'Optics'}])
+        
+        spent = first['summary']['tokens_used'] + second['summary']['tokens_used']
+        assert spent > 0
+        assert generator.batch_budget.used() == spent
@@ -0,0 +1,103 @@
+"""Tests for database engine pooling and the full-text search index"""
+
+import threading
+import time
+
+from sqlalchemy import create_engine, event, text
+
+from src.database import build_engine_options
+from src.search import ContentSearchIndex
+
+
+class TestEnginePooling:
+    """Test suite for engine options under concurrency"""
+    
+    def test_memory_sqlite_keeps_default_pool(self):
+        """Test in-memory SQLite is left to Flask-SQLAlchemy's static pool"""
+        assert build_engine_options('sqlite:///:memory:', {}) == {}
+    
+    def test_server_database_gets_bounded_pool(self):
+        """Test server databases get sized, recycled, pre-pinged pools"""
+        options = build_engine_options('postgresql://user@db/ai_learning',
+                                       {'DB_POOL_SIZE': 8, 'DB_MAX_OVERFLOW': 2})
+        
+        assert options['pool_size'] == 8
+        assert options['max_overflow'] == 2
+        assert options['pool_pre_ping'] is True
+        assert options['pool_recycle'] > 0
+    
+    def test_connections_stay_bounded_under_load(self, tmp_path):
+        """Test 40 concurrent readers and writers never exceed pool_size + max_overflow"""
+        uri = f"sqlite:///{tmp_path / 'load.db'}"
+        engine = create_engine(uri, **build_engine_options(uri, {'DB_POOL_SIZE': 3, 'DB_MAX_OVERFLOW': 2}))
+        state = {'open': 0, 'peak': 0, 'errors': []}
+        lock = threading.Lock()
+        
+        @event.listens_for(engine, 'checkout')
+        def checkout(*args):
+            with lock:
+                state['open'] += 1
+                state['peak'] = max(state['peak'], state['open'])
+        
+        @event.listens_for(engine, 'checkin')
+        def checkin(*args):
+            with lock:
+                state['open'] -= 1
+        
+        with engine.begin() as conn:
+            conn.execute(text("CREATE TABLE hits (id INTEGER PRIMARY KEY, worker INTEGER)"))
+        
+        def worker(number):
+            try:
+                for _ in range(10):
+                    with engine.begin() as conn:
+                        conn.execute(text("INSERT INTO hits (worker) VALUES (:w)"), {'w': number})
+                        time.sleep(0.001)
+                    with engine.connect() as conn:
+                        conn.execute(text("SELECT COUNT(*) FROM hits")).scalar()
+            except Exception as e:
+                state['errors'].append(e)
+        
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(40)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        with engine.connect() as conn:
+            assert conn.execute(text("SELECT COUNT(*) FROM hits")).scalar() == 400
+            assert conn.execute(text("PRAGMA journal_mode")).scalar() == 'wal'
+        assert state['errors'] == []
+        assert state['peak'] <= 5
+        assert engine.pool.checkedout() == 0
+        engine.dispose()
+
+
+class TestContentSearchIndex:
+    """Test suite for creating the full-text index"""
+    
+    def test_backfill_is_committed(self, tmp_path):
+        """Test lessons stored before the index existed stay searchable from every connection and worker"""
+        url = f"sqlite:///{tmp_path / 'search.db'}"
+        engine = create_engine(url)
+        with engine.begin() as conn:
+            conn.execute(text("CREATE TABLE content (id INTEGER PRIMARY KEY, title TEXT, description TEXT, "
+                              "content TEXT, created_at TEXT)"))
+            conn.execute(text("INSERT INTO content (id, title, description, content) "
+                              "VALUES (1, 'Volcanoes', 'Magma and lava.', NULL)"))
+        
+        index = ContentSearchIndex()
+        index.ensure(engine)
+        assert index.is_ready(engine)
+        
+        for _ in range(2):
+            with engine.connect() as conn:
+                assert index.search(conn, 'lava') == [1]
+        
+        # Another worker process finds the committed index and indexes nothing twice
+        other = ContentSearchIndex()
+        other_engine = create_engine(url)
+        other.ensure(other_engine)
+        with other_engine.connect() as conn:
+            assert other.search(conn, 'volcanoes') == [1]
+            assert conn.execute(text("SELECT count(*) FROM content_fts")).scalar() == 1
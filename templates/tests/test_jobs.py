@@ -0,0 +1,170 @@
+"""Test cases for the background job backends and render scheduler"""
+
+import multiprocessing
+import os
+import subprocess
+import time
+
+import pytest
+
+from src.jobs import (PRIORITY_BULK, PRIORITY_INTERACTIVE, InlineJobBackend, JobQueue,
+                      RenderScheduler, RenderSlots, available_cpus)
+
+
+def record(path, name, seconds=0.0):
+    """Job appending its name to a file, optionally after sleeping"""
+    time.sleep(seconds)
+    with open(path, 'a') as f:
+        f.write(f"{name} {os.environ.get('RENDER_THREADS')}\n")
+
+
+def spawn_and_hang(pid_path):
+    """Job starting a child process (like ffmpeg) and never finishing"""
+    child = subprocess.Popen(['sleep', '60'])
+    with open(pid_path, 'w') as f:
+        f.write(str(child.pid))
+    time.sleep(60)
+
+
+def allocate(megabytes):
+    """Job allocating a large buffer"""
+    buffer = bytearray(megabytes * 1024 * 1024)
+    return len(buffer)
+
+
+def fail():
+    """Job raising an unhandled error"""
+    raise RuntimeError('boom')
+
+
+def wait_for(predicate, timeout=10.0):
+    """Poll until predicate() is true"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def pid_alive(pid):
+    """Return whether a (non-zombie) process exists"""
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            return f.read().split(')')[-1].split()[0] != 'Z'
+    except FileNotFoundError:
+        return False
+
+
+def hold_slot(slots_dir, ready_path, seconds):
+    """Take the only render slot from another process, as a second server worker would"""
+    slots = RenderSlots(slots_dir, 1)
+    assert slots.acquire() == 0
+    open(ready_path, 'w').close()
+    time.sleep(seconds)
+
+
+@pytest.fixture
+def scheduler(tmp_path):
+    """Create a single-slot scheduler and stop it afterwards"""
+    backend = RenderScheduler(max_workers=1, threads_per_job=1, timeout=10, memory_limit_mb=0,
+                              slots_dir=str(tmp_path / 'slots'))
+    failures = []
+    backend.on_failure = lambda func, args, reason: failures.append((func.__name__, args, reason))
+    backend.failures = failures
+    yield backend
+    backend.shutdown(wait=False)
+
+
+class TestRenderScheduler:
+    """Test suite for RenderScheduler"""
+    
+    def test_slots_follow_available_cpus(self):
+        """Test concurrency defaults to the CPUs divided by the threads each job gets"""
+        cpus = available_cpus()
+        backend = RenderScheduler(threads_per_job=1)
+        
+        assert backend.max_workers == cpus
+        assert RenderScheduler(threads_per_job=cpus).max_workers == 1
+        assert RenderScheduler(threads_per_job=cpus * 4).threads_per_job == cpus
+    
+    def test_interactive_jobs_jump_the_queue(self, scheduler, tmp_path):
+        """Test queued jobs start by priority, then in submission order"""
+        path = str(tmp_path / 'order.txt')
+        scheduler.submit(record, path, 'running', 0.5)
+        assert wait_for(lambda: scheduler.stats()['running'] == 1)
+        
+        scheduler.submit(record, path, 'bulk-1', priority=PRIORITY_BULK)
+        scheduler.submit(record, path, 'bulk-2', priority=PRIORITY_BULK)
+        scheduler.submit(record, path, 'preview', priority=PRIORITY_INTERACTIVE)
+        stats = scheduler.stats()
+        assert stats['queue_depth'] == 3
+        assert stats['queued'] == {'bulk': 2, 'interactive': 1}
+        assert stats['oldest_queued_seconds'] >= 0
+        
+        assert wait_for(lambda: scheduler.stats()['completed'] == 4)
+        with open(path) as f:
+            lines = f.read().splitlines()
+        assert [line.split()[0] for line in lines] == ['running', 'preview', 'bulk-1', 'bulk-2']
+        # Every job is told how many cores it may use
+        assert {line.split()[1] for line in lines} == {'1'}
+        assert scheduler.stats()['max_wait_seconds'] > 0.2
+    
+    def test_timeout_kills_job_and_its_children(self, scheduler, tmp_path):
+        """Test a job past its timeout is killed with the processes it started and reported failed"""
+        scheduler.timeout = 0.5
+        pid_path = tmp_path / 'child.pid'
+        scheduler.submit(spawn_and_hang, str(pid_path), priority=PRIORITY_BULK)
+        
+        assert wait_for(lambda: scheduler.stats()['timed_out'] == 1)
+        assert not pid_alive(int(pid_path.read_text()))
+        assert scheduler.failures == [('spawn_and_hang', (str(pid_path),), 'Render timed out after 0.5s')]
+    
+    def test_memory_limit(self, scheduler):
+        """Test a job allocating past its memory limit fails instead of starving the box"""
+        scheduler.memory_limit_mb = 512
+        scheduler.submit(allocate, 1024)
+        
+        assert wait_for(lambda: scheduler.stats()['out_of_memory'] == 1)
+        assert 'memory limit' in scheduler.failures[0][2]
+    
+    def test_crash_is_reported(self, scheduler):
+        """Test an unhandled error in a job reaches the failure hook"""
+        scheduler.submit(fail)
+        
+        assert wait_for(lambda: scheduler.stats()['failed'] == 1)
+        assert scheduler.failures[0][0] == 'fail'
+    
+    def test_slots_are_shared_between_processes(self, scheduler, tmp_path):
+        """Test a job waits while another server process holds every render slot"""
+        ready = tmp_path / 'ready'
+        holder = multiprocessing.Process(target=hold_slot, args=(scheduler.slots_dir, str(ready), 1.0))
+        holder.start()
+        assert wait_for(ready.exists)
+        
+        path = str(tmp_path / 'order.txt')
+        scheduler.submit(record, path, 'waited')
+        time.sleep(0.5)
+        assert scheduler.stats()['running'] == 0
+        assert scheduler.stats()['queue_depth'] == 1
+        
+        holder.join()
+        assert holder.exitcode == 0
+        assert wait_for(lambda: scheduler.stats()['completed'] == 1)
+        assert scheduler.stats()['shared_slots'] is True
+
+
+class TestJobQueue:
+    """Test suite for JobQueue"""
+    
+    def test_failure_hook_follows_backend(self):
+        """Test the failure hook is kept when the backend is swapped"""
+        failures = []
+        queue = JobQueue(InlineJobBackend(), on_failure=lambda func, args, reason: failures.append(reason))
+        queue.set_backend(InlineJobBackend())
+        queue.task(fail)
+        
+        queue.enqueue(fail, priority=PRIORITY_BULK)
+        
+        assert failures == ['boom']
+        assert queue.stats() == {'backend': 'inline'}
@@ -0,0 +1,166 @@
+"""Test cases for the resilient OpenAI client, run against a local fake API server"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import openai
+import pytest
+
+from src.llm_client import CircuitBreaker, CircuitOpenError, LLMClient
+
+COMPLETION = {
+    'id': 'chatcmpl-test',
+    'object': 'chat.completion',
+    'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': 'hello'}, 'finish_reason': 'stop'}],
+    'usage': {'prompt_tokens': 3, 'completion_tokens': 2, 'total_tokens': 5}
+}
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    """Serve queued (status, headers, body) responses for chat completions"""
+    
+    responses = []
+    requests = 0
+    
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        FakeOpenAIHandler.requests += 1
+        status, headers, body = (FakeOpenAIHandler.responses.pop(0)
+                                 if FakeOpenAIHandler.responses else (200, {}, COMPLETION))
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+    
+    def log_message(self, *args):
+        pass
+
+
+def _error(message):
+    return {'error': {'message': message, 'type': 'server_error', 'param': None, 'code': None}}
+
+
+@pytest.fixture
+def fake_openai(monkeypatch):
+    """Point the openai library at a local fake server"""
+    server = HTTPServer(('127.0.0.1', 0), FakeOpenAIHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    FakeOpenAIHandler.responses = []
+    FakeOpenAIHandler.requests = 0
+    monkeypatch.setattr(openai, 'api_base', f'http://127.0.0.1:{server.server_port}/v1')
+    monkeypatch.setattr(openai, 'api_key', 'test')
+    yield FakeOpenAIHandler
+    server.shutdown()
+    server.server_close()
+
+
+def _client(sleeps, **kwargs):
+    return LLMClient(rate_limiter=None, sleep=sleeps.append, **kwargs)
+
+
+class TestLLMClient:
+    """Test suite for LLMClient"""
+    
+    def test_retry_after_is_honored(self, fake_openai):
+        """Test a 429 is retried after the server's Retry-After delay"""
+        fake_openai.responses = [(429, {'Retry-After': '2'}, _error('slow down'))]
+        sleeps = []
+        client = _client(sleeps)
+        
+        response = client.chat_completion(model='gpt-3.5-turbo', messages=[])
+        
+        assert response['usage']['total_tokens'] == 5
+        assert sleeps == [2.0]
+        assert client.metrics()['retries'] == 1
+        assert client.metrics()['rate_limited'] == 1
+    
+    def test_exponential_backoff_on_server_errors(self, fake_openai):
+        """Test 5xx responses are retried with capped, jittered backoff"""
+        fake_openai.responses = [(500, {}, _error('boom')), (503, {}, _error('busy'))]
+        sleeps = []
+        client = _client(sleeps, base_delay=1.0)
+        
+        client.chat_completion(model='gpt-3.5-turbo', messages=[])
+        
+        assert fake_openai.requests == 3
+        assert 0 <= sleeps[0] <= 1.0 and 0 <= sleeps[1] <= 2.0
+    
+    def test_client_errors_are_not_retried(self, fake_openai):
+        """Test a 400 fails immediately"""
+        fake_openai.responses = [(400, {}, _error('bad request'))]
+        client = _client([])
+        
+        with pytest.raises(openai.error.InvalidRequestError):
+            client.chat_completion(model='gpt-3.5-turbo', messages=[])
+        assert fake_openai.requests == 1
+    
+    def test_circuit_breaker_fails_fast(self, fake_openai):
+        """Test the breaker opens after repeated failures and stops calling upstream"""
+        fake_openai.responses = [(500, {}, _error('down'))] * 3
+        now = [0.0]
+        breaker = CircuitBreaker(failure_threshold=3, reset_timeout=10, clock=lambda: now[0])
+        client = _client([], max_retries=2, breaker=breaker)
+        
+        with pytest.raises(openai.error.APIError):
+            client.chat_completion(model='gpt-3.5-turbo', messages=[])
+        with pytest.raises(CircuitOpenError):
+            client.chat_completion(model='gpt-3.5-turbo', messages=[])
+        assert fake_openai.requests == 3
+        assert client.metrics()['circuit_state'] == 'open'
+        
+        now[0] = 11
+        client.chat_completion(model='gpt-3.5-turbo', messages=[])
+        assert client.metrics()['circuit_state'] == 'closed'
+    
+    def test_rate_limited_probe_closes_breaker(self, fake_openai):
+        """Test a half-open probe answered with a 429 closes the breaker instead of wedging it"""
+        now = [0.0]
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=lambda: now[0])
+        client = _client([], max_retries=0, breaker=breaker)
+        breaker.record_failure()
+        
+        now[0] = 11
+        fake_openai.responses = [(429, {}, _error('slow down'))]
+        with pytest.raises(openai.error.RateLimitError):
+            client.chat_completion(model='gpt-3.5-turbo', messages=[])
+        assert client.metrics()['circuit_state'] == 'closed'
+        client.chat_completion(model='gpt-3.5-turbo', messages=[])
+    
+    def test_rejected_probe_does_not_reopen_breaker(self, fake_openai):
+        """Test a half-open probe failing with a client error leaves other callers unblocked"""
+        now = [0.0]
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=lambda: now[0])
+        client = _client([], breaker=breaker)
+        breaker.record_failure()
+        
+        now[0] = 11
+        fake_openai.responses = [(400, {}, _error('bad request'))]
+        with pytest.raises(openai.error.InvalidRequestError):
+            client.chat_completion(model='gpt-3.5-turbo', messages=[])
+        assert client.metrics()['circuit_state'] == 'closed'
+        client.chat_completion(model='gpt-3.5-turbo', messages=[])
+    
+    def test_failed_probe_reopens_breaker(self, fake_openai):
+        """Test a half-open probe failing upstream opens the breaker for another cool-down"""
+        now = [0.0]
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=lambda: now[0])
+        client = _client([], max_retries=0, breaker=breaker)
+        breaker.record_failure()
+        
+        now[0] = 11
+        fake_openai.responses = [(500, {}, _error('down'))]
+        with pytest.raises(openai.error.APIError):
+            client.chat_completion(model='gpt-3.5-turbo', messages=[])
+        assert client.metrics()['circuit_state'] == 'open'
+        with pytest.raises(CircuitOpenError):
+            client.chat_completion(model='gpt-3.5-turbo', messages=[])
+        
+        now[0] = 22
+        client.chat_completion(model='gpt-3.5-turbo', messages=[])
+        assert client.metrics()['circuit_state'] == 'closed'
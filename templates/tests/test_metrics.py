@@ -0,0 +1,108 @@
+"""Test cases for cross-process metrics"""
+
+import multiprocessing
+
+import pytest
+
+from src.metrics import MetricsRegistry
+
+
+def make_registry(db_path=''):
+    """Create a registry with one counter and one histogram"""
+    registry = MetricsRegistry(db_path=db_path, flush_interval=60)
+    registry.counter('jobs_total', 'Jobs run', ('kind',))
+    registry.histogram('job_seconds', 'Job time', buckets=(0.1, 1.0))
+    return registry
+
+
+def work_in_child(registry, count):
+    """Increment a counter in a forked child and publish it"""
+    for _ in range(count):
+        registry._metrics['jobs_total'].inc(kind='render')
+    registry.flush()
+
+
+class TestExposition:
+    """Test suite for the text format"""
+    
+    def test_counter_and_histogram_format(self):
+        """Test samples are rendered with labels and cumulative buckets"""
+        registry = make_registry()
+        registry._metrics['jobs_total'].inc(2, kind='render')
+        histogram = registry._metrics['job_seconds']
+        for value in (0.05, 0.5, 5.0):
+            histogram.observe(value)
+        
+        lines = registry.render().splitlines()
+        
+        assert '# TYPE jobs_total counter' in lines
+        assert 'jobs_total{kind="render"} 2' in lines
+        assert 'job_seconds_bucket{le="0.1"} 1' in lines
+        assert 'job_seconds_bucket{le="1"} 2' in lines
+        assert 'job_seconds_bucket{le="+Inf"} 3' in lines
+        assert 'job_seconds_sum 5.55' in lines
+        assert 'job_seconds_count 3' in lines
+    
+    def test_label_values_are_escaped(self):
+        """Test quotes in label values cannot break the format"""
+        registry = make_registry()
+        registry._metrics['jobs_total'].inc(kind='say "hi"')
+        
+        assert 'jobs_total{kind="say \\"hi\\""} 1' in registry.render()
+    
+    def test_unknown_label_rejected(self):
+        """Test undeclared labels raise"""
+        registry = make_registry()
+        
+        with pytest.raises(ValueError):
+            registry._metrics['jobs_total'].inc(colour='red')
+    
+    def test_cache_hit_ratio_is_derived(self):
+        """Test the hit ratio gauge is computed from lookup counters"""
+        registry = make_registry()
+        lookups = registry.counter('cache_lookups_total', 'Lookups', ('cache', 'result'))
+        lookups.inc(3, cache='content', result='hit')
+        lookups.inc(1, cache='content', result='miss')
+        
+        assert 'cache_hit_ratio{cache="content"} 0.75' in registry.render()
+
+
+class TestAggregation:
+    """Test suite for aggregation across worker processes"""
+    
+    def test_forked_workers_are_summed(self, tmp_path):
+        """Test every process's series is summed, counting pre-fork values once"""
+        registry = make_registry(str(tmp_path / 'metrics.db'))
+        counter = registry._metrics['jobs_total']
+        counter.inc(5, kind='render')
+        
+        context = multiprocessing.get_context('fork')
+        children = [context.Process(target=work_in_child, args=(registry, 3)) for _ in range(2)]
+        for child in children:
+            child.start()
+        for child in children:
+            child.join()
+            assert child.exitcode == 0
+        
+        assert registry.value('jobs_total', kind='render') == 11
+        
+        # Exited workers are folded together without losing their counts
+        counter.inc(kind='render')
+        assert registry.value('jobs_total', kind='render') == 12
+        db = registry._db()
+        processes = {row[0] for row in db.execute("SELECT process FROM metric_snapshot")}
+        assert 'exited' in processes and len(processes) == 2
+    
+    def test_registries_share_one_file(self, tmp_path):
+        """Test a scrape in one worker sees another worker's published histogram"""
+        path = str(tmp_path / 'metrics.db')
+        first, second = make_registry(path), make_registry(path)
+        first._metrics['job_seconds'].observe(0.5)
+        second._metrics['job_seconds'].observe(2.0)
+        first.flush()
+        
+        total = second.value('job_seconds')
+        
+        assert total['count'] == 2
+        assert total['buckets'] == [0, 1]
+        assert total['sum'] == pytest.approx(2.5)
@@ -0,0 +1,138 @@
+"""Test cases for lesson JSON parsing"""
+
+import json
+
+from src.parsing import SectionStreamParser, parse_json_lenient, parse_lesson, repair_json
+
+LESSON = {
+    'title': 'Photosynthesis',
+    'description': 'How plants turn light into "food".',
+    'sections': [
+        {'title': 'Light {reactions}', 'content': 'Chlorophyll absorbs light.', 'key_points': ['a', 'b']},
+        {'title': 'Calvin cycle', 'content': 'Carbon is fixed.', 'key_points': []}
+    ],
+    'key_points': ['x']
+}
+
+
+class TestSectionStreamParser:
+    """Test suite for SectionStreamParser"""
+    
+    def test_sections_emitted_as_they_close(self):
+        """Test each section is emitted on the chunk containing its closing brace"""
+        text = 'Here is your lesson:\n' + json.dumps(LESSON, indent=2)
+        first_close = text.index('}', text.index('Light {reactions}') + len('Light {reactions}'))
+        parser = SectionStreamParser()
+        
+        events = parser.feed(text[:first_close])
+        assert [event for event, _ in events] == ['field', 'field']
+        assert events[1][1] == {'name': 'description', 'value': LESSON['description']}
+        
+        events = parser.feed(text[first_close])
+        assert events == [('section', {'index': 0, 'section': LESSON['sections'][0]})]
+        
+        events = parser.feed(text[first_close + 1:])
+        assert events == [('section', {'index': 1, 'section': LESSON['sections'][1]})]
+        assert parser.buffer == text
+    
+    def test_char_by_char_feed(self):
+        """Test parsing is independent of chunk boundaries"""
+        parser = SectionStreamParser()
+        events = []
+        for ch in json.dumps(LESSON):
+            events.extend(parser.feed(ch))
+        
+        assert parser.fields == {'title': LESSON['title'], 'description': LESSON['description']}
+        assert parser.sections == LESSON['sections']
+        assert len(events) == 4
+    
+    def test_invalid_sections_are_skipped(self):
+        """Test streamed sections are validated like the final lesson's, so their indexes agree"""
+        lesson = dict(LESSON, sections=[{'title': 'No content'}] + LESSON['sections'])
+        parser = SectionStreamParser()
+        
+        events = parser.feed(json.dumps(lesson))
+        
+        sections = [data for event, data in events if event == 'section']
+        assert [data['index'] for data in sections] == [0, 1]
+        assert [data['section'] for data in sections] == parse_lesson(json.dumps(lesson))['lesson']['sections']
+
+
+class TestRepairJson:
+    """Test suite for lenient JSON decoding"""
+    
+    def test_common_faults_are_repaired(self):
+        """Test code fences, trailing commas, raw newlines and trailing prose are tolerated"""
+        text = ('Sure! Here it is:\n```json\n{"title": "Light",\n "sections": [{"title": "Rays", '
+                '"content": "Straight\nlines", "key_points": ["a",],},],}\n```\nEnjoy!')
+        
+        value, truncated = parse_json_lenient(text)
+        
+        assert truncated is False
+        assert value == {'title': 'Light', 'sections': [
+            {'title': 'Rays', 'content': 'Straight\nlines', 'key_points': ['a']}
+        ]}
+    
+    def test_every_truncation_point_decodes(self):
+        """Test a response cut at any character repairs to valid JSON holding only complete values"""
+        text = json.dumps(LESSON, indent=2)
+        for end in range(text.index('{') + 1, len(text)):
+            repaired, truncated = repair_json(text[:end])
+            assert truncated is True
+            value = json.loads(repaired)
+            assert set(value) <= set(LESSON)
+            for key, item in value.items():
+                if isinstance(item, str):
+                    assert item == LESSON[key]
+    
+    def test_no_object(self):
+        """Test text without any JSON object decodes to nothing"""
+        assert parse_json_lenient('I cannot help with that.') == (None, False)
+
+
+class TestParseLesson:
+    """Test suite for schema-checked lesson parsing"""
+    
+    def test_truncated_lesson_keeps_complete_sections(self):
+        """Test sections that closed before the cut survive and the rest is reported missing"""
+        text = json.dumps(LESSON)
+        cut = text.index('Carbon is fixed') + 5
+        
+        parsed = parse_lesson(text[:cut])
+        
+        assert parsed['truncated'] is True
+        assert parsed['lesson']['title'] == LESSON['title']
+        assert parsed['lesson']['sections'] == LESSON['sections'][:1]
+        assert parsed['missing'] == ['key_points', 'sections']
+    
+    def test_truncated_extras_are_not_requested(self):
+        """Test a lesson cut off inside its optional lists keeps them and requests nothing"""
+        text = json.dumps(dict(LESSON, fun_facts=['Leaves are green', 'Plants breathe out oxygen']))
+        cut = text.index('Plants breathe') + 6
+        
+        parsed = parse_lesson(text[:cut])
+        
+        assert parsed['truncated'] is True
+        assert parsed['lesson']['key_points'] == LESSON['key_points']
+        assert parsed['lesson']['fun_facts'] == ['Leaves are green']
+        assert parsed['missing'] == []
+    
+    def test_complete_lesson_has_nothing_missing(self):
+        """Test a well-formed lesson parses on the fast path with nothing to request"""
+        parsed = parse_lesson('Here you go: ' + json.dumps(LESSON) + ' Hope it helps!')
+        
+        assert parsed == {'lesson': LESSON, 'missing': [], 'truncated': False}
+    
+    def test_invalid_sections_are_dropped(self):
+        """Test sections without content are dropped and a lesson left without any must request them"""
+        lesson = dict(LESSON, sections=[{'title': 'Empty'}, LESSON['sections'][1], 'oops'])
+        parsed = parse_lesson(json.dumps(lesson))
+        assert parsed['lesson']['sections'] == [LESSON['sections'][1]]
+        assert parsed['missing'] == []
+        
+        parsed = parse_lesson(json.dumps(dict(LESSON, sections=[{'title': 'Empty'}])))
+        assert 'sections' not in parsed['lesson']
+        assert parsed['missing'] == ['sections']
+        
+        # A lesson that legitimately has no sections is kept as is
+        assert parse_lesson(json.dumps(dict(LESSON, sections=[])))['missing'] == []
@@ -0,0 +1,57 @@
+"""Test cases for LLM rate limiting helpers"""
+
+import time
+
+import pytest
+
+from src.ratelimit import SharedTokenBucket, TokenBudget
+
+
+class TestTokenBudget:
+    """Test suite for TokenBudget"""
+    
+    def test_reservations_are_settled_to_actual_usage(self):
+        """Test settling frees the unused part of an estimate"""
+        budget = TokenBudget(tokens_per_minute=1000)
+        reservation = budget.acquire(900)
+        budget.settle(reservation, 200)
+        
+        budget.acquire(700)
+        assert budget.used() == 900
+    
+    def test_exhausted_budget_blocks(self):
+        """Test a reservation that does not fit waits for the window"""
+        budget = TokenBudget(tokens_per_minute=1000, window=60)
+        budget.acquire(800)
+        
+        with pytest.raises(TimeoutError):
+            budget.acquire(300, timeout=0.05)
+
+
+class TestSharedTokenBucket:
+    """Test suite for SharedTokenBucket"""
+    
+    def test_bucket_is_shared_between_instances(self, tmp_path):
+        """Test two workers draw from the same bucket"""
+        path = str(tmp_path / 'ratelimit.db')
+        first = SharedTokenBucket(60, capacity=2, db_path=path)
+        second = SharedTokenBucket(60, capacity=2, db_path=path)
+        
+        assert first.try_acquire() == 0
+        assert second.try_acquire() == 0
+        assert second.try_acquire() == pytest.approx(1.0, abs=0.05)
+    
+    def test_acquire_sleeps_until_refill(self, tmp_path):
+        """Test acquire waits for the refill when the bucket is empty"""
+        sleeps = []
+        
+        def sleep(seconds):
+            sleeps.append(seconds)
+            time.sleep(seconds)
+        
+        bucket = SharedTokenBucket(600, capacity=1, db_path=str(tmp_path / 'ratelimit.db'), sleep=sleep)
+        bucket.acquire()
+        bucket.acquire()
+        
+        assert len(sleeps) >= 1
+        assert sleeps[0] == pytest.approx(0.1, abs=0.02)
@@ -0,0 +1,81 @@
+"""Test cases for single-flight request coalescing"""
+
+import threading
+import time
+
+from src.singleflight import SingleFlight
+
+
+class TestSingleFlight:
+    """Test suite for SingleFlight"""
+    
+    def test_concurrent_threads_share_one_call(self, tmp_path):
+        """Test identical concurrent calls in one process run once"""
+        flight = SingleFlight(lock_dir=str(tmp_path))
+        calls = []
+        results = []
+        
+        def work():
+            calls.append(1)
+            time.sleep(0.2)
+            return {'value': 42}
+        
+        threads = [
+            threading.Thread(target=lambda: results.append(flight.do('topic', work)))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert len(calls) == 1
+        assert [result for result, _ in results] == [{'value': 42}] * 5
+        assert sorted(shared for _, shared in results) == [False] + [True] * 4
+    
+    def test_followers_see_leader_error(self, tmp_path):
+        """Test errors from the leader propagate to waiting followers"""
+        flight = SingleFlight(lock_dir=str(tmp_path))
+        errors = []
+        
+        def work():
+            time.sleep(0.1)
+            raise RuntimeError('upstream down')
+        
+        def call():
+            try:
+                flight.do('topic', work)
+            except RuntimeError as e:
+                errors.append(str(e))
+        
+        threads = [threading.Thread(target=call) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert errors == ['upstream down'] * 3
+    
+    def test_other_process_reads_leader_result(self, tmp_path):
+        """Test a second worker waits on the file lock and reuses the stored result"""
+        # Two instances model two worker processes sharing a lock dir and cache
+        leader, follower = SingleFlight(lock_dir=str(tmp_path)), SingleFlight(lock_dir=str(tmp_path))
+        store = {}
+        calls = []
+        
+        def work():
+            calls.append(1)
+            time.sleep(0.2)
+            store['topic'] = {'value': 42}
+            return store['topic']
+        
+        thread = threading.Thread(target=lambda: leader.do('topic', work))
+        thread.start()
+        time.sleep(0.05)
+        result, shared = follower.do('topic', work, lookup=lambda: store.get('topic'))
+        thread.join()
+        
+        assert result == {'value': 42}
+        assert shared is True
+        assert len(calls) == 1
+        assert follower.stats['remote_waits'] == 1
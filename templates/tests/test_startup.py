@@ -0,0 +1,74 @@
+"""Test cases guarding application cold-start time"""
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Modules only needed to generate content or render video
+HEAVY_MODULES = ('openai', 'moviepy', 'pyttsx3', 'numpy', 'PIL')
+
+# Seconds app.py may spend importing, beyond its framework dependencies
+IMPORT_TIME_BUDGET = 0.3
+
+
+def run_python(code):
+    """Run code in a fresh interpreter from the project root and return its JSON output"""
+    env = dict(os.environ, DATABASE_URL='sqlite:///:memory:', JOB_BACKEND='inline')
+    result = subprocess.run(
+        [sys.executable, '-c', code], cwd=ROOT, env=env,
+        capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+class TestColdStart:
+    """Test suite for import-time cost"""
+    
+    def test_app_import_skips_heavy_modules(self):
+        """Test importing the app loads no generation or rendering libraries"""
+        loaded = run_python(
+            "import json, sys\n"
+            "import app\n"
+            f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))"
+        )
+        
+        assert loaded == []
+    
+    def test_app_import_time_within_budget(self):
+        """Test app.py's own import time stays within budget"""
+        timings = run_python(
+            "import json, time\n"
+            "start = time.perf_counter()\n"
+            "import flask, flask_cors, flask_sqlalchemy, dotenv\n"
+            "deps = time.perf_counter() - start\n"
+            "start = time.perf_counter()\n"
+            "import app\n"
+            "print(json.dumps({'deps': deps, 'app': time.perf_counter() - start}))"
+        )
+        
+        assert timings['app'] < IMPORT_TIME_BUDGET, timings
+    
+    def test_package_exports_load_on_demand(self):
+        """Test src exports resolve lazily and only pull in their own dependencies"""
+        loaded = run_python(
+            "import json, sys\n"
+            "import src\n"
+            "before = 'openai' in sys.modules\n"
+            "from src import ContentGenerator, ContentCache\n"
+            "print(json.dumps([before, 'openai' in sys.modules, 'moviepy' in sys.modules, "
+            "ContentGenerator.__name__, ContentCache.__name__]))"
+        )
+        
+        assert loaded == [False, True, False, 'ContentGenerator', 'ContentCache']
+    
+    def test_unknown_export_raises(self):
+        """Test missing attributes still raise AttributeError"""
+        import src
+        
+        with pytest.raises(AttributeError):
+            src.NotAClass
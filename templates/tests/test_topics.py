@@ -0,0 +1,83 @@
+"""Test cases for topic normalization and near-duplicate matching"""
+
+from src.topics import TopicIndex, normalize_topic
+
+
+class TestNormalizeTopic:
+    """Test suite for normalize_topic"""
+    
+    def test_equivalent_phrasings_normalize_alike(self):
+        """Test abbreviations, filler words and plurals are normalized away"""
+        assert normalize_topic('Intro to ML') == 'machine learning'
+        assert normalize_topic('machine learning basics') == 'machine learning'
+        assert normalize_topic('  Machine   Learning ') == 'machine learning'
+        assert normalize_topic('An Introduction to Databases') == 'database'
+    
+    def test_filler_only_topic_is_kept(self):
+        """Test a topic made only of filler words is not reduced to nothing"""
+        assert normalize_topic('Introduction') == 'introduction'
+
+
+class TestTopicIndex:
+    """Test suite for TopicIndex"""
+    
+    def test_near_duplicates_match(self):
+        """Test rephrased topics match the stored lesson"""
+        index = TopicIndex()
+        index.add(1, 'Machine Learning')
+        index.add(2, 'French Revolution')
+        
+        match = index.match('Intro to ML')
+        assert match['id'] == 1
+        assert match['topic'] == 'Machine Learning'
+        assert match['score'] > 0.99
+        assert index.match('the french revolution')['id'] == 2
+    
+    def test_related_topics_do_not_match(self):
+        """Test distinct subjects stay below the default threshold"""
+        index = TopicIndex()
+        index.add(1, 'Machine Learning')
+        index.add(2, 'Python programming')
+        
+        assert index.match('Deep Learning') is None
+        assert index.match('Java programming') is None
+        assert index.match('Deep Learning', threshold=0.5)['id'] == 1
+    
+    def test_words_must_agree(self):
+        """Test topics differing by a prefixed word do not match despite shared n-grams"""
+        index = TopicIndex()
+        index.add(1, 'Organic Chemistry')
+        index.add(2, 'Supervised learning')
+        
+        assert index.match('Inorganic Chemistry') is None
+        assert index.match('Unsupervised learning') is None
+        assert index.match('organic chemistry basics')['id'] == 1
+    
+    def test_language_and_depth_must_agree(self):
+        """Test a lesson is only reused for the same language and depth"""
+        index = TopicIndex()
+        index.add(1, 'Photosynthesis', language='en', depth='basic')
+        
+        assert index.match('Photosynthesis', language='en', depth='basic')['id'] == 1
+        assert index.match('Photosynthesis', language='es', depth='basic') is None
+        assert index.match('Photosynthesis', language='en', depth='advanced') is None
+    
+    def test_ids_are_indexed_once(self):
+        """Test re-adding an indexed id leaves the index unchanged"""
+        index = TopicIndex()
+        index.add(1, 'Photosynthesis')
+        index.add(1, 'Photosynthesis')
+        
+        assert len(index) == 1
+        assert 1 in index and 2 not in index
+    
+    def test_index_grows(self):
+        """Test the index keeps every entry as its storage grows"""
+        index = TopicIndex(dim=256)
+        for i in range(200):
+            index.add(i + 1, f'Topic number {i}')
+        
+        assert len(index) == 200
+        assert index.max_id == 200
+        assert index.match('Topic number 150')['id'] == 151
+        assert index.match('anything', language='fr') is None
@@ -0,0 +1,485 @@
+"""Test cases for video generation helpers"""
+
+import os
+import subprocess
+import sys
+import wave
+
+import moviepy.editor as mpy
+import pytest
+from PIL import Image
+
+from src import video_generator
+from src.cache import AudioCache, SegmentCache
+from src.video_generator import RENDITIONS, VideoGenerator, load_font, render_text_frame
+
+CONTENT = {
+    'topic': 'Optics',
+    'title': 'Introduction to Optics',
+    'description': 'Light and lenses.',
+    'sections': [
+        {'title': f'Section {i}', 'content': f'Content for section {i}', 'key_points': []}
+        for i in range(10)
+    ],
+    'key_points': ['Light bends', 'Lenses focus']
+}
+
+
+class FakeTTSEngine:
+    """Stand-in for a pyttsx3 engine that speaks ten characters per second of silence"""
+    
+    def __init__(self):
+        self.queue = []
+        self.spoken = []
+    
+    def setProperty(self, name, value):
+        pass
+    
+    def save_to_file(self, text, path):
+        self.queue.append((text, path))
+    
+    def runAndWait(self):
+        for text, path in self.queue:
+            write_silence(path, len(text) / 10.0)
+            self.spoken.append(text)
+        self.queue = []
+
+
+def write_silence(path, seconds, rate=22050):
+    """Write a silent mono WAV file"""
+    with wave.open(str(path), 'wb') as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(rate)
+        f.writeframes(b'\x00\x00' * int(seconds * rate))
+    return str(path)
+
+
+RENDER_SCRIPT = """
+import json, resource, sys, wave
+from src import video_generator
+from src.cache import AudioCache
+
+class SilentEngine:
+    def __init__(self):
+        self.queue = []
+    def setProperty(self, name, value):
+        pass
+    def save_to_file(self, text, path):
+        self.queue.append(path)
+    def runAndWait(self):
+        for path in self.queue:
+            video_generator._write_silence(path, 0.5)
+        self.queue = []
+
+video_generator.pyttsx3.init = SilentEngine
+output_dir, sections, mode = sys.argv[1], int(sys.argv[2]), sys.argv[3]
+generator = video_generator.VideoGenerator(output_dir, audio_cache=AudioCache(output_dir + '/audio'))
+generator.frame_workers = 1
+generator.encode_mode = mode
+generator.fps = 2
+content = {
+    'topic': 'Memory', 'title': 'Memory', 'description': 'Bounded.', 'key_points': ['a'],
+    'sections': [{'title': f'Section {i}', 'content': f'Text {i}', 'key_points': []} for i in range(sections)]
+}
+generator.create_video(content)
+print(json.dumps(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0))
+"""
+
+
+def peak_render_rss(output_dir, sections, mode):
+    """Render a lesson in a fresh interpreter and return its peak RSS in MB"""
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    result = subprocess.run(
+        [sys.executable, '-c', RENDER_SCRIPT, str(output_dir), str(sections), mode],
+        cwd=root, capture_output=True, text=True, check=True,
+        env=dict(os.environ, METRICS_DB='')
+    )
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+@pytest.fixture
+def generator(tmp_path, monkeypatch):
+    """Create a VideoGenerator without a real TTS engine"""
+    monkeypatch.setattr(video_generator.pyttsx3, 'init', FakeTTSEngine)
+    return VideoGenerator(output_dir=str(tmp_path / 'videos'),
+                          audio_cache=AudioCache(str(tmp_path / 'audio_cache')))
+
+
+class TestFrameRendering:
+    """Test suite for frame rendering"""
+    
+    def test_fonts_are_cached(self):
+        """Test each (path, size) font is loaded once"""
+        load_font.cache_clear()
+        render_text_frame('one', font_size=33)
+        render_text_frame('two', font_size=33)
+        
+        assert load_font.cache_info().misses == 1
+        assert load_font.cache_info().hits == 1
+    
+    def test_background_layer_is_not_mutated(self):
+        """Test drawing on one frame does not leak into the shared background"""
+        first = render_text_frame('first', width=320, height=180)
+        second = render_text_frame('', width=320, height=180)
+        
+        assert first.tobytes() != second.tobytes()
+        assert set(second.getdata()) == {(67, 126, 234)}
+    
+    def test_parallel_frames_match_serial(self, generator, tmp_path):
+        """Test the process pool renders the same frames as the serial path"""
+        (tmp_path / 'serial').mkdir()
+        (tmp_path / 'parallel').mkdir()
+        generator.frame_workers = 1
+        serial = generator._render_frame_files(CONTENT, 'experimental', str(tmp_path / 'serial'), '360p')
+        
+        generator.frame_workers = 2
+        generator.frame_pool_threshold = 2
+        parallel = generator._render_frame_files(CONTENT, 'experimental', str(tmp_path / 'parallel'), '360p')
+        
+        assert len(parallel) == len(CONTENT['sections']) + 2
+        assert [Image.open(path).tobytes() for path in parallel] == [Image.open(path).tobytes() for path in serial]
+
+
+class TestEncoding:
+    """Test suite for combining slides and narration"""
+    
+    def test_still_encode_produces_playable_mp4(self, generator, tmp_path):
+        """Test the still-image fast path writes an H.264/AAC MP4 matching the narration"""
+        frames = [render_text_frame(f'Slide {i}', width=320, height=180) for i in range(3)]
+        audio_path = write_silence(tmp_path / 'narration.wav', 3.0)
+        
+        output_path = generator._combine_audio_video(frames, audio_path, 'Still Test')
+        
+        clip = mpy.VideoFileClip(output_path)
+        try:
+            assert clip.size == [320, 180]
+            assert clip.duration == pytest.approx(3.0, abs=0.3)
+            assert clip.audio is not None
+        finally:
+            clip.close()
+
+
+    def test_stream_encode_matches_narration(self, generator, tmp_path):
+        """Test the streaming encoder writes every slide for its own duration"""
+        generator.encode_mode = 'stream'
+        generator.fps = 10
+        frames = [render_text_frame(f'Slide {i}', width=320, height=180) for i in range(3)]
+        audio_path = write_silence(tmp_path / 'narration.wav', 3.0)
+        
+        output_path = generator._combine_audio_video(frames, audio_path, 'Stream Test', [0.5, 1.0, 1.5])
+        
+        clip = mpy.VideoFileClip(output_path)
+        try:
+            assert clip.size == [320, 180]
+            assert clip.duration == pytest.approx(3.0, abs=0.3)
+            assert clip.audio is not None
+        finally:
+            clip.close()
+    
+    @pytest.mark.parametrize('mode', ['still', 'stream'])
+    def test_peak_memory_independent_of_lesson_length(self, tmp_path, mode):
+        """Test peak RSS of a 40-section render stays close to that of a 2-section render"""
+        short = peak_render_rss(tmp_path / 'short', sections=2, mode=mode)
+        long = peak_render_rss(tmp_path / 'long', sections=40, mode=mode)
+        
+        # Holding every 1080p slide in memory would add ~6 MB per section (over 200 MB)
+        assert long - short < 40, (short, long)
+
+
+class TestCreateVideo:
+    """Test suite for the end-to-end render pipeline"""
+    
+    def test_slides_are_timed_to_their_narration(self, generator, monkeypatch):
+        """Test each slide lasts as long as its own narration segment"""
+        content = dict(CONTENT, sections=CONTENT['sections'][:2])
+        segments = generator._generate_script_segments(content)
+        recorded = {}
+        original = generator._combine_audio_video
+        
+        def spy(frames, audio_path, topic, durations=None):
+            recorded['durations'] = durations
+            return original(frames, audio_path, topic, durations)
+        
+        monkeypatch.setattr(generator, '_combine_audio_video', spy)
+        result = generator.create_video(content)
+        
+        expected = [len(text) / 10.0 for text in segments]
+        assert recorded['durations'] == pytest.approx(expected, abs=0.01)
+        assert result['duration'] == pytest.approx(sum(expected), abs=0.05)
+        
+        clip = mpy.VideoFileClip(result['video_path'])
+        try:
+            assert clip.duration == pytest.approx(sum(expected), abs=0.5)
+        finally:
+            clip.close()
+    
+    def test_restyled_render_reuses_narration(self, generator):
+        """Test rendering the same lesson in another style synthesizes no new audio"""
+        content = dict(CONTENT, sections=CONTENT['sections'][:2])
+        generator.create_video(content, style='experimental')
+        spoken = len(generator.tts_engine.spoken)
+        
+        generator.create_video(content, style='professional')
+        
+        assert spoken == len(content['sections']) + 2
+        assert len(generator.tts_engine.spoken) == spoken
+        assert generator.audio_cache.stats()['hits'] == spoken
+        videos = [name for name in os.listdir(generator.output_dir) if name.endswith('.mp4')]
+        others = [name for name in os.listdir(generator.output_dir) if not name.endswith('.mp4')]
+        # Only each video's HLS directory may sit beside it; no scratch files are left behind
+        assert sorted(others) == sorted(os.path.splitext(name)[0] for name in videos)
+    
+    def test_render_stages_are_timed(self, generator):
+        """Test each render stage records a timing observation"""
+        from src.metrics import registry
+        stages = ('script', 'tts', 'frames', 'audio_concat', 'encode')
+        before = {stage: registry.value('video_render_stage_seconds', stage=stage) for stage in stages}
+        
+        generator.create_video(dict(CONTENT, sections=CONTENT['sections'][:1]))
+        
+        for stage in stages:
+            previous = before[stage]['count'] if before[stage] else 0
+            assert registry.value('video_render_stage_seconds', stage=stage)['count'] == previous + 1
+    
+    def test_tts_engine_starts_only_when_needed(self, generator, monkeypatch):
+        """Test a render served entirely from the audio cache never initializes a TTS driver"""
+        content = dict(CONTENT, sections=CONTENT['sections'][:1])
+        generator.create_video(content)
+        
+        def no_driver():
+            raise RuntimeError('TTS driver should not be initialized')
+        
+        monkeypatch.setattr(video_generator.pyttsx3, 'init', no_driver)
+        cached = VideoGenerator(output_dir=generator.output_dir, audio_cache=generator.audio_cache)
+        result = cached.create_video(content, style='casual')
+        
+        assert os.path.exists(result['video_path'])
+        assert cached._tts_engine is None
+
+
+class TestRenditionLadder:
+    """Test suite for multi-rendition HLS output"""
+    
+    def test_frames_are_rendered_natively_per_rendition(self, generator):
+        """Test each rendition gets slides drawn at its own size with scaled fonts"""
+        small = generator._frame_specs(CONTENT, 'experimental', '360p')
+        large = generator._frame_specs(CONTENT, 'experimental', '1080p')
+        
+        assert {(spec['width'], spec['height']) for spec in small} == {(640, 360)}
+        assert {(spec['width'], spec['height']) for spec in large} == {(1920, 1080)}
+        assert [spec['font_size'] for spec in small[:2]] == [27, 13]
+        assert [spec['font_size'] for spec in large[:2]] == [80, 40]
+        assert generator._frame_specs(CONTENT, 'experimental') == large
+    
+    def test_ladder_is_written_in_one_render(self, generator, monkeypatch):
+        """Test create_video writes a master playlist, one media playlist per rendition and the MP4"""
+        generator.renditions = ['360p', '720p']
+        generator.quality = '720p'
+        runs = []
+        original_run = video_generator.subprocess.run
+        
+        def counting_run(command, *args, **kwargs):
+            runs.append(command)
+            return original_run(command, *args, **kwargs)
+        
+        monkeypatch.setattr(video_generator.subprocess, 'run', counting_run)
+        result = generator.create_video(dict(CONTENT, sections=CONTENT['sections'][:2]))
+        
+        # One concat of the narration, one encode for the whole ladder and one stream-copy remux
+        encodes = [command for command in runs if 'libx264' in command]
+        assert len(encodes) == 1
+        assert result['renditions'] == ['360p', '720p']
+        
+        hls_dir = os.path.splitext(result['video_path'])[0]
+        assert result['hls_url'] == f"/outputs/videos/{os.path.basename(hls_dir)}/master.m3u8"
+        with open(os.path.join(hls_dir, 'master.m3u8')) as f:
+            master = f.read()
+        assert 'RESOLUTION=640x360' in master
+        assert 'RESOLUTION=1280x720' in master
+        for name in ('360p', '720p'):
+            with open(os.path.join(hls_dir, name, 'index.m3u8')) as f:
+                playlist = f.read()
+            assert '#EXT-X-PLAYLIST-TYPE:VOD' in playlist
+            assert '#EXT-X-MAP:URI=' in playlist
+        
+        clip = mpy.VideoFileClip(result['video_path'])
+        try:
+            assert clip.size == [1280, 720]
+            assert clip.duration == pytest.approx(result['duration'], abs=0.5)
+            assert clip.audio is not None
+        finally:
+            clip.close()
+    
+    def test_single_file_without_ladder(self, generator):
+        """Test an empty ladder (or the streaming encoder) writes only the MP4"""
+        generator.renditions = []
+        generator.quality = '360p'
+        result = generator.create_video(dict(CONTENT, sections=CONTENT['sections'][:1]))
+        
+        assert result['hls_url'] is None
+        assert result['renditions'] == ['360p']
+        assert not os.path.exists(os.path.splitext(result['video_path'])[0])
+        
+        generator.renditions = list(RENDITIONS)
+        generator.encode_mode = 'stream'
+        assert generator._ladder() == []
+    
+    def test_render_threads_limit_ffmpeg(self, tmp_path, monkeypatch):
+        """Test the cores granted by the scheduler cap ffmpeg threads and the frame pool"""
+        monkeypatch.setenv('RENDER_THREADS', '2')
+        monkeypatch.setenv('FRAME_RENDER_WORKERS', '8')
+        generator = VideoGenerator(output_dir=str(tmp_path))
+        
+        assert generator.frame_workers == 2
+        assert generator._thread_args() == ['-threads', '2']
+        assert generator._thread_args(concurrent=4) == ['-threads', '1']
+        
+        monkeypatch.delenv('RENDER_THREADS')
+        assert VideoGenerator(output_dir=str(tmp_path))._thread_args() == []
+    
+    def test_unknown_rendition_is_rejected(self, tmp_path, monkeypatch):
+        """Test a misspelled rendition fails at construction rather than mid-render"""
+        monkeypatch.setenv('VIDEO_RENDITIONS', '360p,4k')
+        with pytest.raises(ValueError, match='4k'):
+            VideoGenerator(output_dir=str(tmp_path))
+
+
+@pytest.fixture
+def incremental(generator, tmp_path, monkeypatch):
+    """Switch the generator to per-slide segments and count the encodes it runs"""
+    generator.encode_mode = 'segments'
+    generator._segment_cache = SegmentCache(str(tmp_path / 'segment_cache'))
+    generator.renditions = []
+    generator.quality = '360p'
+    generator.encodes = []
+    original_run = video_generator.subprocess.run
+    
+    def counting_run(command, *args, **kwargs):
+        if 'libx264' in command:
+            generator.encodes.append(command)
+        return original_run(command, *args, **kwargs)
+    
+    monkeypatch.setattr(video_generator.subprocess, 'run', counting_run)
+    return generator
+
+
+class TestIncrementalRender:
+    """Test suite for rebuilding videos from cached per-slide segments"""
+    
+    def test_edit_reencodes_only_the_changed_section(self, incremental):
+        """Test changing one section's text re-encodes that slide alone"""
+        content = dict(CONTENT, sections=CONTENT['sections'][:3])
+        first = incremental.create_video(content)
+        assert len(incremental.encodes) == 5
+        
+        edited = [dict(section) for section in content['sections']]
+        edited[1]['content'] = 'Rewritten content for section 1'
+        incremental.encodes.clear()
+        second = incremental.create_video(dict(content, sections=edited))
+        
+        assert len(incremental.encodes) == 1
+        assert second['video_path'] != first['video_path']
+        assert second['duration'] == pytest.approx(first['duration'] + 1.0, abs=0.01)
+        clip = mpy.VideoFileClip(second['video_path'])
+        try:
+            assert clip.size == [640, 360]
+            assert clip.duration == pytest.approx(second['duration'], abs=0.3)
+            assert clip.audio is not None
+        finally:
+            clip.close()
+    
+    def test_unchanged_lesson_skips_frames_and_encodes(self, incremental, monkeypatch):
+        """Test rebuilding an unchanged lesson only stitches cached segments"""
+        content = dict(CONTENT, sections=CONTENT['sections'][:2])
+        incremental.create_video(content)
+        incremental.encodes.clear()
+        
+        def no_render(job):
+            raise AssertionError('no slide should be re-rendered')
+        
+        monkeypatch.setattr(video_generator, '_render_frame_file', no_render)
+        result = incremental.create_video(content)
+        
+        assert incremental.encodes == []
+        assert os.path.getsize(result['video_path']) > 0
+    
+    def test_segments_feed_the_rendition_ladder(self, incremental):
+        """Test the ladder is stitched from per-rendition segments and only dirty ones re-encode"""
+        incremental.renditions = ['360p', '480p']
+        incremental.quality = '480p'
+        content = dict(CONTENT, sections=CONTENT['sections'][:1])
+        incremental.create_video(content)
+        
+        incremental.encodes.clear()
+        result = incremental.create_video(dict(content, title='Optics Revisited'))
+        
+        # Only the title slide changed, once per rendition
+        assert len(incremental.encodes) == 2
+        assert result['renditions'] == ['360p', '480p']
+        with open(os.path.join(os.path.splitext(result['video_path'])[0], 'master.m3u8')) as f:
+            master = f.read()
+        assert 'RESOLUTION=640x360' in master
+        assert 'RESOLUTION=854x480' in master
+        clip = mpy.VideoFileClip(result['video_path'])
+        try:
+            assert clip.size == [854, 480]
+        finally:
+            clip.close()
+
+
+class TestPreviewRender:
+    """Test suite for quick low-resolution preview renders"""
+    
+    def test_preview_is_a_single_low_resolution_file(self, generator, monkeypatch):
+        """Test a preview skips the ladder and encodes one small MP4 with the fast preset"""
+        encodes = []
+        original_run = video_generator.subprocess.run
+        
+        def counting_run(command, *args, **kwargs):
+            if 'libx264' in command:
+                encodes.append(command)
+            return original_run(command, *args, **kwargs)
+        
+        monkeypatch.setattr(video_generator.subprocess, 'run', counting_run)
+        generator.still_fps = 2
+        generator.preview_fps = 1
+        result = generator.create_video(dict(CONTENT, sections=CONTENT['sections'][:1]), preview=True)
+        
+        assert result['preview'] is True
+        assert result['hls_url'] is None
+        assert result['renditions'] == ['480p']
+        assert result['video_path'].endswith('_preview.mp4')
+        assert len(encodes) == 1
+        assert encodes[0][encodes[0].index('-preset') + 1] == 'ultrafast'
+        assert encodes[0][encodes[0].index('-r') + 1] == '1'
+        # The generator itself keeps its full-render settings
+        assert generator.quality == '1080p'
+        assert generator.preset == 'veryfast'
+        assert generator.still_fps == 2
+        clip = mpy.VideoFileClip(result['video_path'])
+        try:
+            assert clip.size == [854, 480]
+        finally:
+            clip.close()
+    
+    def test_preview_of_first_sections(self, generator):
+        """Test a preview can cover only the first sections of a lesson"""
+        content = dict(CONTENT, sections=CONTENT['sections'][:3])
+        result = generator.create_video(content, preview=True, preview_sections=1)
+        segments = generator._generate_script_segments(dict(content, sections=content['sections'][:1]))
+        
+        assert result['duration'] == pytest.approx(sum(len(text) / 10.0 for text in segments), abs=0.05)
+    
+    def test_full_render_reuses_preview_narration(self, generator):
+        """Test the full render after a preview only synthesizes sections the preview skipped"""
+        content = dict(CONTENT, sections=CONTENT['sections'][:3])
+        generator.create_video(content, preview=True, preview_sections=1)
+        spoken = list(generator.tts_engine.spoken)
+        
+        result = generator.create_video(content)
+        
+        assert result['preview'] is False
+        assert not result['video_path'].endswith('_preview.mp4')
+        assert len(generator.tts_engine.spoken) - len(spoken) == 2
+        assert generator.audio_cache.stats()['hits'] == len(spoken)